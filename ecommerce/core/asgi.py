@@ -7,4 +7,11 @@ from django.core.asgi import get_asgi_application
 # Ensure the environment variable points to the correct settings file
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tec.ecommerce.core.settings')
 
+# Serves the async order endpoints (orders/async_views.py) natively, e.g.:
+#   uvicorn core.asgi:application --workers 4
+# Sync DRF views keep working here too (Django runs them in a thread pool).
 application = get_asgi_application()
+
+# Load the autocomplete index in the background at worker start, not on the first request
+from search.suggest import start_suggest_refresher  # noqa: E402
+start_suggest_refresher()
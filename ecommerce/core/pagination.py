@@ -0,0 +1,197 @@
+# File: tec/ecommerce/core/pagination.py
+
+import base64
+import json
+from collections import OrderedDict
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+# ----------------------------------------------------
+# Keyset (Cursor) Pagination
+# ----------------------------------------------------
+# Pages are addressed by the ordering values of the last row seen, never by an OFFSET:
+#   WHERE (created_at, id) < (:created_at, :id) ORDER BY created_at DESC, id DESC LIMIT :size
+# With a composite index on the filter columns + ordering, page N costs the same as page 1.
+# The last ordering field must be unique (the primary key) so the order is total and stable.
+# Nullable ordering fields sort their NULLs last (first when walking backwards) on every
+# database, and the cursor condition handles them explicitly; non-null fields keep the plain
+# comparison and ORDER BY, so their indexes stay usable.
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a composite ordering (default: newest id first).
+    Responses look like DRF's CursorPagination: {'next', 'previous', 'results'}.
+    page_size is capped by max_page_size, so no list endpoint is unbounded.
+    """
+    ordering = ('-id',)
+    page_size = api_settings.PAGE_SIZE or 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    # --- Ordering ---
+    def get_ordering(self, request, queryset, view):
+        """
+        Uses the view's OrderingFilter choice (e.g. ?ordering=-rating_avg) when there is one,
+        with the primary key appended as the tie breaker; otherwise self.ordering.
+        """
+        for backend in getattr(view, 'filter_backends', []):
+            if issubclass(backend, OrderingFilter) and request.query_params.get(backend.ordering_param):
+                ordering = backend().get_ordering(request, queryset, view)
+                if ordering:
+                    ordering = [field for field in ordering if field.lstrip('-') not in ('id', 'pk')]
+                    return tuple(ordering) + (('-id',) if ordering[0].startswith('-') else ('id',))
+        return self.ordering
+
+    @staticmethod
+    def _flip(field: str) -> str:
+        return field[1:] if field.startswith('-') else f"-{field}"
+
+    @staticmethod
+    def _nullable(model, field: str) -> bool:
+        return model._meta.get_field(field.lstrip('-')).null
+
+    def _order_by(self, model, ordering, nulls_last: bool) -> list:
+        """ ORDER BY terms; nullable fields get an explicit NULLS LAST (or FIRST) placement. """
+        terms = []
+        for field in ordering:
+            if not self._nullable(model, field):
+                terms.append(field)
+                continue
+            expression = F(field.lstrip('-'))
+            placement = {'nulls_last': True} if nulls_last else {'nulls_first': True}
+            terms.append(expression.desc(**placement) if field.startswith('-') else expression.asc(**placement))
+        return terms
+
+    def _after(self, model, ordering, values, nulls_last: bool) -> Q:
+        """
+        Rows strictly after the cursor position, for any mix of ascending/descending fields.
+        On nullable fields NULL ranks after (nulls_last) or before every value.
+        """
+        condition = Q(pk__in=[])
+        equal = Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            nullable = self._nullable(model, field)
+            if value is None:
+                # Past a NULL only the non-null values remain, and only if NULLs come first
+                after = None if nulls_last else Q(**{f"{name}__isnull": False})
+                same = Q(**{f"{name}__isnull": True})
+            else:
+                lookup = 'lt' if field.startswith('-') else 'gt'
+                after = Q(**{f"{name}__{lookup}": value})
+                if nullable and nulls_last:
+                    after |= Q(**{f"{name}__isnull": True})
+                same = Q(**{name: value})
+            if after is not None:
+                condition |= equal & after
+            equal &= same
+        return condition
+
+    # --- Cursor Encoding ---
+    def encode_cursor(self, values, reverse: bool) -> str:
+        payload = json.dumps({'v': values, 'r': int(reverse)}, separators=(',', ':'), default=str)
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, request, queryset, ordering):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            if len(payload['v']) != len(ordering):
+                raise ValueError('cursor does not match the ordering')
+            values = [
+                queryset.model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(ordering, payload['v'])
+            ]
+            return values, bool(payload.get('r'))
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def _row_values(self, row, ordering):
+        return [getattr(row, field.lstrip('-')) for field in ordering]
+
+    def _link(self, row, reverse: bool):
+        url = self.request.build_absolute_uri()
+        values = self._row_values(row, self.active_ordering)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(values, reverse))
+
+    # --- Pagination ---
+    def get_page_size(self, request):
+        try:
+            requested = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            requested = self.page_size
+        return max(1, min(requested, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        ordering = self.get_ordering(request, queryset, view)
+        self.active_ordering = ordering
+        values, reverse = self.decode_cursor(request, queryset, ordering)
+
+        # 'previous' links walk backwards: flip the ordering (and the NULL placement), then
+        # restore the page order
+        query_ordering = tuple(self._flip(field) for field in ordering) if reverse else ordering
+        nulls_last = not reverse
+        queryset = queryset.order_by(*self._order_by(queryset.model, query_ordering, nulls_last))
+        if values is not None:
+            queryset = queryset.filter(self._after(queryset.model, query_ordering, values, nulls_last))
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        self.has_next = has_more if not reverse else values is not None
+        self.has_previous = values is not None if not reverse else has_more
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self._link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self._link(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class CreatedAtKeysetPagination(KeysetPagination):
+    """ Newest first by (created_at, id): products and notifications. """
+    ordering = ('-created_at', '-id')
+
+
+class TimestampKeysetPagination(KeysetPagination):
+    """ Newest first by (timestamp, id): loyalty point transactions. """
+    ordering = ('-timestamp', '-id')
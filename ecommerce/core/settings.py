@@ -40,8 +40,7 @@ INSTALLED_APPS = [
     'orders.apps.OrdersConfig',
     'growth.apps.GrowthConfig',
     'notifications.apps.NotificationsConfig',
-    # Include 'search' if you have an app for it:
-    # 'search.apps.SearchConfig', 
+    'search.apps.SearchConfig', 
 ]
 
 # -----------------------------------------------------------------
@@ -114,6 +113,9 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
     ),
+    # Keyset pagination: constant cost per page and no unbounded list responses
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.KeysetPagination',
+    'PAGE_SIZE': 20,
 }
 
 from datetime import timedelta
@@ -134,6 +136,19 @@ PI_NETWORK_API_KEY = os.environ.get('PI_NETWORK_API_KEY', 'default_pi_key')
 PI_APP_CLIENT_ID = os.environ.get('PI_APP_CLIENT_ID', 'pi_app_id')
 # Default time for escrow release (e.g., 14 days after shipment)
 PI_ESCROW_RELEASE_DAYS = int(os.environ.get('PI_ESCROW_RELEASE_DAYS', 14)) 
+# Pi SDK backend used by checkout (swap the local stand-in for the real client in production)
+PI_SDK_BACKEND = os.environ.get('PI_SDK_BACKEND', 'orders.pi_sdk.LocalPiSDK')
+# Set PI_SDK_BACKEND to 'orders.pi_client.PiClient' to use the pooled HTTP client below
+PI_SDK_OPTIONS = {
+    'latency_ms': float(os.environ.get('PI_SDK_LATENCY_MS', 0)),
+} if PI_SDK_BACKEND.endswith('LocalPiSDK') else {}
+# Pi HTTP client (orders.pi_client)
+PI_API_BASE_URL = os.environ.get('PI_API_BASE_URL', 'https://api.minepi.com')
+PI_API_TIMEOUT_SECONDS = float(os.environ.get('PI_API_TIMEOUT_SECONDS', 5))
+PI_API_MAX_RETRIES = int(os.environ.get('PI_API_MAX_RETRIES', 2)) # Idempotent calls only
+PI_API_MAX_CONNECTIONS = int(os.environ.get('PI_API_MAX_CONNECTIONS', 100)) # Keep-alive pool size per process
+PI_CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('PI_CIRCUIT_FAILURE_THRESHOLD', 5)) # Consecutive failures
+PI_CIRCUIT_RESET_SECONDS = float(os.environ.get('PI_CIRCUIT_RESET_SECONDS', 30))
 
 # -----------------------------------------------------------------
 # 9. INTERNATIONALIZATION
@@ -155,13 +170,17 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # -----------------------------------------------------------------
 # 11. EMAIL/NOTIFICATION CONFIGURATION
 # -----------------------------------------------------------------
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# Use 'notifications.backends.LocalSMTPBackend' to run the dispatcher without a mail server
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = os.environ.get('EMAIL_HOST')
 EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 587))
 EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD')
 EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', 'True') == 'True'
 DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'noreply@commercepi.com')
+# Notification email dispatcher (see notifications/services.py)
+NOTIFICATION_DISPATCH_BATCH_SIZE = int(os.environ.get('NOTIFICATION_DISPATCH_BATCH_SIZE', 500))
+NOTIFICATION_DISPATCH_WORKERS = int(os.environ.get('NOTIFICATION_DISPATCH_WORKERS', 4))
 
 # -----------------------------------------------------------------
 # 12. ELASTICSEARCH CONFIGURATION (For Search)
@@ -169,3 +188,41 @@ DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'noreply@commercepi.co
 ELASTIC_HOST = os.environ.get('ELASTIC_HOST', 'http://localhost:9200')
 ELASTIC_USER = os.environ.get('ELASTIC_USER', '')
 ELASTIC_PASSWORD = os.environ.get('ELASTIC_PASSWORD', '')
+# Incremental indexing: how often the outbox consumer flushes coalesced changes to ES
+SEARCH_OUTBOX_FLUSH_INTERVAL_MS = int(os.environ.get('SEARCH_OUTBOX_FLUSH_INTERVAL_MS', 500))
+SEARCH_OUTBOX_BATCH_SIZE = int(os.environ.get('SEARCH_OUTBOX_BATCH_SIZE', 1000))
+# Per-process search result cache (head queries)
+SEARCH_RESULT_CACHE_TTL = int(os.environ.get('SEARCH_RESULT_CACHE_TTL', 60))
+SEARCH_RESULT_CACHE_MAX_BYTES = int(os.environ.get('SEARCH_RESULT_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+# Autocomplete prefix index: snapshot loaded at worker start, then refreshed incrementally in the background
+SEARCH_SUGGEST_SNAPSHOT_PATH = os.environ.get('SEARCH_SUGGEST_SNAPSHOT_PATH', str(BASE_DIR / 'suggest_index.snapshot'))
+SEARCH_SUGGEST_REFRESH_SECONDS = int(os.environ.get('SEARCH_SUGGEST_REFRESH_SECONDS', 60))
+
+# -----------------------------------------------------------------
+# 13. CACHE CONFIGURATION
+# -----------------------------------------------------------------
+# Shared cache (Redis) is required in production so that version keys and cached
+# payloads are visible to every worker; local memory is used for development.
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Product detail: pre-rendered JSON in the shared cache, fronted by a per-worker LRU
+PRODUCT_DETAIL_CACHE_TIMEOUT = int(os.environ.get('PRODUCT_DETAIL_CACHE_TIMEOUT', 60 * 60))
+PRODUCT_DETAIL_LOCAL_CACHE_TTL = float(os.environ.get('PRODUCT_DETAIL_LOCAL_CACHE_TTL', 2))
+PRODUCT_DETAIL_LOCAL_CACHE_MAX_BYTES = int(os.environ.get('PRODUCT_DETAIL_LOCAL_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+
+# Checkout idempotency: stored responses per Idempotency-Key, and how long duplicates wait for an in-flight one
+IDEMPOTENCY_KEY_TTL = int(os.environ.get('IDEMPOTENCY_KEY_TTL', 60 * 60 * 24))
+IDEMPOTENCY_WAIT_SECONDS = float(os.environ.get('IDEMPOTENCY_WAIT_SECONDS', 30))
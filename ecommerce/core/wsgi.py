@@ -8,3 +8,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tec.ecommerce.core.settings')
 
 application = get_wsgi_application()
+
+# Load the autocomplete index in the background at worker start, not on the first request
+from search.suggest import start_suggest_refresher  # noqa: E402
+start_suggest_refresher()
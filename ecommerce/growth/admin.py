@@ -69,5 +69,5 @@ class LoyaltyPointTransactionAdmin(admin.ModelAdmin):
     list_filter = ('transaction_type', 'created_at')
     
     # Make points_amount non-editable to prevent manual data corruption
-    readonly_fields = ('user', 'points_amount', 'transaction_type', 'related_order_id', 'created_at')
+    readonly_fields = ('user', 'points_amount', 'points_remaining', 'transaction_type', 'related_order_id', 'created_at')
 
@@ -0,0 +1,78 @@
+# File: tec/ecommerce/growth/management/commands/reconcile_loyalty_balances.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+
+from accounts.models import UserProfile
+from growth.models import LoyaltyPointTransaction
+from growth.services import rebuild_points_remaining
+
+
+class Command(BaseCommand):
+    """
+    Verifies that every materialized loyalty balance (UserProfile.current_loyalty_points)
+    equals the SUM of the user's ledger (LoyaltyPointTransaction.points_amount), and that the
+    unspent remainders of the user's unexpired credits (points_remaining) add up to it.
+    --fix repairs both; it also backfills points_remaining of credits written before the
+    field existed, so run it once after deploying the field and BEFORE the expiry job
+    (growth.services.expire_loyalty_points), which only expires points_remaining.
+    Example: python manage.py reconcile_loyalty_balances --fix
+    """
+    help = 'Checks loyalty balances and unspent credit remainders against the ledger and optionally repairs them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--fix', action='store_true', help='Rewrite mismatched balances and remainders from the ledger.')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        checked = 0
+        mismatches = 0
+        last_user_id = 0
+
+        while True:
+            # Walk profiles in user-id order, one chunk at a time
+            balances = dict(
+                UserProfile.objects.filter(user_id__gt=last_user_id)
+                .order_by('user_id')
+                .values_list('user_id', 'current_loyalty_points')[:chunk_size]
+            )
+            if not balances:
+                break
+            last_user_id = max(balances)
+
+            ledger = dict(
+                LoyaltyPointTransaction.objects.filter(user_id__in=balances)
+                .order_by()
+                .values('user_id')
+                .annotate(total=Sum('points_amount'))
+                .values_list('user_id', 'total')
+            )
+            remaining = dict(
+                LoyaltyPointTransaction.objects.filter(user_id__in=balances, is_expired=False, points_amount__gt=0)
+                .order_by()
+                .values('user_id')
+                .annotate(total=Coalesce(Sum('points_remaining'), 0))
+                .values_list('user_id', 'total')
+            )
+
+            for user_id, balance in balances.items():
+                checked += 1
+                expected = max(ledger.get(user_id) or 0, 0)
+                unspent = remaining.get(user_id, 0)
+                if balance == expected and unspent == expected:
+                    continue
+
+                mismatches += 1
+                self.stdout.write(f"User {user_id}: balance={balance} unspent={unspent} ledger={expected}")
+                if options['fix']:
+                    with transaction.atomic():
+                        # Recompute under lock so a concurrent ledger write is not overwritten
+                        UserProfile.objects.select_for_update().filter(user_id=user_id).first()
+                        total = rebuild_points_remaining(user_id)
+                        UserProfile.objects.filter(user_id=user_id).update(current_loyalty_points=total)
+
+        verdict = 'fixed' if options['fix'] else 'found'
+        self.stdout.write(f"Checked {checked} balances, {mismatches} mismatches {verdict}.")
@@ -1,7 +1,9 @@
 # File: tec/ecommerce/growth/models.py (Final Consolidated Version)
 
-from django.db import models
+import time
+from django.db import models, transaction
 from django.conf import settings
+from django.core.cache import cache
 from django.utils.translation import gettext_lazy as _
 
 # Use the custom user model defined in settings.py
@@ -77,6 +79,12 @@ class LoyaltyPointTransaction(models.Model):
     
     # Crucial field retained from your model for point management
     expiration_date = models.DateTimeField(null=True, blank=True, verbose_name=_('Expiration Date'))
+    # Credits only: the part of this credit not yet redeemed (redemptions spend the oldest first),
+    # which is what the expiry job takes away once expiration_date has passed.
+    # Backfilled for existing credits by 'manage.py reconcile_loyalty_balances --fix'
+    points_remaining = models.IntegerField(default=0, verbose_name=_('Unspent Points'))
+    # Set once the expiry job has posted the matching EXPIRED transaction for this grant
+    is_expired = models.BooleanField(default=False, verbose_name=_('Expiry Processed'))
     
     timestamp = models.DateTimeField(auto_now_add=True)
     
@@ -84,6 +92,12 @@ class LoyaltyPointTransaction(models.Model):
         verbose_name = _('Loyalty Transaction')
         verbose_name_plural = _('Loyalty Transactions')
         ordering = ('-timestamp',)
+        indexes = [
+            # Supports the batch expiry job (growth.services.expire_loyalty_points)
+            models.Index(fields=['is_expired', 'expiration_date'], name='loyalty_expiry_idx'),
+            # Keyset pagination of a user's history (newest first)
+            models.Index(fields=['user', '-timestamp', '-id'], name='loyalty_user_cursor_idx'),
+        ]
         
     def __str__(self):
         action = "Added" if self.points_amount > 0 else "Deducted"
@@ -93,7 +107,19 @@ class LoyaltyPointTransaction(models.Model):
 # 3. Growth Settings Model (System Constants)
 # ----------------------------------------------------
 class GrowthSettings(models.Model):
-    """ Singleton model for storing system-wide growth constants. """
+    """
+    Singleton model for storing system-wide growth constants.
+    load() serves a process-local copy; workers re-check a shared version stamp at most
+    every VERSION_CHECK_SECONDS, and save()/delete() bump it so edits propagate within seconds.
+    """
+
+    VERSION_CACHE_KEY = 'growth:settings:version'
+    VERSION_CHECK_SECONDS = 5
+
+    # Process-local cache (shared by all threads of a worker)
+    _cached_instance = None
+    _cached_version = None
+    _checked_at = 0.0
     
     points_per_pi_spent = models.DecimalField(
         max_digits=5, decimal_places=2, default=1.00,
@@ -122,13 +148,45 @@ class GrowthSettings(models.Model):
             # Prevent creation of more than one instance
             return
         super(GrowthSettings, self).save(*args, **kwargs)
+        transaction.on_commit(GrowthSettings.invalidate_cache)
+
+    def delete(self, *args, **kwargs):
+        result = super(GrowthSettings, self).delete(*args, **kwargs)
+        transaction.on_commit(GrowthSettings.invalidate_cache)
+        return result
+
+    @classmethod
+    def invalidate_cache(cls):
+        """ Bumps the shared version stamp so every worker reloads on its next freshness check. """
+        try:
+            cache.incr(cls.VERSION_CACHE_KEY)
+        except ValueError:
+            cache.set(cls.VERSION_CACHE_KEY, time.time_ns(), timeout=None)
+        cls._cached_instance = None
 
     @classmethod
     def load(cls):
-        """ Retrieves the single instance, creating it if it doesn't exist. """
-        if not cls.objects.exists():
-            cls.objects.create()
-        return cls.objects.first()
+        """ Retrieves the single instance, creating it if it doesn't exist (cached per process). """
+        now = time.monotonic()
+        instance = cls._cached_instance
+        if instance is not None and now - cls._checked_at < cls.VERSION_CHECK_SECONDS:
+            return instance
+
+        # Read the stamp BEFORE the row: a bump racing with the reload forces another reload
+        version = cache.get(cls.VERSION_CACHE_KEY)
+        if version is None:
+            cache.add(cls.VERSION_CACHE_KEY, time.time_ns(), timeout=None)
+            version = cache.get(cls.VERSION_CACHE_KEY)
+
+        if instance is None or version != cls._cached_version:
+            instance = cls.objects.first()
+            if instance is None:
+                instance = cls.objects.create()
+            cls._cached_instance = instance
+            cls._cached_version = version
+
+        cls._checked_at = now
+        return instance
 
     def __str__(self):
         return "System Growth and Loyalty Settings"
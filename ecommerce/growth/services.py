@@ -1,10 +1,13 @@
 # File: tec/ecommerce/growth/services.py (English Version)
 
+import time
+from collections import defaultdict
 from django.db import transaction
+from django.db.models import Case, F, Sum, When
 from django.utils import timezone
 from datetime import timedelta
 from django.conf import settings
-from django.shortcuts import get_object_or_404
+from accounts.models import UserProfile
 from .models import LoyaltyPointTransaction, GrowthSettings, Referral
 # The Order model must be imported from the correct app (assumes 'orders')
 # Ensure the correct User model is imported (User = settings.AUTH_USER_MODEL)
@@ -18,10 +21,89 @@ User = settings.AUTH_USER_MODEL # Use the custom user model
 # POINTS_RATE = 0.10      
 # REFERRAL_BONUS = 500    
 
+EXPIRY_BATCH_SIZE = 1000 # Expired grants processed per expiry-job transaction
+
 # --- Custom Error ---
 class LoyaltyError(Exception):
     pass
 
+# ----------------------------------------------------
+# --- 0. Materialized Balance Helpers ---
+# ----------------------------------------------------
+# UserProfile.current_loyalty_points is the materialized balance of the ledger:
+# it always equals SUM(points_amount) of the user's LoyaltyPointTransaction rows.
+# Every ledger write below updates it in the same transaction through an F() expression,
+# so concurrent writers never lose an update.
+
+def _credit_loyalty_balance(user_id: int, points: int):
+    """ Atomically adds points to the user's materialized balance. """
+    updated = UserProfile.objects.filter(user_id=user_id).update(
+        current_loyalty_points=F('current_loyalty_points') + points
+    )
+    if not updated:
+        raise LoyaltyError(f"No profile found for user {user_id}.")
+
+
+def _spend_oldest_credits(user_id: int, points: int):
+    """
+    Takes a redemption off the user's unspent credits, oldest first (points_remaining).
+    Credits being processed by the expiry job are skipped rather than waited on: their
+    remainder is about to be expired, and waiting would deadlock (the job locks credits,
+    then profiles; a redemption has already locked the profile).
+    """
+    credits = (
+        LoyaltyPointTransaction.objects.select_for_update(skip_locked=True)
+        .filter(user_id=user_id, is_expired=False, points_remaining__gt=0)
+        .order_by('id')
+        .values_list('id', 'points_remaining')
+    )
+    spent = {}
+    for credit_id, remaining in credits.iterator():
+        if points <= 0:
+            break
+        spent[credit_id] = min(remaining, points)
+        points -= spent[credit_id]
+    if spent:
+        LoyaltyPointTransaction.objects.filter(id__in=spent).update(
+            points_remaining=Case(
+                *[When(id=credit_id, then=F('points_remaining') - amount) for credit_id, amount in spent.items()],
+                default=F('points_remaining'),
+            )
+        )
+
+def rebuild_points_remaining(user_id: int) -> int:
+    """
+    Recomputes points_remaining of the user's unexpired credits from the ledger: since
+    redemptions spend the oldest credits first, the unspent points are the newest ones, so
+    the balance (SUM of the ledger) is assigned to credits newest first. Used to backfill
+    credits written before points_remaining existed. Call it in a transaction holding the
+    user's profile row lock. Returns the balance that was distributed.
+    """
+    balance = max(
+        LoyaltyPointTransaction.objects.filter(user_id=user_id).aggregate(total=Sum('points_amount'))['total'] or 0, 0
+    )
+    credits = list(
+        LoyaltyPointTransaction.objects.select_for_update()
+        .filter(user_id=user_id, is_expired=False, points_amount__gt=0)
+        .order_by('-id')
+        .values_list('id', 'points_amount', 'points_remaining')
+    )
+    left = balance
+    changed = {}
+    for credit_id, points_amount, points_remaining in credits:
+        remaining = min(points_amount, left)
+        left -= remaining
+        if remaining != points_remaining:
+            changed[credit_id] = remaining
+    if changed:
+        LoyaltyPointTransaction.objects.filter(id__in=changed).update(
+            points_remaining=Case(
+                *[When(id=credit_id, then=remaining) for credit_id, remaining in changed.items()],
+                default=F('points_remaining'),
+            )
+        )
+    return balance
+
 # ----------------------------------------------------
 # --- 1. Post-Purchase Points Grant Function ---
 # ----------------------------------------------------
@@ -43,24 +125,20 @@ def grant_points_on_purchase(user_id: int, order_id: int, order_total: float):
         if points_earned <= 0:
             return {"success": False, "message": "No points earned for this amount."}
 
-        # 2. Fetch the user and calculate the expiration date
-        user = get_object_or_404(User, id=user_id)
-        
-        # Calculate expiration date
+        # 2. Calculate expiration date
         expiration_date = timezone.now() + timedelta(days=settings.points_expiry_days) 
 
-        # 3. Create the transaction record
-        # We don't need to update a 'current_loyalty_points' field on the User model,
-        # as the total will be calculated dynamically from LoyaltyPointTransaction records.
-        
+        # 3. Create the transaction record and update the materialized balance
         LoyaltyPointTransaction.objects.create(
-            user=user,
+            user_id=user_id,
             points_amount=points_earned,
+            points_remaining=points_earned,
             # Matched with the choices in our models.py: 'EARNED_PURCHASE'
             transaction_type='EARNED_PURCHASE', 
             related_order_id=order_id, 
             expiration_date=expiration_date
         )
+        _credit_loyalty_balance(user_id, points_earned)
 
         return {"success": True, "points_earned": points_earned}
 
@@ -105,10 +183,12 @@ def finalize_referral_reward(referee_user_id: int, order_id: int):
         LoyaltyPointTransaction.objects.create(
             user=referrer,
             points_amount=reward_points,
+            points_remaining=reward_points,
             transaction_type='EARNED_REFERRAL',
             related_order_id=order_id,
             expiration_date=expiry_date
         )
+        _credit_loyalty_balance(referrer.id, reward_points)
 
         # 3. Update the referral record status
         referral_record.reward_granted = True
@@ -121,3 +201,158 @@ def finalize_referral_reward(referee_user_id: int, order_id: int):
 
     except Exception as e:
         raise LoyaltyError(f"Failed to finalize referral reward: {str(e)}")
+
+
+# ----------------------------------------------------
+# --- 3. Points Redemption Function ---
+# ----------------------------------------------------
+@transaction.atomic
+def redeem_points(user_id: int, points: int, order_id: int = None):
+    """
+    Spends loyalty points (e.g. as a checkout discount).
+    The balance check and the deduction are a single conditional UPDATE, so two
+    concurrent redemptions can never overdraw the balance.
+    """
+    if points <= 0:
+        raise LoyaltyError("Points to redeem must be positive.")
+
+    updated = UserProfile.objects.filter(
+        user_id=user_id,
+        current_loyalty_points__gte=points
+    ).update(current_loyalty_points=F('current_loyalty_points') - points)
+
+    if not updated:
+        raise LoyaltyError("Insufficient loyalty points.")
+    _spend_oldest_credits(user_id, points)
+
+    LoyaltyPointTransaction.objects.create(
+        user_id=user_id,
+        points_amount=-points,
+        transaction_type='REDEEMED_DISCOUNT',
+        related_order_id=order_id
+    )
+    return {"success": True, "points_redeemed": points}
+
+
+@transaction.atomic
+def refund_redeemed_points(order_ids: list) -> int:
+    """
+    Gives back the points redeemed on canceled orders, set-wise: one ADJUSTMENT row per
+    redemption and one balance 'UPDATE ... CASE'. Orders already refunded are skipped, so
+    calling it twice for the same order is harmless. Returns the number of points refunded.
+    """
+    already_refunded = LoyaltyPointTransaction.objects.filter(
+        related_order_id__in=order_ids, transaction_type='ADJUSTMENT', points_amount__gt=0
+    ).values_list('related_order_id', flat=True)
+    redemptions = list(
+        LoyaltyPointTransaction.objects.filter(related_order_id__in=order_ids, transaction_type='REDEEMED_DISCOUNT')
+        .exclude(related_order_id__in=already_refunded)
+        .values_list('user_id', 'related_order_id', 'points_amount')
+    )
+    if not redemptions:
+        return 0
+
+    LoyaltyPointTransaction.objects.bulk_create([
+        # A refund is a new non-expiring credit (the spent grants may have expired since)
+        LoyaltyPointTransaction(
+            user_id=user_id, points_amount=-points_amount, points_remaining=-points_amount,
+            transaction_type='ADJUSTMENT', related_order_id=order_id
+        )
+        for user_id, order_id, points_amount in redemptions
+    ])
+    refunds = defaultdict(int)
+    for user_id, _, points_amount in redemptions:
+        refunds[user_id] -= points_amount
+    UserProfile.objects.filter(user_id__in=refunds).update(
+        current_loyalty_points=Case(
+            *[When(user_id=user_id, then=F('current_loyalty_points') + points) for user_id, points in refunds.items()],
+            default=F('current_loyalty_points'),
+        )
+    )
+    return sum(refunds.values())
+
+
+# ----------------------------------------------------
+# --- 4. Batch Points Expiry Job ---
+# ----------------------------------------------------
+def expire_loyalty_points(batch_size: int = EXPIRY_BATCH_SIZE):
+    """
+    Posts EXPIRED transactions for every earned grant past its expiration date and
+    decrements the balances set-wise. Designed to be run by a periodic scheduler (Cron/Celery).
+
+    Each batch runs in its own short transaction:
+    1. Claims unprocessed expired grants with 'FOR UPDATE SKIP LOCKED' (safe on several nodes).
+    2. Deducts only each grant's unspent remainder (points_remaining: redemptions spend the
+       oldest credits first), so points earned later are never taken. The affected profiles
+       are locked (ordered by user id) and each deduction is also capped at the balance.
+    3. Writes all EXPIRED transactions with one bulk_create, all balances with one
+       'UPDATE ... CASE', and marks the grants processed (remainder zeroed) with one bulk UPDATE.
+    Credits written before points_remaining existed must be backfilled first
+    ('manage.py reconcile_loyalty_balances --fix'), or their points never expire.
+    """
+    now = timezone.now()
+    batch_metrics = []
+    job_started = time.perf_counter()
+
+    while True:
+        batch_started = time.perf_counter()
+        with transaction.atomic():
+            # 1. Claim the next batch of expired grants
+            grants = list(
+                LoyaltyPointTransaction.objects.select_for_update(skip_locked=True)
+                .filter(is_expired=False, expiration_date__lte=now, points_amount__gt=0)
+                .order_by('id')
+                .values_list('id', 'user_id', 'points_remaining')[:batch_size]
+            )
+            if not grants:
+                break
+
+            expired_per_user = defaultdict(int)
+            for _, user_id, points_remaining in grants:
+                expired_per_user[user_id] += max(points_remaining, 0)
+
+            # 2. Lock the balances and cap the deductions
+            balances = dict(
+                UserProfile.objects.select_for_update()
+                .filter(user_id__in=expired_per_user)
+                .order_by('user_id')
+                .values_list('user_id', 'current_loyalty_points')
+            )
+            deductions = {
+                user_id: min(points, balances.get(user_id, 0))
+                for user_id, points in expired_per_user.items()
+            }
+            deductions = {user_id: points for user_id, points in deductions.items() if points > 0}
+
+            # 3. Post the ledger entries and apply the balances set-wise
+            LoyaltyPointTransaction.objects.bulk_create([
+                LoyaltyPointTransaction(user_id=user_id, points_amount=-points, transaction_type='EXPIRED')
+                for user_id, points in deductions.items()
+            ])
+            if deductions:
+                UserProfile.objects.filter(user_id__in=deductions).update(
+                    current_loyalty_points=Case(
+                        *[When(user_id=user_id, then=F('current_loyalty_points') - points) for user_id, points in deductions.items()],
+                        default=F('current_loyalty_points'),
+                    )
+                )
+            LoyaltyPointTransaction.objects.filter(id__in=[grant[0] for grant in grants]).update(
+                is_expired=True, points_remaining=0
+            )
+
+        elapsed = time.perf_counter() - batch_started
+        batch_metrics.append({
+            'grants_expired': len(grants),
+            'users_debited': len(deductions),
+            'points_expired': sum(deductions.values()),
+            'duration_ms': round(elapsed * 1000, 3),
+        })
+
+    return {
+        "success": True,
+        "grants_expired": sum(batch['grants_expired'] for batch in batch_metrics),
+        "points_expired": sum(batch['points_expired'] for batch in batch_metrics),
+        "batches": len(batch_metrics),
+        "duration_ms": round((time.perf_counter() - job_started) * 1000, 3),
+        "batch_metrics": batch_metrics,
+    }
@@ -1,10 +1,11 @@
 from rest_framework import generics, permissions, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from django.db.models import Sum
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
 
+from accounts.models import UserProfile
+from core.pagination import TimestampKeysetPagination
 from .models import Referral, LoyaltyPointTransaction, GrowthSettings
 from .serializers import (
     ReferralCreateSerializer, 
@@ -86,12 +87,11 @@ class LoyaltySummaryAPIView(APIView):
     def get(self, request, *args, **kwargs):
         user = request.user
         
-        # Calculate the total non-expired points
-        # Sum the points_amount for all transactions that have not expired yet
-        total_points = LoyaltyPointTransaction.objects.filter(
-            user=user,
-            expiration_date__gt=timezone.now() # Only count non-expired points
-        ).aggregate(Sum('points_amount'))['points_amount__sum'] or 0
+        # Read the materialized balance: a single-row lookup on the unique user key.
+        # It is kept in sync with the ledger by growth.services (expiry included).
+        total_points = UserProfile.objects.filter(user_id=user.id).values_list(
+            'current_loyalty_points', flat=True
+        ).first() or 0
         
         # Load growth settings
         settings = GrowthSettings.load()
@@ -113,10 +113,12 @@ class LoyaltySummaryAPIView(APIView):
 # ----------------------------------------------------
 class LoyaltyTransactionListAPIView(generics.ListAPIView):
     """
-    Lists all loyalty point transactions for the currently authenticated user.
+    Lists the loyalty point transactions of the currently authenticated user,
+    newest first, one keyset page at a time.
     """
     serializer_class = LoyaltyPointTransactionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = TimestampKeysetPagination # (timestamp, id) cursor, see loyalty_user_cursor_idx
     
     def get_queryset(self):
         # Return transactions for the logged-in user only
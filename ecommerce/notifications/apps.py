@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class NotificationsConfig(AppConfig):
+    name = 'notifications'
+
+    def ready(self):
+        # Register the unread counter signal handlers
+        from . import signals  # noqa: F401
@@ -0,0 +1,63 @@
+# File: tec/ecommerce/notifications/backends.py
+
+import threading
+import time
+from django.core.mail.backends.base import BaseEmailBackend
+
+# ----------------------------------------------------
+# Local SMTP Stand-in
+# ----------------------------------------------------
+class LocalSMTPBackend(BaseEmailBackend):
+    """
+    In-process stand-in for an SMTP server, used by tests and dispatcher benchmarks.
+    Delivered messages are kept in LocalSMTPBackend.outbox, and connections_opened counts
+    how many SMTP sessions were started (to verify that batches reuse one connection).
+    Optional latencies simulate the SMTP handshake and the per-message round-trip.
+    """
+
+    outbox = []
+    connections_opened = 0
+    connect_latency_ms = 0
+    send_latency_ms = 0
+    _lock = threading.Lock()
+
+    def __init__(self, fail_silently=False, **kwargs):
+        super().__init__(fail_silently=fail_silently, **kwargs)
+        self._is_open = False
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls.outbox = []
+            cls.connections_opened = 0
+
+    def open(self):
+        if self._is_open:
+            return False
+        if self.connect_latency_ms:
+            time.sleep(self.connect_latency_ms / 1000.0)
+        with self._lock:
+            LocalSMTPBackend.connections_opened += 1
+        self._is_open = True
+        return True
+
+    def close(self):
+        self._is_open = False
+
+    def send_messages(self, email_messages):
+        if not email_messages:
+            return 0
+        new_connection = self.open()
+        try:
+            sent = 0
+            for message in email_messages:
+                if self.send_latency_ms:
+                    time.sleep(self.send_latency_ms / 1000.0)
+                message.message() # Render like a real backend would
+                with self._lock:
+                    LocalSMTPBackend.outbox.append(message)
+                sent += 1
+            return sent
+        finally:
+            if new_connection:
+                self.close()
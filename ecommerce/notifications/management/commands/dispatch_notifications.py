@@ -0,0 +1,32 @@
+# File: tec/ecommerce/notifications/management/commands/dispatch_notifications.py
+
+import time
+from django.core.management.base import BaseCommand
+
+from notifications.services import run_email_dispatch_workers
+
+
+class Command(BaseCommand):
+    """
+    Drains the notification email outbox with a pool of dispatcher workers.
+    Example: python manage.py dispatch_notifications --workers 8 --loop
+    """
+    help = 'Delivers pending notification emails in batches over reused SMTP connections.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None)
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--loop', action='store_true', help='Keep polling the outbox instead of exiting when drained.')
+        parser.add_argument('--poll-interval', type=float, default=2.0)
+
+    def handle(self, *args, **options):
+        while True:
+            result = run_email_dispatch_workers(workers=options['workers'], batch_size=options['batch_size'])
+            if result['batches']:
+                self.stdout.write(
+                    f"Sent {result['sent']} emails ({result['failed']} failed) in {result['batches']} batches, "
+                    f"{result['duration_ms']:.0f} ms, {result['emails_per_sec']} emails/sec"
+                )
+            if not options['loop']:
+                break
+            time.sleep(options['poll_interval'])
@@ -0,0 +1,73 @@
+# File: tec/ecommerce/notifications/management/commands/reconcile_notification_counters.py
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from notifications.models import Notification, NotificationCounter
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """
+    Verifies that every maintained unread counter (NotificationCounter.unread_count) equals
+    COUNT(*) of the user's unread notifications. Also backfills the counters of users whose
+    notifications predate the counter table (run it once after deploying the counters).
+    Example: python manage.py reconcile_notification_counters --fix
+    """
+    help = 'Checks unread notification counters against the notifications and optionally repairs them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--fix', action='store_true', help='Create missing counters and rewrite mismatched ones.')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        checked = 0
+        mismatches = 0
+        last_user_id = 0
+
+        while True:
+            # Walk users in id order, one chunk at a time
+            user_ids = list(
+                User.objects.filter(id__gt=last_user_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+            )
+            if not user_ids:
+                break
+            last_user_id = user_ids[-1]
+
+            counters = dict(
+                NotificationCounter.objects.filter(user_id__in=user_ids).values_list('user_id', 'unread_count')
+            )
+            unread = dict(
+                Notification.objects.filter(user_id__in=user_ids, is_read=False)
+                .order_by()
+                .values('user_id')
+                .annotate(total=Count('id'))
+                .values_list('user_id', 'total')
+            )
+
+            for user_id in user_ids:
+                checked += 1
+                counter = counters.get(user_id)
+                expected = unread.get(user_id, 0)
+                if counter == expected or (counter is None and not expected):
+                    continue
+
+                mismatches += 1
+                self.stdout.write(f"User {user_id}: counter={counter} unread={expected}")
+                if options['fix']:
+                    with transaction.atomic():
+                        # Recount under the counter's row lock: concurrent increments/decrements
+                        # wait for it and then apply on top of the recount
+                        NotificationCounter.objects.bulk_create(
+                            [NotificationCounter(user_id=user_id)], ignore_conflicts=True
+                        )
+                        NotificationCounter.objects.select_for_update().filter(user_id=user_id).first()
+                        total = Notification.objects.filter(user_id=user_id, is_read=False).count()
+                        NotificationCounter.objects.filter(user_id=user_id).update(unread_count=total)
+
+        verdict = 'fixed' if options['fix'] else 'found'
+        self.stdout.write(f"Checked {checked} counters, {mismatches} mismatches {verdict}.")
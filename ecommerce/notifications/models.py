@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
 
@@ -27,6 +28,14 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False, verbose_name=_('Is Read'))
     is_sent = models.BooleanField(default=False, verbose_name=_('Is Sent Successfully'))
     
+    # Outbox: rows with email_requested=True and is_sent=False are drained by the email dispatcher
+    email_requested = models.BooleanField(default=False, verbose_name=_('Email Requested'))
+    email_attempts = models.PositiveSmallIntegerField(default=0, verbose_name=_('Email Delivery Attempts'))
+    # Lease taken by a dispatcher worker while the email is being sent (no transaction held)
+    email_claimed_at = models.DateTimeField(null=True, blank=True, verbose_name=_('Email Claimed At'))
+    # Failed sends are retried with exponential backoff, not before this time
+    email_next_attempt_at = models.DateTimeField(null=True, blank=True, verbose_name=_('Next Email Attempt At'))
+    
     # Optional Link
     related_object_id = models.IntegerField(null=True, blank=True, verbose_name=_('Related Object ID'))
     
@@ -41,3 +50,36 @@ class Notification(models.Model):
         verbose_name = _('Notification')
         verbose_name_plural = _('Notifications')
         ordering = ('-created_at',)
+        indexes = [
+            # Keyset pagination of the per-user list (newest first)
+            models.Index(fields=['user', '-created_at', '-id'], name='notification_user_cursor_idx'),
+            # Same, filtered by read status
+            models.Index(fields=['user', 'is_read', '-created_at', '-id'], name='notification_user_read_idx'),
+            # Partial index holding only the undelivered email outbox (stays small)
+            models.Index(
+                fields=['id'],
+                condition=Q(email_requested=True, is_sent=False),
+                name='notification_outbox_idx'
+            ),
+        ]
+
+
+class NotificationCounter(models.Model):
+    """
+    Maintained per-user unread notification count, so badge polling is a single-row
+    primary key lookup instead of a COUNT(*) over the user's notifications.
+    Updated by notifications.services whenever notifications are created or read, and by
+    notifications.signals when they are deleted. 'manage.py reconcile_notification_counters'
+    backfills and repairs it.
+    """
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True,
+                                related_name='notification_counter', verbose_name=_('User'))
+    unread_count = models.PositiveIntegerField(default=0, verbose_name=_('Unread Notifications'))
+
+    def __str__(self):
+        return f"{self.unread_count} unread for user #{self.user_id}"
+
+    class Meta:
+        verbose_name = _('Notification Counter')
+        verbose_name_plural = _('Notification Counters')
@@ -1,13 +1,27 @@
 # File: tec/ecommerce/notifications/services.py
 
-from django.core.mail import send_mail
+import smtplib
+import time
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from django.core.mail import send_mail, get_connection, EmailMessage
 from django.conf import settings
-from .models import Notification
+from django.db import connection as db_connection, transaction
+from collections import Counter, defaultdict
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from .models import Notification, NotificationCounter
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+# --- Constants ---
+MAX_EMAIL_ATTEMPTS = 5 # Outbox rows failing this many times are left for manual review
+SEGMENT_CHUNK_SIZE = 2000 # Recipient ids streamed and inserted per bulk_create in notify_segment
+EMAIL_CLAIM_LEASE = timedelta(minutes=10) # A claim older than this (crashed worker) can be re-claimed
+EMAIL_RETRY_BASE_DELAY = timedelta(minutes=1) # Retry delay after the first failed send, doubled per attempt
+
 # ----------------------------------------------------
 # 1. Email Sender Function
 # ----------------------------------------------------
@@ -19,46 +33,357 @@ def send_email_notification(recipient_email: str, subject: str, body: str):
             body,
             settings.DEFAULT_FROM_EMAIL,
             [recipient_email],
-            fail_silently=False, 
+            fail_silently=False,
         )
         return True
     except Exception as e:
         print(f"Error sending email to {recipient_email}: {e}")
         return False
 
+
+def _email_subject(notification_type: str) -> str:
+    # Assuming PROJECT_NAME is defined in settings
+    project_name = getattr(settings, 'PROJECT_NAME', 'ECommerce Platform')
+    return f"[{notification_type} Update] - {project_name}"
+
+# ----------------------------------------------------
+# 2. Unread Counters
+# ----------------------------------------------------
+def _increment_unread_counts(counts: dict):
+    """
+    Adds {user_id: new_unread} to the maintained counters: one INSERT for missing
+    counter rows, then one UPDATE per distinct increment (almost always just one).
+    MUST be called in the same transaction as the notification INSERT.
+    """
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=user_id) for user_id in counts],
+        ignore_conflicts=True
+    )
+    users_by_increment = defaultdict(list)
+    for user_id, increment in counts.items():
+        users_by_increment[increment].append(user_id)
+    for increment, user_ids in users_by_increment.items():
+        NotificationCounter.objects.filter(user_id__in=user_ids).update(
+            unread_count=F('unread_count') + increment
+        )
+
+
+def _decrement_unread_count(user_id: int, amount: int):
+    if amount > 0:
+        NotificationCounter.objects.filter(user_id=user_id).update(
+            unread_count=Greatest(F('unread_count') - amount, 0)
+        )
+
+
+def get_unread_count(user_id: int) -> int:
+    """ Returns the user's unread notification count (single-row primary key lookup). """
+    return NotificationCounter.objects.filter(user_id=user_id).values_list(
+        'unread_count', flat=True
+    ).first() or 0
+
+
+@transaction.atomic
+def mark_notification_read(notification: Notification) -> bool:
+    """ Marks one notification as read and decrements the counter. Returns False if it was already read. """
+    read_at = timezone.now()
+    # Conditional UPDATE: two concurrent requests cannot both decrement the counter
+    updated = Notification.objects.filter(pk=notification.pk, is_read=False).update(
+        is_read=True,
+        read_at=read_at
+    )
+    if updated:
+        _decrement_unread_count(notification.user_id, updated)
+        notification.is_read = True
+        notification.read_at = read_at
+    return bool(updated)
+
+
+@transaction.atomic
+def mark_all_notifications_read(user_id: int) -> int:
+    """ Marks every unread notification of a user as read. Returns the number updated. """
+    updated_count = Notification.objects.filter(
+        user_id=user_id,
+        is_read=False
+    ).update(
+        is_read=True,
+        read_at=timezone.now()
+    )
+    _decrement_unread_count(user_id, updated_count)
+    return updated_count
+
 # ----------------------------------------------------
-# 2. Main Notification Creator and Sender
+# 3. Main Notification Creator (Outbox)
 # ----------------------------------------------------
+@transaction.atomic
 def create_and_send_notification(user: User, message: str, notification_type: str, related_id: int = None, send_email: bool = False):
     """
-    Creates the notification record in the database and sends it via requested channels.
+    Creates the notification record in the database.
+    Email delivery is not done in the request: the row is flagged as an outbox entry
+    and delivered by the email dispatcher (dispatch_pending_emails).
     """
-    
-    # 1. Create and save the notification record
     notification = Notification.objects.create(
         user=user,
         message=message,
         notification_type=notification_type,
         related_object_id=related_id,
-        is_sent=False 
+        is_sent=False,
+        email_requested=bool(send_email and user.email)
     )
-    
-    email_sent = False
-    
-    # 2. Send via Email (if requested and user has email)
-    if send_email and user.email:
-        # Assuming PROJECT_NAME is defined in settings
-        project_name = getattr(settings, 'PROJECT_NAME', 'ECommerce Platform') 
-        subject = f"[{notification_type} Update] - {project_name}" 
-        email_sent = send_email_notification(
-            recipient_email=user.email,
-            subject=subject,
-            body=message
-        )
-    
-    # 3. Update the notification status
-    if email_sent: 
-        notification.is_sent = True
-        notification.save(update_fields=['is_sent'])
-        
+    _increment_unread_counts({user.id: 1})
     return notification
+
+
+@transaction.atomic
+def create_notifications(user_ids: list, message: str, notification_type: str, related_id: int = None, send_email: bool = False):
+    """ Creates one notification per user id with a single bulk INSERT. Returns the number created. """
+    _increment_unread_counts(Counter(user_ids))
+    notifications = Notification.objects.bulk_create([
+        Notification(
+            user_id=user_id,
+            message=message,
+            notification_type=notification_type,
+            related_object_id=related_id,
+            is_sent=False,
+            email_requested=send_email
+        )
+        for user_id in user_ids
+    ])
+    return len(notifications)
+
+# ----------------------------------------------------
+# 4. Segment Fan-out
+# ----------------------------------------------------
+def _segment_user_ids(segment):
+    """
+    Normalizes a segment into a flat queryset of user ids.
+    Accepts a filter spec dict applied to User (e.g. {'is_seller': True}), a User queryset,
+    or any flat values_list of user ids (e.g. from Order or LoyaltyPointTransaction).
+    """
+    if isinstance(segment, dict):
+        return User.objects.filter(**segment).values_list('id', flat=True)
+    if segment.model is User:
+        return segment.values_list('id', flat=True)
+    return segment
+
+
+def product_buyers_segment(product_id: int):
+    """ Segment of every user who bought the given product. """
+    from orders.models import Order
+    return Order.objects.filter(items__product_id=product_id).values_list('customer_id', flat=True).distinct()
+
+
+def expiring_points_segment(within_days: int = 7):
+    """ Segment of every user holding loyalty points that expire within the given number of days. """
+    from growth.models import LoyaltyPointTransaction
+    return LoyaltyPointTransaction.objects.filter(
+        is_expired=False,
+        points_amount__gt=0,
+        expiration_date__lte=timezone.now() + timedelta(days=within_days)
+    ).values_list('user_id', flat=True).distinct()
+
+
+def notify_segment(segment, message: str, notification_type: str, related_id: int = None,
+                   send_email: bool = False, chunk_size: int = SEGMENT_CHUNK_SIZE):
+    """
+    Notifies every user of a segment in one call.
+    Recipient ids are streamed from the DB with iterator(chunk_size) (no User objects are
+    materialized) and written with one bulk_create per chunk, so memory stays flat whatever
+    the segment size. Email delivery is only enqueued (email_requested) and left to the
+    outbox dispatcher.
+    """
+    started = time.perf_counter()
+    created = 0
+    chunk = []
+
+    for user_id in _segment_user_ids(segment).order_by().iterator(chunk_size=chunk_size):
+        chunk.append(user_id)
+        if len(chunk) >= chunk_size:
+            created += create_notifications(chunk, message, notification_type, related_id, send_email)
+            chunk = []
+
+    if chunk:
+        created += create_notifications(chunk, message, notification_type, related_id, send_email)
+
+    elapsed = time.perf_counter() - started
+    return {
+        'notifications_created': created,
+        'duration_ms': round(elapsed * 1000, 3),
+        'notifications_per_sec': round(created / elapsed, 1) if elapsed else None,
+    }
+
+# ----------------------------------------------------
+# 5. Email Outbox Dispatcher
+# ----------------------------------------------------
+# Each batch goes through three steps, so no DB transaction or row lock is held while SMTP
+# is talking to the network:
+# 1. Claim: a short transaction picks a batch with 'FOR UPDATE SKIP LOCKED' (several workers
+#    drain the outbox side by side) and stamps email_claimed_at (a lease), then commits.
+# 2. Send: one message per call over the worker's SMTP session, reopened if SMTP drops it.
+# 3. Record: one bulk UPDATE per outcome, which also clears the lease. A failed row is not
+#    retried before email_next_attempt_at (exponential backoff).
+# A run tries each row at most once and stops at the first batch that sends nothing, so an
+# SMTP outage cannot burn every row's MAX_EMAIL_ATTEMPTS within seconds.
+# A worker dying between 1 and 3 leaves leased rows that are re-claimed after EMAIL_CLAIM_LEASE.
+
+def _claim_email_batch(batch_size: int, exclude_ids=()) -> list:
+    """
+    Claims up to batch_size outbox rows that are due, skipping exclude_ids (already tried in
+    this run). Returns [(id, message, notification_type, email, email_attempts)].
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            Notification.objects.select_for_update(skip_locked=True, of=('self',))
+            .filter(email_requested=True, is_sent=False, email_attempts__lt=MAX_EMAIL_ATTEMPTS)
+            .filter(Q(email_claimed_at__isnull=True) | Q(email_claimed_at__lt=now - EMAIL_CLAIM_LEASE))
+            .filter(Q(email_next_attempt_at__isnull=True) | Q(email_next_attempt_at__lte=now))
+            .exclude(id__in=exclude_ids)
+            .order_by('id')
+            .values_list('id', 'message', 'notification_type', 'user__email', 'email_attempts')[:batch_size]
+        )
+        if rows:
+            Notification.objects.filter(id__in=[row[0] for row in rows]).update(email_claimed_at=now)
+    return rows
+
+
+def _reopen_mail_connection(mail_connection):
+    """ Replaces a broken SMTP session. Returns False if the server is still unreachable. """
+    mail_connection.close()
+    try:
+        mail_connection.open()
+        return True
+    except Exception as e:
+        print(f"Error reopening SMTP connection: {e}")
+        return False
+
+
+def _record_failed_emails(failed_attempts: dict):
+    """ {notification_id: attempts so far}: counts the attempt and schedules the retry (one UPDATE per delay). """
+    now = timezone.now()
+    ids_by_attempts = defaultdict(list)
+    for notification_id, attempts in failed_attempts.items():
+        ids_by_attempts[attempts].append(notification_id)
+    for attempts, notification_ids in ids_by_attempts.items():
+        Notification.objects.filter(id__in=notification_ids).update(
+            email_attempts=F('email_attempts') + 1,
+            email_claimed_at=None,
+            email_next_attempt_at=now + EMAIL_RETRY_BASE_DELAY * (2 ** attempts),
+        )
+
+
+def _dispatch_batch(mail_connection, batch_size: int, attempted_ids: set):
+    """
+    Claims, sends and records one batch of outbox rows; adds the claimed ids to attempted_ids.
+    Returns (sent_count, failed_count), or None when no row is due.
+    """
+    rows = _claim_email_batch(batch_size, attempted_ids)
+    if not rows:
+        return None
+    attempted_ids.update(row[0] for row in rows)
+
+    sent_ids = []
+    failed_attempts = {}
+    no_email_ids = []
+    for notification_id, message, notification_type, email, attempts in rows:
+        if not email:
+            no_email_ids.append(notification_id)
+            continue
+        email_message = EmailMessage(
+            _email_subject(notification_type),
+            message,
+            settings.DEFAULT_FROM_EMAIL,
+            [email],
+            connection=mail_connection
+        )
+        try:
+            # Same SMTP session for the whole batch; one message per call so
+            # a single bad address does not fail its neighbours.
+            mail_connection.send_messages([email_message])
+            sent_ids.append(notification_id)
+        except (smtplib.SMTPException, OSError) as e:
+            print(f"Error sending notification {notification_id} to {email}: {e}")
+            failed_attempts[notification_id] = attempts
+            # The session may be dead (disconnect, timeout): the next message gets a fresh one
+            _reopen_mail_connection(mail_connection)
+        except Exception as e:
+            print(f"Error sending notification {notification_id} to {email}: {e}")
+            failed_attempts[notification_id] = attempts
+
+    # One bulk UPDATE per outcome (autocommit: a sent email is recorded even if a later update fails)
+    if sent_ids:
+        Notification.objects.filter(id__in=sent_ids).update(is_sent=True, email_claimed_at=None)
+    if failed_attempts:
+        _record_failed_emails(failed_attempts)
+    if no_email_ids:
+        Notification.objects.filter(id__in=no_email_ids).update(email_requested=False, email_claimed_at=None)
+
+    return len(sent_ids), len(failed_attempts)
+
+
+def dispatch_pending_emails(batch_size: int = None, max_batches: int = None):
+    """
+    Drains the email outbox in batches over ONE reused SMTP connection.
+    Returns per-batch throughput metrics.
+    """
+    batch_size = batch_size or settings.NOTIFICATION_DISPATCH_BATCH_SIZE
+    batch_metrics = []
+    attempted_ids = set() # Failed rows get their lease cleared; never re-claim them in this run
+    mail_connection = get_connection(fail_silently=False)
+    mail_connection.open()
+    try:
+        while max_batches is None or len(batch_metrics) < max_batches:
+            batch_started = time.perf_counter()
+            result = _dispatch_batch(mail_connection, batch_size, attempted_ids)
+            if result is None:
+                break
+            sent, failed = result
+            elapsed = time.perf_counter() - batch_started
+            batch_metrics.append({
+                'sent': sent,
+                'failed': failed,
+                'duration_ms': round(elapsed * 1000, 3),
+                'emails_per_sec': round(sent / elapsed, 1) if elapsed else None,
+            })
+            if failed and not sent:
+                # SMTP is rejecting everything: leave the rest for the next run
+                print(f"Email dispatch stopped: batch of {failed} failed sends sent none.")
+                break
+    finally:
+        mail_connection.close()
+
+    return {
+        'sent': sum(batch['sent'] for batch in batch_metrics),
+        'failed': sum(batch['failed'] for batch in batch_metrics),
+        'batches': len(batch_metrics),
+        'batch_metrics': batch_metrics,
+    }
+
+
+def run_email_dispatch_workers(workers: int = None, batch_size: int = None):
+    """
+    Runs a pool of dispatcher workers until the outbox is drained.
+    Each worker holds its own DB and SMTP connection.
+    """
+    workers = workers or settings.NOTIFICATION_DISPATCH_WORKERS
+
+    def worker(_):
+        try:
+            return dispatch_pending_emails(batch_size=batch_size)
+        finally:
+            db_connection.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(worker, range(workers)))
+    elapsed = time.perf_counter() - started
+
+    sent = sum(result['sent'] for result in results)
+    return {
+        'workers': workers,
+        'sent': sent,
+        'failed': sum(result['failed'] for result in results),
+        'batches': sum(result['batches'] for result in results),
+        'duration_ms': round(elapsed * 1000, 3),
+        'emails_per_sec': round(sent / elapsed, 1) if elapsed else None,
+        'worker_metrics': results,
+    }
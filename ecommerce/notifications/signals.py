@@ -0,0 +1,15 @@
+# File: tec/ecommerce/notifications/signals.py
+
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .services import _decrement_unread_count
+
+# ----------------------------------------------------
+# Unread Counter Maintenance
+# ----------------------------------------------------
+@receiver(post_delete, sender='notifications.Notification')
+def decrement_counter_on_delete(sender, instance, **kwargs):
+    """ Deleting an unread notification (directly, in bulk or by cascade) lowers the counter. """
+    if not instance.is_read:
+        _decrement_unread_count(instance.user_id, 1)
@@ -2,7 +2,8 @@ from django.urls import path
 from .views import (
     NotificationListView, 
     NotificationMarkAsReadView, 
-    NotificationMarkAllAsReadView
+    NotificationMarkAllAsReadView,
+    NotificationUnreadCountView
 )
 
 # Define the namespace for this app's URLs
@@ -33,4 +34,12 @@ urlpatterns = [
         NotificationMarkAllAsReadView.as_view(), 
         name='mark-all-as-read'
     ),
+
+    # 4. Unread Count for badges (served from a maintained counter)
+    # GET /api/notifications/unread-count/
+    path(
+        'unread-count/', 
+        NotificationUnreadCountView.as_view(), 
+        name='unread-count'
+    ),
 ]
@@ -3,9 +3,11 @@
 from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from django.utils import timezone
+from rest_framework.views import APIView
+from core.pagination import CreatedAtKeysetPagination
 from .models import Notification
 from .serializers import NotificationSerializer
+from .services import get_unread_count, mark_notification_read, mark_all_notifications_read
 
 # ----------------------------------------------------
 # 1. Notification List View (Fetch user's notifications)
@@ -15,6 +17,7 @@ class NotificationListView(generics.ListAPIView):
     
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = CreatedAtKeysetPagination # (created_at, id) cursor, see notification_user_cursor_idx
 
     def get_queryset(self):
         # Filter notifications for the current user and order by creation time (newest first)
@@ -47,11 +50,9 @@ class NotificationMarkAsReadView(generics.UpdateAPIView):
             return Response({"detail": "Not authorized to access this notification."}, 
                             status=status.HTTP_403_FORBIDDEN)
         
-        # Update status if it's not already read
+        # Update status if it's not already read (also decrements the unread counter)
         if not instance.is_read:
-            instance.is_read = True
-            instance.read_at = timezone.now()
-            instance.save(update_fields=['is_read', 'read_at'])
+            mark_notification_read(instance)
             
         return Response(NotificationSerializer(instance).data, status=status.HTTP_200_OK)
 
@@ -65,14 +66,20 @@ class NotificationMarkAllAsReadView(generics.UpdateAPIView):
     permission_classes = [IsAuthenticated]
     
     def update(self, request, *args, **kwargs):
-        # Bulk update all unread notifications for the current user
-        updated_count = Notification.objects.filter(
-            user=request.user, 
-            is_read=False
-        ).update(
-            is_read=True, 
-            read_at=timezone.now()
-        )
+        # Bulk update all unread notifications for the current user (and the unread counter)
+        updated_count = mark_all_notifications_read(request.user.id)
         
         return Response({"message": f"Successfully marked {updated_count} notifications as read."}, 
                         status=status.HTTP_200_OK)
+
+
+# ----------------------------------------------------
+# 4. Unread Count (Badge Polling)
+# ----------------------------------------------------
+class NotificationUnreadCountView(APIView):
+    """ Returns the current user's unread notification count from the maintained counter (O(1)). """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        return Response({"unread_count": get_unread_count(request.user.id)}, status=status.HTTP_200_OK)
@@ -0,0 +1,138 @@
+# File: tec/ecommerce/orders/async_views.py
+
+import json
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .services import aprocess_secure_order, acomplete_order_for_buyer, averify_order_escrow
+from .idempotency import (
+    IDEMPOTENCY_HEADER, MAX_KEY_LENGTH, IdempotencyConflict, IdempotencyInProgress,
+    request_fingerprint, arun_idempotent
+)
+from .views import checkout_missing_fields, checkout_result, checkout_error, completion_status
+
+# ----------------------------------------------------
+# Async Order Endpoints (ASGI)
+# ----------------------------------------------------
+# Async versions of the hot order endpoints, served natively by core.asgi.application
+# (e.g. 'uvicorn core.asgi:application'). While a checkout awaits its Pi round-trips the
+# worker serves other requests, so one worker keeps hundreds of checkouts in flight instead
+# of one per sync worker. DRF's APIView is sync-only, so these are plain async Django views
+# with the same JWT authentication, request bodies and responses as views.py.
+
+@method_decorator(csrf_exempt, name='dispatch') # Token-authenticated API, like the DRF views
+class AsyncOrderAPIView(View):
+    """ Base async view: JWT authentication (IsAuthenticated) and JSON request/response bodies. """
+    authentication = JWTAuthentication()
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            # Token validation is cheap, but loading the user is a DB query
+            user_auth = await sync_to_async(self.authentication.authenticate)(request)
+        except AuthenticationFailed as e:
+            # Same body as DRF's exception handler
+            body = e.detail if isinstance(e.detail, dict) else {'detail': e.detail}
+            return JsonResponse(body, status=status.HTTP_401_UNAUTHORIZED)
+        if user_auth is None:
+            return JsonResponse(
+                {'detail': 'Authentication credentials were not provided.'}, status=status.HTTP_401_UNAUTHORIZED
+            )
+        request.user = user_auth[0]
+        return await super().dispatch(request, *args, **kwargs)
+
+    @staticmethod
+    def parse_json(request) -> dict:
+        """ The JSON request body as a dict ({} when empty). Raises ValueError if malformed. """
+        data = json.loads(request.body or b'{}')
+        if not isinstance(data, dict):
+            raise ValueError('JSON body must be an object.')
+        return data
+
+
+# --- 1. Create Order and Lock Funds (Async Checkout API) ---
+class AsyncCheckoutAPIView(AsyncOrderAPIView):
+    """ Async CheckoutPiAPIView: same payload, Idempotency-Key handling and responses. """
+
+    async def post(self, request):
+        try:
+            data = self.parse_json(request)
+        except ValueError as e:
+            return JsonResponse({"error": f"Malformed JSON body: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not idempotency_key:
+            status_code, body = await self.checkout(request.user, data)
+            return JsonResponse(body, status=status_code)
+
+        if len(idempotency_key) > MAX_KEY_LENGTH:
+            return JsonResponse({"error": f"{IDEMPOTENCY_HEADER} is too long."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            status_code, body, replayed = await arun_idempotent(
+                request.user.id,
+                idempotency_key,
+                request_fingerprint(data),
+                lambda: self.checkout(request.user, data)
+            )
+        except IdempotencyConflict as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        except IdempotencyInProgress as e:
+            response = JsonResponse({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+            response['Retry-After'] = '1'
+            return response
+
+        response = JsonResponse(body, status=status_code)
+        if replayed:
+            response['Idempotent-Replayed'] = 'true'
+        return response
+
+    async def checkout(self, user, data: dict):
+        """ Runs the checkout once. Returns (status_code, body). """
+        cart_data = data.get('cart_items', [])
+        shipping_address = data.get('shipping_address')
+        seller_pi_address = data.get('seller_pi_address')
+
+        if not cart_data or not shipping_address or not seller_pi_address:
+            return checkout_missing_fields()
+
+        try:
+            result = await aprocess_secure_order(
+                user=user, cart_data=cart_data, seller_pi_address=seller_pi_address,
+                loyalty_points=data.get('redeem_points', 0)
+            )
+            return checkout_result(result)
+        except Exception as e:
+            return checkout_error(e)
+
+
+# --- 2. Escrow Status Verification API ---
+class AsyncEscrowVerifyAPIView(AsyncOrderAPIView):
+    """ Lets the buyer check the live Pi escrow status of one of their orders. """
+
+    async def get(self, request, order_id):
+        result = await averify_order_escrow(request.user, order_id)
+        if not result.pop('success'):
+            if result['error'] == 'Order not found.':
+                response_status = status.HTTP_404_NOT_FOUND
+            elif result.get('unavailable'):
+                response_status = status.HTTP_503_SERVICE_UNAVAILABLE
+            else:
+                response_status = status.HTTP_400_BAD_REQUEST
+            return JsonResponse({"error": result['error']}, status=response_status)
+        return JsonResponse(result, status=status.HTTP_200_OK)
+
+
+# --- 3. Order Completion/Funds Release API ---
+class AsyncCompleteOrderAPIView(AsyncOrderAPIView):
+    """ Async CompleteOrderAPIView: the buyer confirms delivery and the escrow is released. """
+
+    async def post(self, request, order_id):
+        result = await acomplete_order_for_buyer(request.user, order_id)
+        if not result.get('success'):
+            return JsonResponse({"error": result['error']}, status=completion_status(result))
+        return JsonResponse({"message": result['message']}, status=status.HTTP_200_OK)
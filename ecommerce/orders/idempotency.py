@@ -0,0 +1,184 @@
+# File: tec/ecommerce/orders/idempotency.py
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+# --- Constants ---
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+IN_FLIGHT_TIMEOUT = 120 # Seconds an in-flight marker survives a crashed worker
+WAIT_POLL_SECONDS = 0.05
+
+# Stored entry states (entries are compact tuples)
+_IN_FLIGHT = 'P' # ('P', fingerprint)
+_DONE = 'D' # ('D', fingerprint, status_code, body)
+
+
+class IdempotencyConflict(Exception):
+    """ The key was already used with a different request payload. """
+    pass
+
+
+class IdempotencyInProgress(Exception):
+    """ The first request with this key is still running after the wait timeout. """
+    pass
+
+
+# ----------------------------------------------------
+# Idempotency Key Store
+# ----------------------------------------------------
+# One shared-cache entry per (user, key): an in-flight marker created with cache.add()
+# (atomic, so exactly one request executes), replaced by the final response.
+# - Completed duplicates get the stored response in O(1): one cache read, no Order
+#   query and no Pi SDK call.
+# - In-flight duplicates wait for the first request's result: on a local Event when the
+#   first request runs in the same worker, by polling the shared entry otherwise.
+# - Server errors (5xx / exceptions) are not stored, so the client may retry them.
+
+_local_events = {}
+_local_events_lock = threading.Lock()
+
+
+def _store_key(user_id: int, key: str) -> str:
+    return f"idempotency:{user_id}:{hashlib.sha256(key.encode('utf-8')).hexdigest()}"
+
+
+def request_fingerprint(data) -> str:
+    """ Hash of the request payload, to detect a key reused for a different request. """
+    payload = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _stored_response(entry, fingerprint: str):
+    if entry[1] != fingerprint:
+        raise IdempotencyConflict('Idempotency-Key reused with a different request payload.')
+    if entry[0] == _DONE:
+        return entry[2], entry[3]
+    return None
+
+
+def _wait_for_result(store_key: str, fingerprint: str, wait_seconds: float):
+    # One deadline for both phases: a duplicate never waits longer than wait_seconds in total
+    deadline = time.monotonic() + wait_seconds
+    with _local_events_lock:
+        event = _local_events.get(store_key)
+    if event is not None:
+        event.wait(wait_seconds)
+
+    while True:
+        entry = cache.get(store_key)
+        if entry is None:
+            # The first request failed (not stored): the caller should retry
+            raise IdempotencyInProgress('The original request did not complete; retry.')
+        result = _stored_response(entry, fingerprint)
+        if result is not None:
+            return result
+        if time.monotonic() >= deadline:
+            raise IdempotencyInProgress('A request with this Idempotency-Key is still being processed.')
+        time.sleep(WAIT_POLL_SECONDS)
+
+
+def run_idempotent(user_id: int, key: str, fingerprint: str, execute, wait_seconds: float = None):
+    """
+    Runs execute() -> (status_code, body) at most once per (user_id, key).
+    Returns (status_code, body, replayed). Raises IdempotencyConflict or IdempotencyInProgress.
+    """
+    wait_seconds = wait_seconds if wait_seconds is not None else settings.IDEMPOTENCY_WAIT_SECONDS
+    store_key = _store_key(user_id, key)
+
+    # Fast path: completed duplicate
+    entry = cache.get(store_key)
+    if entry is not None:
+        result = _stored_response(entry, fingerprint)
+        if result is not None:
+            return result[0], result[1], True
+        return (*_wait_for_result(store_key, fingerprint, wait_seconds), True)
+
+    if not cache.add(store_key, (_IN_FLIGHT, fingerprint), timeout=IN_FLIGHT_TIMEOUT):
+        # Lost the race against a concurrent duplicate
+        return (*_wait_for_result(store_key, fingerprint, wait_seconds), True)
+
+    event = threading.Event()
+    with _local_events_lock:
+        _local_events[store_key] = event
+    try:
+        status_code, body = execute()
+        if status_code >= 500:
+            cache.delete(store_key)
+        else:
+            cache.set(store_key, (_DONE, fingerprint, status_code, body), timeout=settings.IDEMPOTENCY_KEY_TTL)
+        return status_code, body, False
+    except Exception:
+        cache.delete(store_key)
+        raise
+    finally:
+        with _local_events_lock:
+            _local_events.pop(store_key, None)
+        event.set()
+
+
+# ----------------------------------------------------
+# Async Variant (ASGI views)
+# ----------------------------------------------------
+# Same entries and semantics as run_idempotent; waiting duplicates sleep on the event loop
+# instead of holding a thread.
+
+_local_async_events = {} # store_key -> (event loop, asyncio.Event)
+
+
+async def _await_result(store_key: str, fingerprint: str, wait_seconds: float):
+    deadline = time.monotonic() + wait_seconds # Shared by both phases, as in _wait_for_result
+    loop, event = _local_async_events.get(store_key, (None, None))
+    if loop is asyncio.get_running_loop(): # Events cannot be awaited from another loop
+        try:
+            await asyncio.wait_for(event.wait(), wait_seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    while True:
+        entry = await cache.aget(store_key)
+        if entry is None:
+            raise IdempotencyInProgress('The original request did not complete; retry.')
+        result = _stored_response(entry, fingerprint)
+        if result is not None:
+            return result
+        if time.monotonic() >= deadline:
+            raise IdempotencyInProgress('A request with this Idempotency-Key is still being processed.')
+        await asyncio.sleep(WAIT_POLL_SECONDS)
+
+
+async def arun_idempotent(user_id: int, key: str, fingerprint: str, execute, wait_seconds: float = None):
+    """ Async run_idempotent: awaits execute() -> (status_code, body) at most once per (user_id, key). """
+    wait_seconds = wait_seconds if wait_seconds is not None else settings.IDEMPOTENCY_WAIT_SECONDS
+    store_key = _store_key(user_id, key)
+
+    entry = await cache.aget(store_key)
+    if entry is not None:
+        result = _stored_response(entry, fingerprint)
+        if result is not None:
+            return result[0], result[1], True
+        return (*await _await_result(store_key, fingerprint, wait_seconds), True)
+
+    if not await cache.aadd(store_key, (_IN_FLIGHT, fingerprint), timeout=IN_FLIGHT_TIMEOUT):
+        return (*await _await_result(store_key, fingerprint, wait_seconds), True)
+
+    event = asyncio.Event()
+    _local_async_events[store_key] = (asyncio.get_running_loop(), event)
+    try:
+        status_code, body = await execute()
+        if status_code >= 500:
+            await cache.adelete(store_key)
+        else:
+            await cache.aset(store_key, (_DONE, fingerprint, status_code, body), timeout=settings.IDEMPOTENCY_KEY_TTL)
+        return status_code, body, False
+    except Exception:
+        await cache.adelete(store_key)
+        raise
+    finally:
+        _local_async_events.pop(store_key, None)
+        event.set()
@@ -0,0 +1,173 @@
+# File: tec/ecommerce/orders/management/commands/benchmark_checkout.py
+
+import asyncio
+import json
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from products.models import Product
+from orders.pi_sdk import LocalPiSDK, set_pi_sdk
+from orders.services import process_secure_order
+
+User = get_user_model()
+
+
+def _percentile(values: list, percent: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    """
+    Benchmarks checkout throughput against the local Pi SDK stand-in.
+    --mode service: --concurrency threads call the checkout service directly; reports DB lock hold time.
+    --mode wsgi: --concurrency threads POST to the sync CheckoutPiAPIView through Django's WSGI
+                 handler (django.test.Client), like that many sync workers.
+    --mode asgi: one event loop keeps --concurrency POSTs to AsyncCheckoutAPIView in flight through
+                 Django's ASGI handler (django.test.AsyncClient), like one ASGI worker.
+    The wsgi and asgi modes run the full request path (middleware, JWT authentication, view).
+    Example: python manage.py benchmark_checkout --orders 500 --concurrency 300 --latency-ms 300 --mode asgi
+    """
+    help = 'Runs concurrent checkouts against the local Pi SDK stand-in and reports throughput and latency.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument('--latency-ms', type=float, default=300)
+        parser.add_argument('--items-per-cart', type=int, default=5)
+        parser.add_argument('--user-id', type=int, required=True)
+        parser.add_argument('--mode', choices=('service', 'wsgi', 'asgi'), default='service')
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(id=options['user_id']).first()
+        if user is None:
+            raise CommandError(f"User {options['user_id']} not found.")
+
+        products = list(
+            Product.objects.filter(is_available=True, inventory_stock__gt=0)
+            .order_by('id')[:options['items_per_cart']]
+        )
+        if not products:
+            raise CommandError('No available products to benchmark with.')
+
+        cart = [{'product_id': p.id, 'quantity': 1} for p in products]
+
+        previous_sdk = set_pi_sdk(LocalPiSDK(latency_ms=options['latency_ms']))
+
+        started = time.perf_counter()
+        try:
+            if options['mode'] == 'service':
+                results = self._run_service(user, cart, options)
+            else:
+                payload = json.dumps({
+                    'cart_items': cart,
+                    'shipping_address': 'Benchmark address',
+                    'seller_pi_address': 'BENCHMARK_SELLER',
+                })
+                headers = {'Authorization': f"Bearer {RefreshToken.for_user(user).access_token}"}
+                # The test clients send 'Host: testserver'
+                with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                    if options['mode'] == 'asgi':
+                        results = asyncio.run(self._run_asgi(payload, headers, options))
+                    else:
+                        results = self._run_wsgi(payload, headers, options)
+        finally:
+            set_pi_sdk(previous_sdk)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(f"Mode: {options['mode']}, concurrency: {options['concurrency']}")
+        if options['mode'] == 'service':
+            self._report_service(results, elapsed)
+        else:
+            self._report_http(results, elapsed)
+
+    # --- service: direct calls, DB lock hold time ---
+    @staticmethod
+    def _run_service(user, cart, options):
+        def run_checkout(_):
+            try:
+                return process_secure_order(user, cart, seller_pi_address='BENCHMARK_SELLER')
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            return list(pool.map(run_checkout, range(options['orders'])))
+
+    def _report_service(self, results, elapsed):
+        succeeded = [r for r in results if r.get('success')]
+        # Lock hold time = time spent inside the two short DB transactions
+        lock_hold_ms = [r['timings']['reserve_ms'] + r['timings']['finalize_ms'] for r in succeeded]
+        escrow_ms = [r['timings']['escrow_ms'] for r in succeeded]
+
+        self.stdout.write(f"Checkouts: {len(results)} ({len(succeeded)} succeeded) in {elapsed:.2f}s")
+        self.stdout.write(f"Throughput: {len(succeeded) / elapsed:.1f} checkouts/sec")
+        if succeeded:
+            self.stdout.write(
+                f"Lock hold ms: mean={statistics.mean(lock_hold_ms):.2f} "
+                f"p50={_percentile(lock_hold_ms, 50):.2f} p99={_percentile(lock_hold_ms, 99):.2f}"
+            )
+            self.stdout.write(
+                f"Escrow (outside transaction) ms: mean={statistics.mean(escrow_ms):.2f} "
+                f"p99={_percentile(escrow_ms, 99):.2f}"
+            )
+
+    # --- wsgi / asgi: full request path, [(status_code, latency_ms)] ---
+    @staticmethod
+    def _run_wsgi(payload, headers, options):
+        url = reverse('pi-checkout')
+        local = threading.local()
+
+        def run_checkout(_):
+            if not hasattr(local, 'client'):
+                local.client = Client(raise_request_exception=False)
+            started = time.perf_counter()
+            try:
+                response = local.client.post(url, payload, content_type='application/json', headers=headers)
+                return response.status_code, (time.perf_counter() - started) * 1000
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            return list(pool.map(run_checkout, range(options['orders'])))
+
+    @staticmethod
+    async def _run_asgi(payload, headers, options):
+        url = reverse('async-pi-checkout')
+        client = AsyncClient(raise_request_exception=False)
+        semaphore = asyncio.Semaphore(options['concurrency'])
+
+        async def run_checkout():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post(url, payload, content_type='application/json', headers=headers)
+                return response.status_code, (time.perf_counter() - started) * 1000
+
+        return await asyncio.gather(*(run_checkout() for _ in range(options['orders'])))
+
+    def _report_http(self, results, elapsed):
+        status_counts = Counter(status_code for status_code, _ in results)
+        latency_ms = [latency for status_code, latency in results if status_code == 201]
+
+        self.stdout.write(
+            f"Requests: {len(results)} ({status_counts.get(201, 0)} created) in {elapsed:.2f}s, "
+            f"status codes: {dict(sorted(status_counts.items()))}"
+        )
+        self.stdout.write(f"Throughput: {status_counts.get(201, 0) / elapsed:.1f} checkouts/sec")
+        if latency_ms:
+            self.stdout.write(
+                f"Request latency ms: mean={statistics.mean(latency_ms):.2f} "
+                f"p50={_percentile(latency_ms, 50):.2f} p99={_percentile(latency_ms, 99):.2f}"
+            )
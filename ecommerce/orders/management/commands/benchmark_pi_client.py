@@ -0,0 +1,86 @@
+# File: tec/ecommerce/orders/management/commands/benchmark_pi_client.py
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+
+from orders.pi_client import AsyncPiClient, PiAPIError, PiClient
+from orders.pi_fake_server import start_fake_pi_server
+
+
+class Command(BaseCommand):
+    """
+    Load-tests the Pi HTTP client against the local fake Pi server (no network access needed).
+    Each iteration is one checkout's worth of calls: initiate + verify.
+    Example: python manage.py benchmark_pi_client --calls 2000 --concurrency 200 --latency-ms 300 --mode async
+    """
+    help = 'Runs initiate/verify round-trips against a local fake Pi server and reports throughput and latency.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--calls', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=100)
+        parser.add_argument('--latency-ms', type=float, default=300)
+        parser.add_argument('--failure-rate', type=float, default=0.0)
+        parser.add_argument('--mode', choices=('async', 'sync'), default='async')
+
+    def handle(self, *args, **options):
+        server = start_fake_pi_server(latency_ms=options['latency_ms'], failure_rate=options['failure_rate'])
+        client_options = {'base_url': server.base_url, 'max_connections': options['concurrency']}
+        try:
+            started = time.perf_counter()
+            if options['mode'] == 'async':
+                outcomes, stats = asyncio.run(self._run_async(client_options, options))
+            else:
+                outcomes, stats = self._run_sync(client_options, options)
+            elapsed = time.perf_counter() - started
+        finally:
+            server.shutdown()
+
+        succeeded = sum(outcomes)
+        self.stdout.write(f"Mode: {options['mode']}, round-trips: {len(outcomes)} ({succeeded} succeeded) in {elapsed:.2f}s")
+        self.stdout.write(f"Throughput: {succeeded / elapsed:.1f} checkouts/sec, circuit: {stats['circuit']}")
+        for operation, data in stats['latency'].items():
+            self.stdout.write(
+                f"{operation}: count={data['count']} errors={data['errors']} avg={data['avg_ms']}ms "
+                f"p50<={data['p50_ms']}ms p99<={data['p99_ms']}ms max={data['max_ms']}ms"
+            )
+
+    @staticmethod
+    async def _round_trip_async(client, index: int) -> bool:
+        try:
+            payment = await client.initiate_payment('BENCHMARK_SELLER', 1, '{}', idempotency_key=f"bench-{index}")
+            return (await client.verify_payment(payment['transaction_id']))['is_locked']
+        except PiAPIError:
+            return False
+
+    async def _run_async(self, client_options, options):
+        client = AsyncPiClient(**client_options)
+        semaphore = asyncio.Semaphore(options['concurrency'])
+
+        async def bounded(index):
+            async with semaphore:
+                return await self._round_trip_async(client, index)
+
+        try:
+            outcomes = await asyncio.gather(*(bounded(i) for i in range(options['calls'])))
+            return outcomes, client.stats()
+        finally:
+            await client.close()
+
+    def _run_sync(self, client_options, options):
+        client = PiClient(**client_options)
+
+        def round_trip(index):
+            try:
+                payment = client.initiate_payment('BENCHMARK_SELLER', 1, '{}', idempotency_key=f"bench-{index}")
+                return client.verify_payment(payment['transaction_id'])['is_locked']
+            except PiAPIError:
+                return False
+
+        try:
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                outcomes = list(pool.map(round_trip, range(options['calls'])))
+            return outcomes, client.stats()
+        finally:
+            client.close()
@@ -0,0 +1,30 @@
+# File: tec/ecommerce/orders/management/commands/release_escrow.py
+
+from django.core.management.base import BaseCommand
+
+from orders.services import run_escrow_release, ESCROW_RELEASE_BATCH_SIZE, ESCROW_RELEASE_WORKERS
+
+
+class Command(BaseCommand):
+    """
+    Releases escrow for every order whose escrow_release_date has passed.
+    Safe to schedule on several nodes at once (batches are claimed with SKIP LOCKED).
+    Example: python manage.py release_escrow --batch-size 1000 --workers 64
+    """
+    help = 'Releases due Pi escrow payments in concurrent batches and marks the orders COMPLETED.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=ESCROW_RELEASE_BATCH_SIZE)
+        parser.add_argument('--workers', type=int, default=ESCROW_RELEASE_WORKERS)
+        parser.add_argument('--max-batches', type=int, default=None)
+
+    def handle(self, *args, **options):
+        result = run_escrow_release(
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            max_batches=options['max_batches'],
+        )
+        self.stdout.write(
+            f"Completed {result['completed']} orders ({result['failed']} failed, retried next run) "
+            f"in {result['batches']} batches, {result['duration_ms']} ms ({result['orders_per_sec']} orders/sec)"
+        )
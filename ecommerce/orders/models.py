@@ -32,6 +32,9 @@ class Order(models.Model):
                                          verbose_name=_('Pi Transaction ID'))
     escrow_release_date = models.DateTimeField(null=True, blank=True,
                                               verbose_name=_('Escrow Release Date'))
+    # Lease taken by the escrow release engine while the Pi release call is in flight
+    escrow_claimed_at = models.DateTimeField(null=True, blank=True,
+                                             verbose_name=_('Escrow Release Claimed At'))
     
     # Shipping Details
     shipping_address = models.TextField(verbose_name=_('Shipping Address'))
@@ -43,6 +46,10 @@ class Order(models.Model):
     class Meta:
         verbose_name = _('Order')
         verbose_name_plural = _('Orders')
+        indexes = [
+            # Supports the escrow release engine (orders.services.run_escrow_release)
+            models.Index(fields=['status', 'escrow_release_date'], name='order_escrow_release_idx'),
+        ]
 
     def __str__(self):
         return f"Order #{self.id} ({self.status})"
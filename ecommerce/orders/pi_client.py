@@ -0,0 +1,316 @@
+# File: tec/ecommerce/orders/pi_client.py
+
+import asyncio
+import itertools
+import random
+import threading
+import time
+import weakref
+import httpx
+from django.conf import settings
+
+# --- Constants ---
+RETRY_BASE_SECONDS = 0.1 # Backoff base; attempt n sleeps uniform(0, min(cap, base * 2**n)) (full jitter)
+RETRY_CAP_SECONDS = 2.0
+RETRYABLE_STATUS_CODES = {429, 502, 503, 504}
+CONNECTIONS_PER_POOL = 10 # Keep-alive connections per httpx pool (see AsyncPiClient)
+HISTOGRAM_BOUNDS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class PiAPIError(Exception):
+    """ The Pi API call failed (after retries, for idempotent calls). """
+    pass
+
+
+class PiCircuitOpenError(PiAPIError):
+    """ Raised without calling the Pi API while the circuit breaker is open. """
+    pass
+
+# ----------------------------------------------------
+# 1. Latency Histogram
+# ----------------------------------------------------
+class LatencyHistogram:
+    """ Fixed-bucket latency histogram per operation (thread-safe, constant memory). """
+
+    def __init__(self, bounds_ms=HISTOGRAM_BOUNDS_MS):
+        self.bounds_ms = tuple(bounds_ms)
+        self._lock = threading.Lock()
+        self._data = {} # operation -> {'buckets': [...], 'count', 'sum_ms', 'max_ms', 'errors'}
+
+    def record(self, operation: str, elapsed_ms: float, error: bool = False):
+        with self._lock:
+            data = self._data.get(operation)
+            if data is None:
+                data = self._data[operation] = {
+                    'buckets': [0] * (len(self.bounds_ms) + 1), 'count': 0, 'sum_ms': 0.0, 'max_ms': 0.0, 'errors': 0,
+                }
+            index = next((i for i, bound in enumerate(self.bounds_ms) if elapsed_ms <= bound), len(self.bounds_ms))
+            data['buckets'][index] += 1
+            data['count'] += 1
+            data['sum_ms'] += elapsed_ms
+            data['max_ms'] = max(data['max_ms'], elapsed_ms)
+            data['errors'] += int(error)
+
+    def _quantile(self, data, quantile: float) -> float:
+        """ Upper bound of the bucket holding the quantile (max for the overflow bucket). """
+        target = quantile * data['count']
+        seen = 0
+        for index, count in enumerate(data['buckets']):
+            seen += count
+            if seen >= target and count:
+                return self.bounds_ms[index] if index < len(self.bounds_ms) else data['max_ms']
+        return data['max_ms']
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                operation: {
+                    'count': data['count'],
+                    'errors': data['errors'],
+                    'avg_ms': round(data['sum_ms'] / data['count'], 3) if data['count'] else None,
+                    'p50_ms': self._quantile(data, 0.50),
+                    'p99_ms': self._quantile(data, 0.99),
+                    'max_ms': round(data['max_ms'], 3),
+                    'buckets': dict(zip([f"<={bound}" for bound in self.bounds_ms] + ['inf'], data['buckets'])),
+                }
+                for operation, data in self._data.items()
+            }
+
+# ----------------------------------------------------
+# 2. Circuit Breaker
+# ----------------------------------------------------
+class CircuitBreaker:
+    """
+    Fails fast while the Pi API is degraded.
+    - closed: calls go through; failure_threshold consecutive failures open the circuit.
+    - open: calls raise PiCircuitOpenError immediately for reset_seconds.
+    - half-open: one trial call goes through; success closes the circuit, failure re-opens it.
+      A trial that ends any other way (cancelled, unexpected exception) is released by
+      release_trial(), so the next call can be the trial.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial = None # Token of the half-open trial call in flight
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_seconds:
+            return 'half-open'
+        return 'open'
+
+    def before_call(self):
+        """ Raises PiCircuitOpenError when failing fast. Returns a token if this call is the half-open trial. """
+        with self._lock:
+            state = self.state
+            if state == 'open' or (state == 'half-open' and self._trial is not None):
+                raise PiCircuitOpenError('Pi API circuit is open; failing fast.')
+            if state == 'half-open':
+                self._trial = object()
+                return self._trial
+            return None
+
+    def release_trial(self, trial):
+        """ Frees the half-open trial slot if the given trial still holds it (no-op otherwise). """
+        if trial is None:
+            return
+        with self._lock:
+            if self._trial is trial:
+                self._trial = None
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial = None
+
+# ----------------------------------------------------
+# 3. Async Pi Client (Pooled, Keep-Alive)
+# ----------------------------------------------------
+class AsyncPiClient:
+    """
+    Async client for the Pi payments API over pooled httpx.AsyncClients (keep-alive).
+    Every call has a timeout; idempotent calls (reads, cancel/release of a given payment,
+    creation with an idempotency key) are retried with jittered exponential backoff.
+    Returns the same dict shapes as LocalPiSDK, so checkout code works with either.
+    """
+
+    def __init__(self, base_url: str = None, api_key: str = None, timeout: float = None, max_retries: int = None,
+                 max_connections: int = None, breaker: CircuitBreaker = None, histogram: LatencyHistogram = None,
+                 transport=None):
+        self.max_retries = max_retries if max_retries is not None else settings.PI_API_MAX_RETRIES
+        self.breaker = breaker or CircuitBreaker(
+            failure_threshold=settings.PI_CIRCUIT_FAILURE_THRESHOLD,
+            reset_seconds=settings.PI_CIRCUIT_RESET_SECONDS,
+        )
+        self.histogram = histogram or LatencyHistogram()
+        max_connections = max_connections or settings.PI_API_MAX_CONNECTIONS
+        # httpcore's pool scheduling cost grows with (queued requests x connections), so with
+        # hundreds of calls in flight one large pool serializes; several small pools do not.
+        shard_count = max(1, -(-max_connections // CONNECTIONS_PER_POOL))
+        per_pool = max(1, max_connections // shard_count)
+        self._clients = [
+            httpx.AsyncClient(
+                base_url=base_url or settings.PI_API_BASE_URL,
+                headers={'Authorization': f"Key {api_key or settings.PI_NETWORK_API_KEY}"},
+                timeout=httpx.Timeout(timeout or settings.PI_API_TIMEOUT_SECONDS),
+                limits=httpx.Limits(max_connections=per_pool, max_keepalive_connections=per_pool),
+                transport=transport,
+            )
+            for _ in range(shard_count)
+        ]
+        self._next_client = itertools.cycle(self._clients)
+
+    async def close(self):
+        for client in self._clients:
+            await client.aclose()
+
+    @staticmethod
+    def _backoff_seconds(attempt: int) -> float:
+        return random.uniform(0, min(RETRY_CAP_SECONDS, RETRY_BASE_SECONDS * (2 ** attempt)))
+
+    async def _request(self, operation: str, method: str, path: str, idempotent: bool, **kwargs) -> dict:
+        attempts = 1 + (self.max_retries if idempotent else 0)
+        for attempt in range(attempts):
+            trial = self.breaker.before_call()
+            started = time.perf_counter()
+            try:
+                try:
+                    response = await next(self._next_client).request(method, path, **kwargs)
+                except httpx.HTTPError as e:
+                    error = PiAPIError(f"{operation} failed: {e.__class__.__name__}: {e}")
+                    retryable = True
+                else:
+                    if response.status_code < 400:
+                        self.histogram.record(operation, (time.perf_counter() - started) * 1000)
+                        self.breaker.record_success()
+                        return response.json()
+                    error = PiAPIError(f"{operation} failed with HTTP {response.status_code}: {response.text[:200]}")
+                    retryable = response.status_code in RETRYABLE_STATUS_CODES or response.status_code >= 500
+                    if not retryable:
+                        # A 4xx is a problem with the request, not a sign the API is degrading
+                        self.histogram.record(operation, (time.perf_counter() - started) * 1000, error=True)
+                        self.breaker.record_success()
+                        raise error
+
+                self.histogram.record(operation, (time.perf_counter() - started) * 1000, error=True)
+                self.breaker.record_failure()
+            finally:
+                # Cancellation or an unexpected error must not leave the half-open slot taken forever
+                self.breaker.release_trial(trial)
+            if attempt + 1 < attempts:
+                await asyncio.sleep(self._backoff_seconds(attempt))
+        raise error
+
+    # --- Payment API (same interface as LocalPiSDK) ---
+    async def initiate_payment(self, recipient_address: str, amount, metadata: str, idempotency_key: str = None):
+        """ Creates an escrow payment. Retried only when an idempotency key makes it safe. """
+        headers = {'Idempotency-Key': idempotency_key} if idempotency_key else {}
+        data = await self._request(
+            'initiate_payment', 'POST', '/v2/payments', idempotent=bool(idempotency_key), headers=headers,
+            json={'recipient_address': recipient_address, 'amount': str(amount), 'metadata': metadata},
+        )
+        return {'success': True, 'transaction_id': data['identifier'], 'status': data['status']}
+
+    async def verify_payment(self, transaction_id: str):
+        data = await self._request('verify_payment', 'GET', f"/v2/payments/{transaction_id}", idempotent=True)
+        return {
+            'status': data['status'],
+            'is_locked': data['status'] == 'FUNDS_LOCKED_IN_ESCROW',
+            'lock_until': data.get('lock_until'),
+        }
+
+    async def cancel_payment(self, transaction_id: str):
+        data = await self._request('cancel_payment', 'POST', f"/v2/payments/{transaction_id}/cancel", idempotent=True)
+        return {'success': True, 'transaction_id': transaction_id, 'status': data['status']}
+
+    async def release_funds(self, transaction_id: str):
+        data = await self._request('release_funds', 'POST', f"/v2/payments/{transaction_id}/release", idempotent=True)
+        return {'success': True, 'transaction_id': transaction_id, 'status': data['status']}
+
+    def stats(self) -> dict:
+        return {'circuit': self.breaker.state, 'latency': self.histogram.snapshot()}
+
+# ----------------------------------------------------
+# 4. Sync Facade (Pi SDK Backend)
+# ----------------------------------------------------
+class PiClient:
+    """
+    Blocking facade over AsyncPiClient for sync code (views, services, management commands).
+    One background event loop owns the pooled connections; calls from any thread are
+    submitted to it, so every worker thread shares the same keep-alive pool.
+    The a-prefixed methods serve async callers (ASGI views) on their own event loop.
+    Select it with PI_SDK_BACKEND = 'orders.pi_client.PiClient'.
+    """
+
+    def __init__(self, **options):
+        self._options = options
+        self._loop_clients = weakref.WeakKeyDictionary() # event loop -> AsyncPiClient
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='pi-client-loop', daemon=True)
+        self._thread.start()
+        self.async_client = self._run(self._create_client(options))
+
+    @staticmethod
+    async def _create_client(options):
+        # httpx binds the pool to the loop it is created on
+        return AsyncPiClient(**options)
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def initiate_payment(self, recipient_address: str, amount, metadata: str, idempotency_key: str = None):
+        return self._run(self.async_client.initiate_payment(recipient_address, amount, metadata, idempotency_key))
+
+    def verify_payment(self, transaction_id: str):
+        return self._run(self.async_client.verify_payment(transaction_id))
+
+    def cancel_payment(self, transaction_id: str):
+        return self._run(self.async_client.cancel_payment(transaction_id))
+
+    def release_funds(self, transaction_id: str):
+        return self._run(self.async_client.release_funds(transaction_id))
+
+    # --- Async interface (same breaker and histogram as the sync calls) ---
+    def _running_loop_client(self) -> AsyncPiClient:
+        """ AsyncPiClient bound to the caller's event loop (httpx pools cannot cross loops). """
+        loop = asyncio.get_running_loop()
+        client = self._loop_clients.get(loop)
+        if client is None:
+            client = self._loop_clients[loop] = AsyncPiClient(**{
+                **self._options, 'breaker': self.async_client.breaker, 'histogram': self.async_client.histogram,
+            })
+        return client
+
+    async def ainitiate_payment(self, recipient_address: str, amount, metadata: str, idempotency_key: str = None):
+        return await self._running_loop_client().initiate_payment(recipient_address, amount, metadata, idempotency_key)
+
+    async def averify_payment(self, transaction_id: str):
+        return await self._running_loop_client().verify_payment(transaction_id)
+
+    async def acancel_payment(self, transaction_id: str):
+        return await self._running_loop_client().cancel_payment(transaction_id)
+
+    async def arelease_funds(self, transaction_id: str):
+        return await self._running_loop_client().release_funds(transaction_id)
+
+    def stats(self) -> dict:
+        return self.async_client.stats()
+
+    def close(self):
+        self._run(self.async_client.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
@@ -0,0 +1,146 @@
+# File: tec/ecommerce/orders/pi_fake_server.py
+
+import asyncio
+import json
+import random
+import re
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+# ----------------------------------------------------
+# Local Fake Pi Payments API
+# ----------------------------------------------------
+# Speaks the subset of the Pi payments API used by orders.pi_client, with configurable
+# latency and failure rate, so the HTTP client (pooling, retries, circuit breaker) can be
+# load-tested without network access:
+#   POST /v2/payments                      -> create (deduplicated by Idempotency-Key)
+#   GET  /v2/payments/<id>                 -> status (funds locked once created)
+#   POST /v2/payments/<id>/cancel|release  -> final status
+# It runs on its own asyncio loop, so simulated latency costs no thread per request and
+# thousands of calls can be in flight at once.
+
+_PAYMENT_PATH = re.compile(r'^/v2/payments/(?P<identifier>[\w-]+)(?:/(?P<action>cancel|release))?$')
+_ACTION_STATUS = {'cancel': 'CANCELLED', 'release': 'RELEASED'}
+_REASONS = {200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found', 503: 'Service Unavailable'}
+
+
+class FakePiServer:
+    """ Minimal keep-alive HTTP/1.1 server holding payments in memory. """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency_ms: float = 0, failure_rate: float = 0,
+                 escrow_days: int = 14):
+        self.host = host
+        self.port = port
+        self.latency_seconds = latency_ms / 1000.0
+        self.failure_rate = failure_rate
+        self.escrow_days = escrow_days
+        self.payments = {} # identifier -> payment dict
+        self.idempotency_keys = {} # Idempotency-Key -> identifier
+        self._loop = None
+        self._server = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    # --- Request Handling ---
+    def _create_payment(self, data: dict, idempotency_key: str):
+        try:
+            amount = float(data.get('amount') or 0)
+        except (TypeError, ValueError):
+            amount = 0
+        if amount <= 0:
+            return 400, {'error': 'invalid_amount'}
+        if idempotency_key and idempotency_key in self.idempotency_keys:
+            return 200, self.payments[self.idempotency_keys[idempotency_key]]
+
+        identifier = f"pi_tx_{uuid.uuid4().hex}"
+        # The fake buyer approves instantly: the payment is created with its funds locked
+        self.payments[identifier] = {
+            'identifier': identifier,
+            'amount': data.get('amount'),
+            'recipient_address': data.get('recipient_address'),
+            'metadata': data.get('metadata'),
+            'status': 'FUNDS_LOCKED_IN_ESCROW',
+            'lock_until': (datetime.now() + timedelta(days=self.escrow_days)).isoformat(),
+        }
+        if idempotency_key:
+            self.idempotency_keys[idempotency_key] = identifier
+        return 201, {**self.payments[identifier], 'status': 'AWAITING_FUNDS_LOCK'}
+
+    async def _respond(self, method: str, path: str, headers: dict, body: bytes):
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        if self.failure_rate and random.random() < self.failure_rate:
+            return 503, {'error': 'service_unavailable'}
+
+        if method == 'POST' and path == '/v2/payments':
+            return self._create_payment(json.loads(body or b'{}'), headers.get('idempotency-key'))
+
+        match = _PAYMENT_PATH.match(path)
+        if not match or (method == 'GET') == bool(match.group('action')) or method not in ('GET', 'POST'):
+            return 404, {'error': 'not_found'}
+        payment = self.payments.get(match.group('identifier'))
+        if payment is None:
+            return 404, {'error': 'payment_not_found'}
+        if match.group('action'):
+            payment['status'] = _ACTION_STATUS[match.group('action')] # Repeating an action is a no-op
+        return 200, payment
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length') or 0)
+                body = await reader.readexactly(length) if length else b''
+
+                status_code, payload = await self._respond(method, path, headers, body)
+                data = json.dumps(payload).encode('utf-8')
+                writer.write(
+                    f"HTTP/1.1 {status_code} {_REASONS[status_code]}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode('latin-1') + data
+                )
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    # --- Lifecycle ---
+    def start(self):
+        """ Starts serving on a daemon thread (port 0 picks a free port). """
+        self._loop = asyncio.new_event_loop()
+
+        async def serve():
+            self._server = await asyncio.start_server(self._handle_connection, self.host, self.port, backlog=4096)
+            self.port = self._server.sockets[0].getsockname()[1]
+
+        threading.Thread(target=self._loop.run_forever, name='fake-pi-server', daemon=True).start()
+        asyncio.run_coroutine_threadsafe(serve(), self._loop).result()
+        return self
+
+    def shutdown(self):
+        async def stop():
+            self._server.close()
+            await self._server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+def start_fake_pi_server(host: str = '127.0.0.1', port: int = 0, **options) -> FakePiServer:
+    """ Starts the fake API in the background. Stop it with server.shutdown(). """
+    return FakePiServer(host, port, **options).start()
@@ -0,0 +1,119 @@
+# File: tec/ecommerce/orders/pi_sdk.py
+
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# ----------------------------------------------------
+# 1. Local Pi SDK Stand-in
+# ----------------------------------------------------
+class LocalPiSDK:
+    """
+    In-process stand-in for the Pi Network SDK.
+    Mirrors the escrow calls used by checkout, with a configurable artificial latency
+    so lock hold time and checkout throughput can be benchmarked without network access.
+    The a-prefixed methods are the async interface (ASGI views): same results, with the
+    round-trip awaited instead of blocking.
+    """
+
+    def __init__(self, latency_ms: float = 0, fail_verify: bool = False):
+        self.latency_seconds = latency_ms / 1000.0
+        self.fail_verify = fail_verify
+
+    def _simulate_round_trip(self):
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+    async def _asimulate_round_trip(self):
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+
+    # --- Simulated API responses ---
+    @staticmethod
+    def _initiate_result(amount):
+        if amount <= 0:
+            return {'success': False, 'message': 'Invalid amount.'}
+
+        transaction_id = f"pi_tx_{uuid.uuid4().hex}"
+        return {
+            'success': True,
+            'transaction_id': transaction_id,
+            'status': 'AWAITING_FUNDS_LOCK',
+        }
+
+    def _verify_result(self):
+        if self.fail_verify:
+            return {'status': 'FUNDS_NOT_LOCKED', 'is_locked': False}
+        return {
+            'status': 'FUNDS_LOCKED_IN_ESCROW',
+            'is_locked': True,
+            'lock_until': (datetime.now() + timedelta(days=settings.PI_ESCROW_RELEASE_DAYS)).isoformat()
+        }
+
+    # --- Sync interface ---
+    def initiate_payment(self, recipient_address: str, amount: float, metadata: str, idempotency_key: str = None):
+        """ Simulates initiating a secure Pi Escrow transaction. """
+        self._simulate_round_trip()
+        return self._initiate_result(amount)
+
+    def verify_payment(self, transaction_id: str):
+        """ Simulates verifying that funds are securely locked in Escrow. """
+        self._simulate_round_trip()
+        return self._verify_result()
+
+    def cancel_payment(self, transaction_id: str):
+        """ Simulates canceling an escrow lock and returning the funds to the buyer. """
+        self._simulate_round_trip()
+        return {'success': True, 'transaction_id': transaction_id, 'status': 'CANCELLED'}
+
+    def release_funds(self, transaction_id: str):
+        """ Simulates releasing escrowed funds to the seller (idempotent per transaction). """
+        self._simulate_round_trip()
+        return {'success': True, 'transaction_id': transaction_id, 'status': 'RELEASED'}
+
+    # --- Async interface ---
+    async def ainitiate_payment(self, recipient_address: str, amount: float, metadata: str, idempotency_key: str = None):
+        await self._asimulate_round_trip()
+        return self._initiate_result(amount)
+
+    async def averify_payment(self, transaction_id: str):
+        await self._asimulate_round_trip()
+        return self._verify_result()
+
+    async def acancel_payment(self, transaction_id: str):
+        await self._asimulate_round_trip()
+        return {'success': True, 'transaction_id': transaction_id, 'status': 'CANCELLED'}
+
+    async def arelease_funds(self, transaction_id: str):
+        await self._asimulate_round_trip()
+        return {'success': True, 'transaction_id': transaction_id, 'status': 'RELEASED'}
+
+
+# ----------------------------------------------------
+# 2. SDK Loader (Pluggable Backend)
+# ----------------------------------------------------
+_sdk_instance = None
+
+def get_pi_sdk():
+    """
+    Returns the process-wide Pi SDK backend.
+    The class is configured with settings.PI_SDK_BACKEND (dotted path) and receives
+    settings.PI_SDK_OPTIONS as keyword arguments.
+    """
+    global _sdk_instance
+    if _sdk_instance is None:
+        backend_path = getattr(settings, 'PI_SDK_BACKEND', 'orders.pi_sdk.LocalPiSDK')
+        options = getattr(settings, 'PI_SDK_OPTIONS', {})
+        _sdk_instance = import_string(backend_path)(**options)
+    return _sdk_instance
+
+
+def set_pi_sdk(sdk):
+    """ Swaps the active Pi SDK backend (used by benchmarks and tests). Returns the previous one. """
+    global _sdk_instance
+    previous = _sdk_instance
+    _sdk_instance = sdk
+    return previous
@@ -0,0 +1,197 @@
+# File: tec/ecommerce/orders/pricing.py
+
+import threading
+from collections import OrderedDict, defaultdict, namedtuple
+from decimal import Decimal, ROUND_HALF_UP, ROUND_CEILING
+
+from accounts.models import UserProfile
+from growth.models import GrowthSettings
+from products.models import Product
+from products.services import get_product_versions
+
+# --- Constants ---
+PI_QUANTUM = Decimal('0.000000001') # Order.total_amount_pi / price_at_purchase have 9 decimal places
+PI_APP_FEE_RATE = Decimal('0.01') # 1% Application fee example
+PRICE_SNAPSHOT_MAX_PRODUCTS = 100000 # Per-worker bound of the price snapshot
+
+PRICE_FIELDS = ('id', 'name', 'base_price_pi', 'sale_price_pi', 'inventory_stock', 'is_available')
+
+# Authoritative price and stock of one product
+PriceEntry = namedtuple('PriceEntry', ['unit_price', 'stock', 'is_available', 'name'])
+
+
+class PricingError(Exception):
+    pass
+
+# ----------------------------------------------------
+# 1. Pricing Engine (Decimal)
+# ----------------------------------------------------
+# Prices always come from the catalog, never from the client: the cart only carries
+# product ids and quantities. All arithmetic is Decimal, rounded to the 9 decimal places
+# of the Pi amount columns.
+
+def quantize_pi(amount) -> Decimal:
+    return Decimal(amount).quantize(PI_QUANTUM, rounding=ROUND_HALF_UP)
+
+
+def cart_quantities(cart_data: list) -> dict:
+    """ Collapses cart lines into {product_id: total_quantity}, merging duplicate lines. """
+    if not isinstance(cart_data, list):
+        raise PricingError('cart_items must be a list.')
+    quantities = defaultdict(int)
+    for item in cart_data:
+        try:
+            product_id = int(item['product_id'])
+            quantity = int(item['quantity'])
+        except (KeyError, TypeError, ValueError):
+            # A malformed client payload is a 400, like any other pricing error
+            raise PricingError('Each cart item needs an integer product_id and quantity.')
+        if quantity <= 0:
+            raise PricingError(f"Invalid quantity for product {product_id}.")
+        quantities[product_id] += quantity
+    return dict(quantities)
+
+
+def price_entry(product) -> PriceEntry:
+    """ PriceEntry of a Product row (the sale price wins when set). """
+    unit_price = product.sale_price_pi if product.sale_price_pi else product.base_price_pi
+    return PriceEntry(quantize_pi(unit_price), product.inventory_stock, product.is_available, product.name)
+
+
+def parse_redeem_points(value) -> int:
+    try:
+        points = int(value or 0)
+    except (TypeError, ValueError):
+        raise PricingError('redeem_points must be a whole number.')
+    if points < 0:
+        raise PricingError('redeem_points cannot be negative.')
+    return points
+
+
+def _loyalty_discount(subtotal: Decimal, redeem_points: int):
+    """
+    Returns (points_applied, discount). Points are capped so that part of the order is
+    still paid in Pi (the escrow needs a positive amount).
+    """
+    if not redeem_points or subtotal <= 0:
+        return 0, quantize_pi(0)
+    pi_per_point = GrowthSettings.load().pi_per_point
+    if not pi_per_point or pi_per_point <= 0:
+        return 0, quantize_pi(0)
+    max_points = int((subtotal / pi_per_point).to_integral_value(rounding=ROUND_CEILING)) - 1
+    points_applied = max(0, min(redeem_points, max_points))
+    return points_applied, quantize_pi(points_applied * pi_per_point)
+
+
+def price_cart(quantities: dict, entries: dict, redeem_points: int = 0) -> dict:
+    """
+    Prices aggregated cart quantities against authoritative entries ({product_id: PriceEntry}).
+    Returns lines, subtotal, loyalty discount, total (what the buyer pays in Pi) and app fee.
+    Lines whose product is unavailable or short of stock are flagged, not rejected.
+    """
+    missing = sorted(set(quantities) - set(entries))
+    if missing:
+        raise PricingError(f"Products not found: {missing}")
+
+    lines = []
+    subtotal = Decimal('0')
+    for product_id, quantity in quantities.items():
+        entry = entries[product_id]
+        line_total = entry.unit_price * quantity
+        subtotal += line_total
+        lines.append({
+            'product_id': product_id,
+            'name': entry.name,
+            'quantity': quantity,
+            'unit_price': entry.unit_price,
+            'line_total': quantize_pi(line_total),
+            'in_stock': bool(entry.is_available and entry.stock >= quantity),
+        })
+
+    subtotal = quantize_pi(subtotal)
+    points_applied, discount = _loyalty_discount(subtotal, redeem_points)
+    total = subtotal - discount
+    return {
+        'lines': lines,
+        'subtotal': subtotal,
+        'loyalty_points_applied': points_applied,
+        'loyalty_discount': discount,
+        'total': total,
+        'app_fee': quantize_pi(total * PI_APP_FEE_RATE),
+        'in_stock': all(line['in_stock'] for line in lines),
+    }
+
+# ----------------------------------------------------
+# 2. Price Snapshot (Per-Worker, Versioned)
+# ----------------------------------------------------
+# Cart previews are far more frequent than checkouts and must not hit the DB.
+# Each snapshot entry is tagged with its product's catalog version ('product:{id}'), which
+# every write to the product (price, availability, stock reservations and restocks) bumps
+# on commit. A lookup costs one shared-cache get_many for the versions; only products whose
+# entry is missing or stale are (re)loaded, with one in_bulk query.
+
+class PriceSnapshot:
+    """ Bounded LRU of {product_id: (version, PriceEntry)}, shared by the threads of a worker. """
+
+    def __init__(self, max_products: int = PRICE_SNAPSHOT_MAX_PRODUCTS):
+        self.max_products = max_products
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, product_ids) -> dict:
+        """ {product_id: PriceEntry} for the products that exist; fresh as of their current version. """
+        product_ids = list(product_ids)
+        versions = get_product_versions(product_ids) # Read before loading: a concurrent write re-stales the entry
+        entries = {}
+        stale = []
+        with self._lock:
+            for product_id in product_ids:
+                cached = self._entries.get(product_id)
+                if cached is not None and cached[0] == versions[product_id]:
+                    self._entries.move_to_end(product_id)
+                    entries[product_id] = cached[1]
+                else:
+                    stale.append(product_id)
+
+        if stale:
+            loaded = load_price_entries(stale)
+            entries.update(loaded)
+            with self._lock:
+                for product_id, entry in loaded.items():
+                    self._entries[product_id] = (versions[product_id], entry)
+                    self._entries.move_to_end(product_id)
+                while len(self._entries) > self.max_products:
+                    self._entries.popitem(last=False)
+        return entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+PRICE_SNAPSHOT = PriceSnapshot()
+
+
+def load_price_entries(product_ids) -> dict:
+    """ {product_id: PriceEntry} in one query (products that do not exist are left out). """
+    return {
+        product_id: price_entry(product)
+        for product_id, product in Product.objects.only(*PRICE_FIELDS).in_bulk(list(product_ids)).items()
+    }
+
+# ----------------------------------------------------
+# 3. Cart Preview
+# ----------------------------------------------------
+def quote_cart(cart_data: list, redeem_points=0, user=None) -> dict:
+    """
+    Prices a cart for preview from the price snapshot. Requested loyalty points are capped
+    by the user's balance (one query, only when points are requested).
+    """
+    quantities = cart_quantities(cart_data)
+    if not quantities:
+        raise PricingError('Cart is empty.')
+    redeem_points = parse_redeem_points(redeem_points)
+    if redeem_points and user is not None:
+        balance = UserProfile.objects.filter(user_id=user.id).values_list('current_loyalty_points', flat=True).first()
+        redeem_points = min(redeem_points, balance or 0)
+    return price_cart(quantities, PRICE_SNAPSHOT.lookup(quantities), redeem_points)
@@ -1,47 +1,132 @@
 # File: Ecom-backend-django/orders/services.py
 
 import json
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from asgiref.sync import sync_to_async
 from django.db import transaction
+from django.db.models import Case, F, Q, Sum, When
 from django.utils import timezone
 import time # Used for unique transaction ID generation
 
-# --- IMPORTANT IMPORTS (Assumed from your project structure) ---
-# You MUST ensure these models are correctly imported:
-# from products.models import Product  
-# from .models import Order, OrderDetail 
-# ----------------------------------------------------------------
+from products.models import Product
+from search.models import SearchIndexOutbox
+from products.cache import bump_catalog_version_on_commit
+from products.services import invalidate_product_details
+from growth.services import LoyaltyError, redeem_points, refund_redeemed_points
+from .models import Order, OrderDetail
+from .pi_sdk import get_pi_sdk
+from .pricing import PricingError, cart_quantities, parse_redeem_points, price_cart, price_entry
 
 # --- Constants ---
 ORDER_EXPIRATION_TIME = timedelta(hours=1)
+SWEEP_BATCH_SIZE = 500 # Expired orders canceled per sweeper transaction
 ESCROW_PERIOD_DAYS = 14 
-PI_APP_FEE_RATE = 0.01 # 1% Application fee example
-
-# --- MOCK FUNCTIONS for Pi SDK ---
-# These functions simulate the actual communication with the Pi Network SDK
-def mock_pi_payment_initiate(recipient_address: str, amount: float, metadata: dict):
-    """ Mocks initiating a secure Pi Escrow transaction. """
-    if amount <= 0:
-        return {'success': False, 'message': 'Invalid amount.'}
-        
-    transaction_id = f"pi_tx_{int(time.time())}_{abs(hash(recipient_address))}" 
-    print(f"PI_SDK: Initiating Escrow payment of {amount} Pi to {recipient_address} (TX ID: {transaction_id})")
-    
-    return {
-        'success': True,
-        'transaction_id': transaction_id,
-        'status': 'AWAITING_FUNDS_LOCK',
+
+# --- Escrow Release Engine ---
+ESCROW_RELEASE_BATCH_SIZE = 500 # Orders claimed per claim transaction
+ESCROW_RELEASE_WORKERS = 32 # Concurrent Pi release calls
+ESCROW_CLAIM_LEASE = timedelta(minutes=10) # A claim older than this (crashed node) can be re-claimed
+ESCROW_RELEASABLE_STATUSES = ('PROCESSING', 'SHIPPED', 'DELIVERED')
+
+# --- Custom Error ---
+class InventoryError(Exception):
+    pass
+
+# --- Inventory Reservation (Batched) ---
+
+def _aggregate_cart_quantities(cart_data: list) -> dict:
+    """ Collapses cart lines into {product_id: total_quantity}, merging duplicate lines. """
+    try:
+        return cart_quantities(cart_data)
+    except PricingError as e:
+        raise InventoryError(str(e))
+
+
+def reserve_inventory(cart_data: list) -> dict:
+    """
+    Reserves stock for every cart line with a fixed number of queries, whatever the cart size.
+    1. Locks all cart products in ONE 'SELECT ... FOR UPDATE' ordered by id, so two
+       concurrent checkouts always acquire row locks in the same order (no deadlocks).
+    2. Checks stock in memory against the locked rows.
+    3. Applies every decrement with ONE conditional 'UPDATE ... WHERE inventory_stock >= qty'.
+    MUST be called inside an atomic block; raises InventoryError (rolling it back) on any shortage.
+    Returns the locked Product rows keyed by id.
+    """
+    quantities = _aggregate_cart_quantities(cart_data)
+    if not quantities:
+        raise InventoryError('Cart is empty.')
+
+    # 1. One ordered lock query for the whole cart
+    products = {
+        product.id: product
+        for product in Product.objects.select_for_update().filter(id__in=quantities).order_by('id')
     }
 
-def mock_pi_payment_verify(transaction_id: str):
-    """ Mocks verifying that funds are securely locked in Escrow. """
-    return {
-        'status': 'FUNDS_LOCKED_IN_ESCROW',
-        'is_locked': True,
-        'lock_until': (datetime.now() + timedelta(days=ESCROW_PERIOD_DAYS)).isoformat()
+    # 2. In-memory stock check (rows are locked, so the values cannot change under us)
+    missing = sorted(set(quantities) - set(products))
+    if missing:
+        raise InventoryError(f"Products not found: {missing}")
+    for product_id, quantity in quantities.items():
+        product = products[product_id]
+        if not product.is_available or product.inventory_stock < quantity:
+            raise InventoryError(f"Out of stock: {product.name}")
+
+    # 3. One conditional bulk decrement; the WHERE guard makes overselling impossible even
+    #    if a caller forgot the lock, and a short row count means the reservation failed.
+    stock_guard = Q()
+    for product_id, quantity in quantities.items():
+        stock_guard |= Q(id=product_id, inventory_stock__gte=quantity)
+
+    updated = Product.objects.filter(stock_guard).update(
+        inventory_stock=Case(
+            *[When(id=product_id, then=F('inventory_stock') - quantity) for product_id, quantity in quantities.items()],
+            default=F('inventory_stock'),
+        )
+    )
+    if updated != len(quantities):
+        raise InventoryError('Inventory changed during reservation.')
+
+    # Queue the stock change for the search index (no synchronous ES call in checkout)
+    SearchIndexOutbox.record(quantities, 'INVENTORY')
+    # Serialized products show stock: refresh their ETags and cached details once the reservation commits
+    bump_catalog_version_on_commit('product')
+    invalidate_product_details(quantities)
+
+    for product_id, quantity in quantities.items():
+        products[product_id].inventory_stock -= quantity
+
+    return products
+
+
+# --- Inventory & Cleanup Logic ---
+
+def _restock_for_orders(order_ids: list) -> int:
+    """
+    Returns the stock held by the given orders with two queries, whatever their size:
+    one GROUP BY over their OrderDetail rows, and one 'UPDATE ... CASE' over the affected products.
+    MUST be called inside an atomic block. Returns the number of products restocked.
+    """
+    quantities = {
+        row['product_id']: row['total_quantity']
+        for row in OrderDetail.objects.filter(order_id__in=order_ids)
+        .values('product_id')
+        .annotate(total_quantity=Sum('quantity'))
     }
+    if not quantities:
+        return 0
+
+    restocked = Product.objects.filter(id__in=quantities).update(
+        inventory_stock=Case(
+            *[When(id=product_id, then=F('inventory_stock') + quantity) for product_id, quantity in quantities.items()],
+            default=F('inventory_stock'),
+        )
+    )
+    SearchIndexOutbox.record(quantities, 'INVENTORY')
+    bump_catalog_version_on_commit('product')
+    invalidate_product_details(quantities)
+    return restocked
 
-# --- Inventory & Cleanup Logic (From your original code) ---
 
 @transaction.atomic
 def release_inventory_for_canceled_order(order_id: int):
@@ -50,24 +135,24 @@ def release_inventory_for_canceled_order(order_id: int):
     Uses select_for_update() to ensure atomicity during stock change.
     """
     try:
-        # 1. Fetch and Lock the Order (Order must be imported from .models)
+        # 1. Fetch and Lock the Order
         order = Order.objects.select_for_update().get(id=order_id)
         
         # Guard clause: Don't allow canceling fulfilled orders
         if order.status in ['PROCESSING', 'SHIPPED', 'DELIVERED', 'COMPLETED']:
             return {"success": False, "message": "Order is already being fulfilled and cannot be canceled."}
 
-        # 2. Loop through order details to return stock
-        # (OrderDetail must be imported from .models)
-        for detail in order.items.all(): 
-            # Product must be imported from products.models
-            product = detail.product 
-            product.inventory_stock += detail.quantity 
-            product.save()
+        # Guard clause: Stock of a canceled order has already been returned
+        if order.status in ['CANCELED', 'REFUNDED']:
+            return {"success": False, "message": "Order is already canceled."}
+
+        # 2. Return the stock of every order line in one aggregated update, and any redeemed points
+        _restock_for_orders([order.id])
+        refund_redeemed_points([order.id])
 
         # 3. Change order status to CANCELED
         order.status = 'CANCELED' 
-        order.save()
+        order.save(update_fields=['status'])
 
         # TODO: Add logic here to call pi_sdk.escrow.release_funds_to_buyer() 
         # if the order status was 'ESCROW_PENDING' to unlock the Pi.
@@ -78,127 +163,516 @@ def release_inventory_for_canceled_order(order_id: int):
         return {"success": False, "error": "Order not found."}
     except Exception as e:
         print(f"CRITICAL: Failed to release inventory for order {order_id}: {e}")
+        transaction.set_rollback(True)
         return {"success": False, "error": f"Failed to release inventory: {str(e)}"}
 
 
-@transaction.atomic
-def run_pending_order_cleanup():
+def run_pending_order_cleanup(batch_size: int = SWEEP_BATCH_SIZE):
     """
     Identifies all 'PENDING' orders older than ORDER_EXPIRATION_TIME and cancels them.
-    Designed to be run by a periodic scheduler (Cron/Celery).
+    Designed to be run by a periodic scheduler (Cron/Celery), on one or several nodes.
+
+    Works in keyset-paginated batches (id > last seen id), each in its own short transaction:
+    1. Claims up to batch_size expired order ids with 'FOR UPDATE SKIP LOCKED', so rows held by
+       a concurrent sweeper or an in-flight checkout finalization are skipped, not waited on.
+    2. Returns their stock with one aggregate query and one 'UPDATE ... CASE'.
+    3. Flips all their statuses to CANCELED with one bulk UPDATE.
     """
-    
-    # 1. Identify Expired Orders
     cutoff_time = timezone.now() - ORDER_EXPIRATION_TIME
-    expired_orders = Order.objects.filter(
-        status='PENDING',
-        created_at__lt=cutoff_time
-    )
+    last_id = 0
+    failed = False
+    batch_metrics = []
+    sweep_started = time.perf_counter()
 
-    cleanup_count = 0
-    
-    # 2. Cancel and Clean Each Expired Order
-    for order in expired_orders:
+    while True:
+        batch_started = time.perf_counter()
         try:
-            # Use the atomic function to safely return inventory
-            release_result = release_inventory_for_canceled_order(order.id)
-            if release_result['success']:
-                cleanup_count += 1
-                # TODO: Send a notification to the customer.
+            with transaction.atomic():
+                # 1. Claim the next batch of expired orders
+                order_ids = list(
+                    Order.objects.select_for_update(skip_locked=True)
+                    .filter(status='PENDING', created_at__lt=cutoff_time, id__gt=last_id)
+                    .order_by('id')
+                    .values_list('id', flat=True)[:batch_size]
+                )
+                if not order_ids:
+                    break
+                last_id = order_ids[-1]
+
+                # 2. Return stock (and redeemed loyalty points) for the whole batch
+                products_restocked = _restock_for_orders(order_ids)
+                refund_redeemed_points(order_ids)
+
+                # 3. Cancel the whole batch
+                orders_cleaned = Order.objects.filter(id__in=order_ids, status='PENDING').update(status='CANCELED')
 
         except Exception as e:
-            # Continue to the next order even if one fails
-            print(f"Cleanup critical failure for order {order.id}: {e}")
-            continue
+            # The batch was rolled back; stop here and let the next scheduled run retry it
+            print(f"Cleanup critical failure for batch ending at order {last_id}: {e}")
+            failed = True
+            break
 
-    return {"success": True, "orders_cleaned": cleanup_count}
+        # TODO: Send a notification to the customers of the canceled orders.
+        elapsed = time.perf_counter() - batch_started
+        batch_metrics.append({
+            'orders_cleaned': orders_cleaned,
+            'products_restocked': products_restocked,
+            'duration_ms': round(elapsed * 1000, 3),
+            'orders_per_sec': round(orders_cleaned / elapsed, 1) if elapsed else None,
+        })
 
+    total_elapsed = time.perf_counter() - sweep_started
+    cleanup_count = sum(batch['orders_cleaned'] for batch in batch_metrics)
+    return {
+        "success": not failed,
+        "orders_cleaned": cleanup_count,
+        "batches": len(batch_metrics),
+        "duration_ms": round(total_elapsed * 1000, 3),
+        "orders_per_sec": round(cleanup_count / total_elapsed, 1) if total_elapsed else None,
+        "batch_metrics": batch_metrics,
+    }
+
+
+# --- Primary Order Processing Logic (Pi Escrow Saga) ---
+# Checkout runs as a saga so no DB transaction (or row lock) is ever held across a Pi round-trip:
+#   Phase 1 (short transaction): reserve stock and create a PENDING order.
+#   Phase 2 (no transaction):    initiate and verify the escrow lock with the Pi SDK.
+#   Phase 3 (short transaction): move the order to PROCESSING.
+# Any failure after phase 1 runs the compensation step (cancel escrow, release stock).
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 3)
 
-# --- Primary Order Processing Logic (Pi Escrow) ---
 
 @transaction.atomic
-def process_secure_order(user, cart_data: list, seller_pi_address: str):
+def _reserve_pending_order(user, cart_data: list, loyalty_points: int = 0):
     """
-    The main function to process an order using secure Pi Escrow.
-    1. Calculates total amount.
-    2. Initiates and verifies Pi Escrow lock.
-    3. Deducts inventory and creates the Order in the DB.
-    """
-    total_pi_amount = 0.0
-    items_to_create = []
-
-    # 1. Calculate Total Amount & Perform Inventory Check/Lock (IMPORTANT)
-    for item in cart_data:
-        # In production: Fetch the Product object to verify price and stock availability 
-        # product = Product.objects.get(id=item['product_id'])
-        # if product.inventory_stock < item['quantity']: raise Exception('Out of Stock')
-
-        total_pi_amount += item['price'] * item['quantity']
-        items_to_create.append(item)
-
-    if total_pi_amount <= 0:
-        return {'success': False, 'message': 'Cart is empty or total is zero.'}
-    
-    # 2. Initiate Escrow via Pi SDK
-    app_fee = total_pi_amount * PI_APP_FEE_RATE
+    Phase 1: Reserves inventory and records the order as PENDING. Returns (order, quote).
+    Prices come from the locked product rows (never from the client) and loyalty points
+    are redeemed in the same transaction.
+    """
+    products = reserve_inventory(cart_data)
+    quantities = _aggregate_cart_quantities(cart_data)
+    quote = price_cart(
+        quantities,
+        {product_id: price_entry(products[product_id]) for product_id in quantities},
+        loyalty_points,
+    )
+
+    if quote['total'] <= 0:
+        raise InventoryError('Cart is empty or total is zero.')
+
+    order = Order.objects.create(
+        customer=user,
+        total_amount_pi=quote['total'],
+        status='PENDING',
+    )
+
+    # Create all Order Details records in a single INSERT
+    OrderDetail.objects.bulk_create([
+        OrderDetail(
+            order=order,
+            product_id=line['product_id'],
+            price_at_purchase=line['unit_price'],
+            quantity=line['quantity']
+        )
+        for line in quote['lines']
+    ])
+
+    if quote['loyalty_points_applied']:
+        redeem_points(user.id, quote['loyalty_points_applied'], order_id=order.id)
+    return order, quote
+
+
+@transaction.atomic
+def _finalize_order(order_id: int, transaction_id: str) -> bool:
+    """
+    Phase 3: Moves a PENDING order to PROCESSING once its escrow lock is verified.
+    Returns False if the order is no longer PENDING (e.g. expired and swept meanwhile).
+    """
+    updated = Order.objects.filter(id=order_id, status='PENDING').update(
+        status='PROCESSING', # Funds are secured, move to PROCESSING
+        pi_transaction_id=transaction_id,
+        escrow_release_date=timezone.now() + timedelta(days=ESCROW_PERIOD_DAYS)
+    )
+    return updated == 1
+
+
+def _compensate_order(order_id: int, transaction_id: str = None, release_stock: bool = True):
+    """ Compensation step: cancels the escrow lock (if one was initiated) and returns the reserved stock. """
+    if transaction_id:
+        try:
+            get_pi_sdk().cancel_payment(transaction_id)
+        except Exception as e:
+            print(f"CRITICAL: Failed to cancel Pi escrow {transaction_id} for order {order_id}: {e}")
+
+    if release_stock:
+        release_result = release_inventory_for_canceled_order(order_id)
+        if not release_result['success']:
+            print(f"CRITICAL: Compensation could not release inventory for order {order_id}: {release_result}")
+
+
+def _payment_request(user, order, cart_data: list, quote: dict, seller_pi_address: str) -> dict:
+    """ Keyword arguments of the Pi initiate_payment call for a reserved order. """
     payment_metadata = {
         'user_id': user.id,
-        'app_fee_pi': app_fee,
-        'items': [i['product_id'] for i in items_to_create]
+        'order_id': order.id,
+        'app_fee_pi': str(quote['app_fee']),
+        'items': [i['product_id'] for i in cart_data]
     }
-    
-    pi_response = mock_pi_payment_initiate(
-        recipient_address=seller_pi_address,
-        amount=total_pi_amount,
-        metadata=json.dumps(payment_metadata)
-    )
+    return {
+        'recipient_address': seller_pi_address,
+        'amount': quote['total'],
+        'metadata': json.dumps(payment_metadata),
+        'idempotency_key': f"order-{order.id}", # Makes the creation call safe to retry
+    }
+
+
+def process_secure_order(user, cart_data: list, seller_pi_address: str, loyalty_points=0):
+    """
+    The main function to process an order using secure Pi Escrow.
+    1. Reserves inventory, prices the cart server-side (optionally redeeming loyalty_points)
+       and creates a PENDING order (short transaction).
+    2. Initiates and verifies the Pi Escrow lock outside any transaction.
+    3. Finalizes the order as PROCESSING (short transaction), compensating on failure.
+    """
+    timings = {}
+    pi_sdk = get_pi_sdk()
+
+    # 1. Reserve Inventory & create the PENDING order
+    started = time.perf_counter()
+    try:
+        order, quote = _reserve_pending_order(user, cart_data, parse_redeem_points(loyalty_points))
+    except (InventoryError, PricingError, LoyaltyError) as e:
+        return {'success': False, 'message': str(e)}
+    timings['reserve_ms'] = _elapsed_ms(started)
+
+    # 2. Initiate Escrow via Pi SDK (no DB transaction is open here)
+    started = time.perf_counter()
+    try:
+        pi_response = pi_sdk.initiate_payment(**_payment_request(user, order, cart_data, quote, seller_pi_address))
+    except Exception as e:
+        print(f"Pi escrow initiation error for order {order.id}: {e}")
+        pi_response = {'success': False}
 
     if not pi_response.get('success'):
+        _compensate_order(order.id)
         return {'success': False, 'message': "Pi Payment Initiation Failed."}
-        
+
     transaction_id = pi_response['transaction_id']
-    
+
     # 3. Verify Funds Lock (Crucial step for secure processing)
-    verification_response = mock_pi_payment_verify(transaction_id)
-    
+    try:
+        verification_response = pi_sdk.verify_payment(transaction_id)
+    except Exception as e:
+        print(f"Pi escrow verification error for order {order.id}: {e}")
+        verification_response = {}
+
     if verification_response.get('status') != 'FUNDS_LOCKED_IN_ESCROW':
         # If lock fails, the order cannot proceed.
+        _compensate_order(order.id, transaction_id)
         return {'success': False, 'message': 'Payment failed: Funds not locked in Escrow.'}
+    timings['escrow_ms'] = _elapsed_ms(started)
 
-    # 4. Finalize DB entry, Deduct Inventory (MUST be done within the atomic block)
+    # 4. Finalize the order
+    started = time.perf_counter()
     try:
-        # Deduction should happen here using select_for_update() on Product model
-        # for item in items_to_create:
-        #    product = Product.objects.select_for_update().get(id=item['product_id'])
-        #    product.inventory_stock -= item['quantity']
-        #    product.save()
-
-        # Create the main Order record (Order must be imported)
-        order = Order.objects.create(
-            user=user,
-            total_amount_pi=total_pi_amount,
-            pi_transaction_id=transaction_id,
-            status='PROCESSING', # Funds are secured, move to PROCESSING
-            escrow_release_date=(datetime.now() + timedelta(days=ESCROW_PERIOD_DAYS))
+        finalized = _finalize_order(order.id, transaction_id)
+    except Exception as e:
+        print(f"Database finalize failed for order {order.id}: {e}. Compensating escrow lock.")
+        _compensate_order(order.id, transaction_id)
+        return {'success': False, 'message': 'Order creation failed in database.'}
+
+    if not finalized:
+        # The order expired while escrow was pending; the sweeper already returned its stock.
+        _compensate_order(order.id, transaction_id, release_stock=False)
+        return {'success': False, 'message': 'Order expired before payment was confirmed.'}
+    timings['finalize_ms'] = _elapsed_ms(started)
+
+    return {
+        'success': True,
+        'message': 'Order created successfully. Funds are securely held in Escrow.',
+        'order_id': order.id,
+        'transaction_id': transaction_id,
+        'timings': timings,
+    }
+
+
+# --- Async Checkout (ASGI) ---
+# Same saga, awaited: the Pi round-trips are awaited on the event loop instead of blocking a
+# worker, so one ASGI worker keeps hundreds of checkouts in flight. The transactional phases
+# (row locks, atomic blocks) have no async ORM equivalent and run through sync_to_async on
+# Django's thread-sensitive executor; single-statement steps use the async ORM directly.
+
+async def _acompensate_order(order_id: int, transaction_id: str = None, release_stock: bool = True):
+    """ Async compensation step (see _compensate_order). """
+    if transaction_id:
+        try:
+            await get_pi_sdk().acancel_payment(transaction_id)
+        except Exception as e:
+            print(f"CRITICAL: Failed to cancel Pi escrow {transaction_id} for order {order_id}: {e}")
+
+    if release_stock:
+        release_result = await sync_to_async(release_inventory_for_canceled_order)(order_id)
+        if not release_result['success']:
+            print(f"CRITICAL: Compensation could not release inventory for order {order_id}: {release_result}")
+
+
+async def aprocess_secure_order(user, cart_data: list, seller_pi_address: str, loyalty_points=0):
+    """ Async version of process_secure_order; same phases, results and compensation. """
+    timings = {}
+    pi_sdk = get_pi_sdk()
+
+    # 1. Reserve Inventory & create the PENDING order
+    started = time.perf_counter()
+    try:
+        order, quote = await sync_to_async(_reserve_pending_order)(user, cart_data, parse_redeem_points(loyalty_points))
+    except (InventoryError, PricingError, LoyaltyError) as e:
+        return {'success': False, 'message': str(e)}
+    timings['reserve_ms'] = _elapsed_ms(started)
+
+    # 2. Initiate and verify the escrow lock (awaited; the worker serves other requests meanwhile)
+    started = time.perf_counter()
+    try:
+        pi_response = await pi_sdk.ainitiate_payment(
+            **_payment_request(user, order, cart_data, quote, seller_pi_address)
         )
+    except Exception as e:
+        print(f"Pi escrow initiation error for order {order.id}: {e}")
+        pi_response = {'success': False}
+
+    if not pi_response.get('success'):
+        await _acompensate_order(order.id)
+        return {'success': False, 'message': "Pi Payment Initiation Failed."}
+
+    transaction_id = pi_response['transaction_id']
 
-        # Create Order Details records (OrderDetail must be imported)
-        for item in items_to_create:
-            OrderDetail.objects.create(
-                order=order,
-                product_id=item['product_id'],
-                price_at_purchase=item['price'],
-                quantity=item['quantity']
-            )
-            
+    try:
+        verification_response = await pi_sdk.averify_payment(transaction_id)
+    except Exception as e:
+        print(f"Pi escrow verification error for order {order.id}: {e}")
+        verification_response = {}
+
+    if verification_response.get('status') != 'FUNDS_LOCKED_IN_ESCROW':
+        await _acompensate_order(order.id, transaction_id)
+        return {'success': False, 'message': 'Payment failed: Funds not locked in Escrow.'}
+    timings['escrow_ms'] = _elapsed_ms(started)
+
+    # 3. Finalize the order (one conditional UPDATE: async ORM)
+    started = time.perf_counter()
+    try:
+        finalized = await Order.objects.filter(id=order.id, status='PENDING').aupdate(
+            status='PROCESSING',
+            pi_transaction_id=transaction_id,
+            escrow_release_date=timezone.now() + timedelta(days=ESCROW_PERIOD_DAYS)
+        ) == 1
     except Exception as e:
-        # If DB save fails, we must attempt to cancel the Pi Escrow lock!
-        print(f"Database save failed: {e}. CRITICAL: Attempting to notify Pi SDK to cancel lock.")
+        print(f"Database finalize failed for order {order.id}: {e}. Compensating escrow lock.")
+        await _acompensate_order(order.id, transaction_id)
         return {'success': False, 'message': 'Order creation failed in database.'}
 
+    if not finalized:
+        await _acompensate_order(order.id, transaction_id, release_stock=False)
+        return {'success': False, 'message': 'Order expired before payment was confirmed.'}
+    timings['finalize_ms'] = _elapsed_ms(started)
+
     return {
         'success': True,
         'message': 'Order created successfully. Funds are securely held in Escrow.',
         'order_id': order.id,
-        'transaction_id': transaction_id
+        'transaction_id': transaction_id,
+        'timings': timings,
     }
+
+
+async def averify_order_escrow(user, order_id: int):
+    """ Checks the live Pi escrow status of one of the buyer's orders. """
+    order = await Order.objects.filter(id=order_id, customer=user).only(
+        'id', 'status', 'pi_transaction_id', 'escrow_release_date'
+    ).afirst()
+    if order is None:
+        return {'success': False, 'error': 'Order not found.'}
+    if not order.pi_transaction_id:
+        return {'success': False, 'error': f"Order #{order_id} has no Pi escrow transaction."}
+
+    try:
+        verification = await get_pi_sdk().averify_payment(order.pi_transaction_id)
+    except Exception as e:
+        print(f"Pi escrow verification error for order {order_id}: {e}")
+        return {'success': False, 'error': 'Pi escrow status is unavailable; please retry later.', 'unavailable': True}
+    return {
+        'success': True,
+        'order_id': order.id,
+        'order_status': order.status,
+        'escrow_status': verification.get('status'),
+        'is_locked': verification.get('is_locked', False),
+        'escrow_release_date': order.escrow_release_date.isoformat() if order.escrow_release_date else None,
+    }
+
+
+# --- Escrow Release Engine ---
+# Releases escrowed funds for orders whose escrow_release_date has passed, at scale and on
+# any number of nodes at once:
+# 1. Claim: a short transaction picks a batch with 'FOR UPDATE SKIP LOCKED' (index on
+#    status + escrow_release_date) and stamps escrow_claimed_at (a lease), then commits.
+# 2. Release: the Pi release calls run concurrently in a bounded thread pool, with no
+#    transaction or row lock held.
+# 3. Settle: one bulk UPDATE moves the released orders to COMPLETED, one clears the lease
+#    of the failed ones so the next run retries them.
+# A run attempts each order at most once and stops at the first batch that completes
+# nothing, so a failing Pi API (or an open circuit breaker) cannot keep it spinning.
+# A node dying between 1 and 3 leaves leased orders that are re-claimed after
+# ESCROW_CLAIM_LEASE; Pi releases are idempotent per transaction id.
+
+def _releasable_orders(now):
+    return Order.objects.filter(
+        status__in=ESCROW_RELEASABLE_STATUSES,
+        pi_transaction_id__isnull=False,
+    ).filter(
+        Q(escrow_claimed_at__isnull=True) | Q(escrow_claimed_at__lt=now - ESCROW_CLAIM_LEASE)
+    )
+
+
+def _claim_escrow_batch(now, batch_size: int, exclude_ids=()) -> list:
+    """
+    Claims up to batch_size due orders, skipping exclude_ids (already attempted in this run).
+    Returns [(order_id, pi_transaction_id)].
+    """
+    with transaction.atomic():
+        rows = list(
+            _releasable_orders(now).select_for_update(skip_locked=True)
+            .filter(escrow_release_date__lte=now)
+            .exclude(id__in=exclude_ids)
+            .order_by('escrow_release_date', 'id')
+            .values_list('id', 'pi_transaction_id')[:batch_size]
+        )
+        if rows:
+            Order.objects.filter(id__in=[order_id for order_id, _ in rows]).update(escrow_claimed_at=now)
+    return rows
+
+
+def _release_escrow_funds(pi_sdk, order_id: int, transaction_id: str) -> bool:
+    try:
+        return bool(pi_sdk.release_funds(transaction_id).get('success'))
+    except Exception as e:
+        print(f"Pi escrow release error for order {order_id} ({transaction_id}): {e}")
+        return False
+
+
+def _settle_escrow_batch(released_ids: list, failed_ids: list) -> int:
+    """ Bulk status updates for one released batch. Returns the number of orders completed. """
+    with transaction.atomic():
+        completed = 0
+        if released_ids:
+            completed = Order.objects.filter(
+                id__in=released_ids, status__in=ESCROW_RELEASABLE_STATUSES
+            ).update(status='COMPLETED', escrow_claimed_at=None)
+        if failed_ids:
+            Order.objects.filter(id__in=failed_ids).update(escrow_claimed_at=None)
+    return completed
+
+
+def run_escrow_release(batch_size: int = ESCROW_RELEASE_BATCH_SIZE, workers: int = ESCROW_RELEASE_WORKERS,
+                       max_batches: int = None):
+    """
+    Releases escrow for every order due as of now. Designed to be run by a periodic
+    scheduler on one or several nodes. Returns throughput metrics.
+    """
+    pi_sdk = get_pi_sdk()
+    now = timezone.now()
+    batch_metrics = []
+    attempted_ids = set() # Failed orders get their lease cleared; never re-claim them in this run
+    run_started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while max_batches is None or len(batch_metrics) < max_batches:
+            batch_started = time.perf_counter()
+            rows = _claim_escrow_batch(now, batch_size, attempted_ids)
+            if not rows:
+                break
+            attempted_ids.update(order_id for order_id, _ in rows)
+
+            outcomes = list(pool.map(lambda row: _release_escrow_funds(pi_sdk, *row), rows))
+            released_ids = [order_id for (order_id, _), released in zip(rows, outcomes) if released]
+            failed_ids = [order_id for (order_id, _), released in zip(rows, outcomes) if not released]
+            completed = _settle_escrow_batch(released_ids, failed_ids)
+
+            elapsed = time.perf_counter() - batch_started
+            batch_metrics.append({
+                'claimed': len(rows),
+                'completed': completed,
+                'failed': len(failed_ids),
+                'duration_ms': round(elapsed * 1000, 3),
+                'orders_per_sec': round(completed / elapsed, 1) if elapsed else None,
+            })
+            if not completed:
+                # Pi is rejecting every release: leave the rest for the next scheduled run
+                print(f"Escrow release run stopped: batch of {len(rows)} orders completed none.")
+                break
+
+    total_elapsed = time.perf_counter() - run_started
+    completed = sum(batch['completed'] for batch in batch_metrics)
+    return {
+        'success': True,
+        'completed': completed,
+        'failed': sum(batch['failed'] for batch in batch_metrics),
+        'batches': len(batch_metrics),
+        'duration_ms': round(total_elapsed * 1000, 3),
+        'orders_per_sec': round(completed / total_elapsed, 1) if total_elapsed else None,
+        'batch_metrics': batch_metrics,
+    }
+
+
+def _claim_order_for_buyer(user, order_id: int, now):
+    """
+    Claim step of a buyer-confirmed completion. Returns (result, transaction_id): a final
+    result dict when there is nothing to release, otherwise (None, the claimed transaction id).
+    """
+    with transaction.atomic():
+        order = Order.objects.select_for_update().filter(id=order_id, customer=user).first()
+        if order is None:
+            return {'success': False, 'error': 'Order not found.'}, None
+        if order.status == 'COMPLETED':
+            return {'success': True, 'message': f"Order #{order_id} is already completed."}, None
+        if order.status not in ESCROW_RELEASABLE_STATUSES or not order.pi_transaction_id:
+            return {'success': False, 'error': f"Order #{order_id} cannot be completed from status {order.status}."}, None
+        if order.escrow_claimed_at and order.escrow_claimed_at >= now - ESCROW_CLAIM_LEASE:
+            return {'success': True, 'message': f"Funds release for order #{order_id} is already in progress."}, None
+        Order.objects.filter(id=order_id).update(escrow_claimed_at=now)
+        return None, order.pi_transaction_id
+
+
+def _completion_result(order_id: int, released: bool) -> dict:
+    if not released:
+        return {'success': False, 'error': 'Pi escrow release failed; please retry later.'}
+    return {'success': True, 'message': f"Order #{order_id} completed. Funds released to the seller."}
+
+
+def complete_order_for_buyer(user, order_id: int):
+    """
+    Buyer-confirmed delivery: releases the escrow of one order immediately, using the
+    same claim / release / settle steps as the release engine (so both can never release
+    the same order twice).
+    """
+    result, transaction_id = _claim_order_for_buyer(user, order_id, timezone.now())
+    if result is not None:
+        return result
+
+    released = _release_escrow_funds(get_pi_sdk(), order_id, transaction_id)
+    _settle_escrow_batch([order_id] if released else [], [] if released else [order_id])
+    return _completion_result(order_id, released)
+
+
+async def acomplete_order_for_buyer(user, order_id: int):
+    """ Async version of complete_order_for_buyer: the Pi release call is awaited. """
+    result, transaction_id = await sync_to_async(_claim_order_for_buyer)(user, order_id, timezone.now())
+    if result is not None:
+        return result
+
+    try:
+        released = bool((await get_pi_sdk().arelease_funds(transaction_id)).get('success'))
+    except Exception as e:
+        print(f"Pi escrow release error for order {order_id} ({transaction_id}): {e}")
+        released = False
+    await sync_to_async(_settle_escrow_batch)([order_id] if released else [], [] if released else [order_id])
+    return _completion_result(order_id, released)
@@ -2,7 +2,8 @@
 
 from django.urls import path
 from . import views
-from .views import CheckoutPiAPIView, CompleteOrderAPIView # استيراد الدالات الصحيحة
+from .views import CheckoutPiAPIView, CompleteOrderAPIView, CartPreviewAPIView # استيراد الدالات الصحيحة
+from .async_views import AsyncCheckoutAPIView, AsyncEscrowVerifyAPIView, AsyncCompleteOrderAPIView
 
 urlpatterns = [
     # 1. API Endpoint لإنشاء الطلب وبدء الضمان (Escrow Lock)
@@ -12,6 +13,16 @@ urlpatterns = [
     # 2. API Endpoint لإنهاء الطلب وتحرير أموال Pi (يتم استدعاؤها من قبل المشتري)
     # /api/orders/123/complete/
     path('<int:order_id>/complete/', CompleteOrderAPIView.as_view(), name='complete-order'),
+
+    # 3. Cart preview: server-side prices and totals, no reservation
+    # /api/orders/cart/preview/
+    path('cart/preview/', CartPreviewAPIView.as_view(), name='cart-preview'),
+
+    # 4. Async (ASGI) versions of the hot endpoints: the Pi round-trips are awaited
+    # /api/orders/async/checkout/, /api/orders/async/123/escrow/, /api/orders/async/123/complete/
+    path('async/checkout/', AsyncCheckoutAPIView.as_view(), name='async-pi-checkout'),
+    path('async/<int:order_id>/escrow/', AsyncEscrowVerifyAPIView.as_view(), name='async-verify-escrow'),
+    path('async/<int:order_id>/complete/', AsyncCompleteOrderAPIView.as_view(), name='async-complete-order'),
     
     # يمكنك إضافة مسارات أخرى هنا لعرض قائمة وتفاصيل الطلبات:
     # path('', views.OrderListAPIView.as_view(), name='order-list'),
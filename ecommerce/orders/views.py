@@ -7,7 +7,12 @@ from rest_framework.permissions import IsAuthenticated
 from django.db import transaction # Ensure transaction is imported for safety
 
 # Import the core logic from the service layer
-from .services import process_secure_order 
+from .services import process_secure_order, complete_order_for_buyer
+from .pricing import PricingError, quote_cart
+from .idempotency import (
+    IDEMPOTENCY_HEADER, MAX_KEY_LENGTH, IdempotencyConflict, IdempotencyInProgress,
+    request_fingerprint, run_idempotent
+)
 # Note: We do NOT need a separate verify/callback view for Pi's *initial* payment lock, 
 # as the lock confirmation is synchronous within process_secure_order.
 
@@ -20,6 +25,33 @@ class CheckoutPiAPIView(APIView):
     permission_classes = [IsAuthenticated] 
 
     def post(self, request):
+        # Retries carrying the same Idempotency-Key never run the checkout twice
+        idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not idempotency_key:
+            status_code, body = self.checkout(request)
+            return Response(body, status=status_code)
+
+        if len(idempotency_key) > MAX_KEY_LENGTH:
+            return Response({"error": f"{IDEMPOTENCY_HEADER} is too long."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            status_code, body, replayed = run_idempotent(
+                request.user.id,
+                idempotency_key,
+                request_fingerprint(request.data),
+                lambda: self.checkout(request)
+            )
+        except IdempotencyConflict as e:
+            return Response({"error": str(e)}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        except IdempotencyInProgress as e:
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT, headers={'Retry-After': '1'})
+
+        response = Response(body, status=status_code)
+        if replayed:
+            response['Idempotent-Replayed'] = 'true'
+        return response
+
+    def checkout(self, request):
+        """ Runs the checkout once. Returns (status_code, body). """
         # 1. Data extraction and preparation
         user = request.user
         cart_data = request.data.get('cart_items', [])
@@ -30,40 +62,56 @@ class CheckoutPiAPIView(APIView):
         seller_pi_address = request.data.get('seller_pi_address') 
 
         if not cart_data or not shipping_address or not seller_pi_address:
-            return Response(
-                {"error": "Missing required fields.", "details": "cart_items, shipping_address, and seller_pi_address are required."}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
+            return checkout_missing_fields()
 
         try:
             # 2. Call the Secure Escrow Processing Service
-            # This service verifies Pi lock, deducts inventory, and creates the order atomically.
+            # This service reserves inventory, verifies the Pi lock outside any DB transaction,
+            # and finalizes the order (compensating automatically if a step fails).
             result = process_secure_order(
                 user=user, 
                 cart_data=cart_data, 
-                seller_pi_address=seller_pi_address
+                seller_pi_address=seller_pi_address,
+                loyalty_points=request.data.get('redeem_points', 0)
             )
-            
-            if result.get('success'):
-                return Response({
-                    "message": "Order created successfully. Pi funds are securely locked in Escrow.", 
-                    "order_id": result.get('order_id'),
-                    "pi_transaction_id": result.get('transaction_id')
-                }, status=status.HTTP_201_CREATED)
-            else:
-                # If the service fails (e.g., Pi lock failed, inventory insufficient)
-                return Response(
-                    {"error": "Order failed during processing.", "details": result.get('message')}, 
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+            return checkout_result(result)
 
         except Exception as e:
-            # Log the exception for debugging
-            print(f"CRITICAL API ERROR: {e}") 
-            return Response(
-                {"error": "An internal server error occurred.", "details": str(e)}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+            return checkout_error(e)
+
+
+# --- Checkout responses (shared with the async views in async_views.py) ---
+def checkout_missing_fields():
+    return status.HTTP_400_BAD_REQUEST, {
+        "error": "Missing required fields.", "details": "cart_items, shipping_address, and seller_pi_address are required."
+    }
+
+
+def checkout_result(result: dict):
+    if result.get('success'):
+        return status.HTTP_201_CREATED, {
+            "message": "Order created successfully. Pi funds are securely locked in Escrow.", 
+            "order_id": result.get('order_id'),
+            "pi_transaction_id": result.get('transaction_id')
+        }
+    # If the service fails (e.g., Pi lock failed, inventory insufficient)
+    return status.HTTP_400_BAD_REQUEST, {
+        "error": "Order failed during processing.", "details": result.get('message')
+    }
+
+
+def checkout_error(e: Exception):
+    # Log the exception for debugging
+    print(f"CRITICAL API ERROR: {e}") 
+    return status.HTTP_500_INTERNAL_SERVER_ERROR, {
+        "error": "An internal server error occurred.", "details": str(e)
+    }
+
+
+def completion_status(result: dict) -> int:
+    if result.get('success'):
+        return status.HTTP_200_OK
+    return status.HTTP_404_NOT_FOUND if result['error'] == 'Order not found.' else status.HTTP_400_BAD_REQUEST
 
 
 # --- 2. Order Completion/Funds Release API ---
@@ -76,10 +124,44 @@ class CompleteOrderAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, order_id):
-        # TODO: Implement a service function (e.g., release_escrow_funds)
-        # 1. Verify that the current user is the original buyer of this order.
-        # 2. Call Pi SDK service to release funds immediately (pi_sdk.escrow.release_funds_to_seller(transaction_id)).
-        # 3. Update Order status to 'COMPLETED'.
-        
-        return Response({"message": f"Order {order_id} completion initiated (Funds release pending)."}, 
-                        status=status.HTTP_200_OK)
+        # Ownership check, Pi release and the COMPLETED update all happen in the service
+        result = complete_order_for_buyer(request.user, order_id)
+        if not result.get('success'):
+            return Response({"error": result['error']}, status=completion_status(result))
+
+        return Response({"message": result['message']}, status=status.HTTP_200_OK)
+
+
+# --- 3. Cart Preview API ---
+class CartPreviewAPIView(APIView):
+    """
+    Prices a cart without reserving anything: authoritative unit prices, Decimal totals,
+    loyalty discount and app fee, as checkout will compute them. Served from the per-worker
+    price snapshot, so previews do not query products.
+    Body: {"cart_items": [{"product_id": 1, "quantity": 2}], "redeem_points": 0}
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        try:
+            quote = quote_cart(
+                request.data.get('cart_items') or [],
+                request.data.get('redeem_points', 0),
+                user=request.user
+            )
+        except (PricingError, KeyError, TypeError, ValueError) as e:
+            return Response({"error": "Invalid cart.", "details": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Amounts as strings: JSON floats would lose the 9 decimal places
+        return Response({
+            "lines": [
+                {**line, "unit_price": str(line['unit_price']), "line_total": str(line['line_total'])}
+                for line in quote['lines']
+            ],
+            "subtotal": str(quote['subtotal']),
+            "loyalty_points_applied": quote['loyalty_points_applied'],
+            "loyalty_discount": str(quote['loyalty_discount']),
+            "total": str(quote['total']),
+            "app_fee": str(quote['app_fee']),
+            "in_stock": quote['in_stock'],
+        }, status=status.HTTP_200_OK)
@@ -0,0 +1,131 @@
+# File: tec/ecommerce/products/cache.py
+
+import threading
+import time
+from collections import OrderedDict
+from django.core.cache import cache
+from django.db import transaction
+
+# ----------------------------------------------------
+# Catalog Version Keys
+# ----------------------------------------------------
+# Every cached catalog payload embeds the current version of its scope (e.g. 'category')
+# in its cache key. Bumping the version on any write makes all old entries unreachable
+# at once, on every worker, without having to find and delete them.
+
+def _version_key(scope: str) -> str:
+    return f"catalog:version:{scope}"
+
+
+def _modified_key(scope: str) -> str:
+    return f"catalog:modified:{scope}"
+
+
+def _initial_version() -> int:
+    # Millisecond timestamp, so a version lost on cache eviction never restarts below an old one
+    return int(time.time() * 1000)
+
+
+def get_catalog_version(scope: str) -> int:
+    """ Returns the current version of a catalog scope, initializing it if needed. """
+    key = _version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def get_catalog_versions(scopes) -> dict:
+    """ Bulk get_catalog_version: {scope: version} in one get_many round-trip (missing scopes are initialized). """
+    keys = {_version_key(scope): scope for scope in scopes}
+    found = cache.get_many(list(keys))
+    versions = {keys[key]: version for key, version in found.items()}
+    for key, scope in keys.items():
+        if key not in found:
+            versions[scope] = get_catalog_version(scope)
+    return versions
+
+
+def bump_catalog_version(scope: str) -> int:
+    """ Invalidates every cached payload of a catalog scope. Returns the new version. """
+    key = _version_key(scope)
+    cache.set(_modified_key(scope), int(time.time()), timeout=None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Key missing (never set or evicted): start from a fresh timestamp
+        version = _initial_version()
+        cache.set(key, version, timeout=None)
+        return version
+
+
+def bump_catalog_version_on_commit(scope: str):
+    """
+    Bumps the version once the current transaction commits, so a reader can never
+    cache (or tag with an ETag) pre-commit data under the new version.
+    """
+    transaction.on_commit(lambda: bump_catalog_version(scope))
+
+
+def get_catalog_last_modified(scope: str) -> int:
+    """ Unix time of the last write to a catalog scope (initialized to now if unknown). """
+    key = _modified_key(scope)
+    modified = cache.get(key)
+    if modified is None:
+        cache.add(key, int(time.time()), timeout=None)
+        modified = cache.get(key)
+    return modified
+
+
+# ----------------------------------------------------
+# Per-Worker LRU Tier
+# ----------------------------------------------------
+class LocalLRUCache:
+    """
+    Process-local front tier for hot, pre-rendered payloads (bytes).
+    Entries live at most ttl_seconds (which bounds cross-worker staleness) and the
+    total size is capped at max_bytes, evicting the least recently used first.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict() # key -> (expires_at, payload)
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[1])
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, payload: bytes):
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, payload)
+            self._size += len(payload)
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
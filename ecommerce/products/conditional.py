@@ -0,0 +1,50 @@
+# File: tec/ecommerce/products/conditional.py
+
+import hashlib
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .cache import get_catalog_version, get_catalog_last_modified
+
+# ----------------------------------------------------
+# Conditional GET for Public Catalog Endpoints
+# ----------------------------------------------------
+class CatalogConditionalGetMixin:
+    """
+    Adds ETag / Last-Modified validation to read-only catalog views.
+    The validators are derived from the catalog versions of etag_scopes (a few cache
+    reads), so a matching If-None-Match / If-Modified-Since is answered with 304 BEFORE
+    any queryset or serializer runs. Cache-Control lets a CDN or reverse proxy absorb
+    repeat traffic for s_maxage seconds.
+    """
+    etag_scopes = () # Catalog scopes the response content depends on (see products/cache.py)
+    cache_max_age = 30 # Browsers
+    cache_s_maxage = 120 # Shared caches (CDN / reverse proxy)
+
+    def get_catalog_etag(self, request) -> str:
+        versions = ':'.join(f"{scope}={get_catalog_version(scope)}" for scope in self.etag_scopes)
+        # The same versions serve different pages/filters/formats: fold the URL and Accept in
+        fingerprint = f"{versions}|{request.get_full_path()}|{request.META.get('HTTP_ACCEPT', '')}"
+        return quote_etag('W/"%s"' % hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:20])
+
+    def get_catalog_last_modified(self) -> int:
+        return max(get_catalog_last_modified(scope) for scope in self.etag_scopes)
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or not self.etag_scopes:
+            return super().dispatch(request, *args, **kwargs)
+
+        etag = self.get_catalog_etag(request)
+        last_modified = self.get_catalog_last_modified()
+
+        # 304 short-circuit: no DB query, no serialization
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            patch_cache_control(response, public=True, max_age=self.cache_max_age, s_maxage=self.cache_s_maxage)
+            patch_vary_headers(response, ['Accept'])
+        return response
@@ -0,0 +1,207 @@
+# File: tec/ecommerce/products/fulltext.py
+
+import re
+import time
+from django.db import connection
+
+from .models import Product
+
+# --- Constants ---
+FULLTEXT_TABLE = 'products_fulltext'
+FULLTEXT_MAX_RESULTS = 200 # Ranked candidates returned per search
+FULLTEXT_BUILD_BATCH_SIZE = 2000 # Products read and written per backfill batch
+FULLTEXT_CHECK_SECONDS = 60 # How often a worker re-checks a missing index table
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+_table_checked_at = {} # vendor -> monotonic time of the last failed existence check
+
+# ----------------------------------------------------
+# DB-Native Full-Text Index (ES Fallback)
+# ----------------------------------------------------
+# A side table holding one search document per product:
+# - PostgreSQL: weighted tsvector (name A, tags B, description C) under a GIN index,
+#   plus a pg_trgm GIN index on the name for typo-tolerant matches.
+# - SQLite: an FTS5 virtual table (rowid = product id) ranked with bm25().
+# Other vendors return None from search_product_ids() and callers fall back to icontains.
+# The table is created and backfilled by 'manage.py build_product_fulltext_index' and
+# kept current by the product signals (same transaction as the product write).
+
+POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE TABLE IF NOT EXISTS {FULLTEXT_TABLE} ("
+    " product_id bigint PRIMARY KEY,"
+    " name text NOT NULL,"
+    " document tsvector NOT NULL)",
+    f"CREATE INDEX IF NOT EXISTS {FULLTEXT_TABLE}_document_idx ON {FULLTEXT_TABLE} USING GIN (document)",
+    f"CREATE INDEX IF NOT EXISTS {FULLTEXT_TABLE}_name_trgm_idx ON {FULLTEXT_TABLE} USING GIN (name gin_trgm_ops)",
+]
+
+SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FULLTEXT_TABLE} USING fts5("
+    " name, tags, description,"
+    " tokenize = 'unicode61 remove_diacritics 2',"
+    " prefix = '2 3')",
+]
+
+# Column weights for SQLite bm25() in (name, tags, description) order
+SQLITE_BM25_WEIGHTS = (10.0, 5.0, 1.0)
+
+
+def _tokens(query: str) -> list:
+    return _TOKEN.findall((query or '').lower())
+
+
+def is_supported() -> bool:
+    return connection.vendor in ('postgresql', 'sqlite')
+
+
+def fulltext_table_exists() -> bool:
+    """ True once the index table was built. A missing table is re-checked at most every FULLTEXT_CHECK_SECONDS. """
+    vendor = connection.vendor
+    checked_at = _table_checked_at.get(vendor)
+    if checked_at is True:
+        return True
+    if checked_at is not None and time.monotonic() - checked_at < FULLTEXT_CHECK_SECONDS:
+        return False
+    exists = FULLTEXT_TABLE in connection.introspection.table_names()
+    _table_checked_at[vendor] = True if exists else time.monotonic()
+    return exists
+
+
+def create_fulltext_table():
+    """ Creates the index table and its indexes (idempotent). """
+    ddl = POSTGRES_DDL if connection.vendor == 'postgresql' else SQLITE_DDL
+    with connection.cursor() as cursor:
+        for statement in ddl:
+            cursor.execute(statement)
+    _table_checked_at.pop(connection.vendor, None)
+
+# ----------------------------------------------------
+# 1. Index Maintenance
+# ----------------------------------------------------
+def _document_rows(product_ids: list):
+    """ (id, name, tags, description) per product, loaded in ONE query (tags joined in). """
+    rows = {}
+    for product_id, name, description, tag_name in Product.objects.filter(id__in=product_ids).values_list(
+        'id', 'name', 'description', 'tags__name'
+    ):
+        row = rows.setdefault(product_id, [name or '', [], description or ''])
+        if tag_name:
+            row[1].append(tag_name)
+    return [(product_id, name, ' '.join(tags), description) for product_id, (name, tags, description) in rows.items()]
+
+
+def remove_products(product_ids: list):
+    """ Drops products from the index (deleted products). """
+    if not product_ids or not is_supported() or not fulltext_table_exists():
+        return
+    column = 'product_id' if connection.vendor == 'postgresql' else 'rowid'
+    placeholders = ', '.join(['%s'] * len(product_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FULLTEXT_TABLE} WHERE {column} IN ({placeholders})", list(product_ids))
+
+
+def index_products(product_ids: list) -> int:
+    """
+    (Re)writes the search documents of the given products. Products that no longer
+    exist are dropped. Returns the number of documents written.
+    """
+    if not product_ids or not is_supported() or not fulltext_table_exists():
+        return 0
+    rows = _document_rows(product_ids)
+    missing = set(product_ids) - {row[0] for row in rows}
+    remove_products(list(missing))
+    if not rows:
+        return 0
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.executemany(
+                f"INSERT INTO {FULLTEXT_TABLE} (product_id, name, document) VALUES ("
+                " %s, %s,"
+                " setweight(to_tsvector('simple', %s), 'A') ||"
+                " setweight(to_tsvector('simple', %s), 'B') ||"
+                " setweight(to_tsvector('simple', %s), 'C'))"
+                " ON CONFLICT (product_id) DO UPDATE SET name = EXCLUDED.name, document = EXCLUDED.document",
+                [(product_id, name, name, tags, description) for product_id, name, tags, description in rows]
+            )
+        else:
+            # FTS5 has no UPSERT: delete then insert under the same rowid
+            placeholders = ', '.join(['%s'] * len(rows))
+            cursor.execute(f"DELETE FROM {FULLTEXT_TABLE} WHERE rowid IN ({placeholders})", [row[0] for row in rows])
+            cursor.executemany(
+                f"INSERT INTO {FULLTEXT_TABLE} (rowid, name, tags, description) VALUES (%s, %s, %s, %s)",
+                rows
+            )
+    return len(rows)
+
+
+def build_fulltext_index(batch_size: int = FULLTEXT_BUILD_BATCH_SIZE):
+    """
+    Creates the index table if needed and backfills every product in keyset batches
+    ordered by id (constant memory, no OFFSET).
+    """
+    if not is_supported():
+        return {'success': False, 'error': f"Full-text fallback not supported on '{connection.vendor}'."}
+
+    started = time.perf_counter()
+    create_fulltext_table()
+    indexed = 0
+    last_id = 0
+    while True:
+        product_ids = list(
+            Product.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not product_ids:
+            break
+        indexed += index_products(product_ids)
+        last_id = product_ids[-1]
+
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            # Merge the FTS5 b-tree segments written by the backfill
+            cursor.execute(f"INSERT INTO {FULLTEXT_TABLE} ({FULLTEXT_TABLE}) VALUES ('optimize')")
+
+    elapsed = time.perf_counter() - started
+    return {
+        'success': True,
+        'indexed': indexed,
+        'seconds': round(elapsed, 2),
+        'docs_per_sec': round(indexed / elapsed, 1) if elapsed else None,
+    }
+
+# ----------------------------------------------------
+# 2. Ranked Search
+# ----------------------------------------------------
+def search_product_ids(query: str, limit: int = FULLTEXT_MAX_RESULTS):
+    """
+    Returns product ids matching every term of the query (prefix match on the last
+    characters typed), best ranked first. Returns None when the full-text index is not
+    available, so the caller can fall back to a plain icontains scan.
+    """
+    if not is_supported() or not fulltext_table_exists():
+        return None
+    tokens = _tokens(query)
+    if not tokens:
+        return []
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            tsquery = ' & '.join(f"{token}:*" for token in tokens)
+            # tsvector match (GIN) OR trigram similarity on the name (GIN, typo tolerant)
+            cursor.execute(
+                f"SELECT product_id FROM {FULLTEXT_TABLE}"
+                " WHERE document @@ to_tsquery('simple', %s) OR name %% %s"
+                " ORDER BY ts_rank_cd(document, to_tsquery('simple', %s)) DESC, similarity(name, %s) DESC"
+                " LIMIT %s",
+                [tsquery, query, tsquery, query, limit]
+            )
+        else:
+            match = ' '.join(f'"{token}"*' for token in tokens)
+            cursor.execute(
+                f"SELECT rowid FROM {FULLTEXT_TABLE} WHERE {FULLTEXT_TABLE} MATCH %s"
+                f" ORDER BY bm25({FULLTEXT_TABLE}, {', '.join(str(w) for w in SQLITE_BM25_WEIGHTS)})"
+                " LIMIT %s",
+                [match, limit]
+            )
+        return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,74 @@
+# File: tec/ecommerce/products/management/commands/benchmark_product_search.py
+
+import statistics
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from products.fulltext import search_product_ids, FULLTEXT_MAX_RESULTS
+from products.models import Product
+
+
+def _percentile(values: list, percent: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _icontains_ids(query: str, limit: int) -> list:
+    """ The previous search path: icontains over name/description/tags + DISTINCT. """
+    return list(
+        Product.objects.filter(
+            Q(name__icontains=query) | Q(description__icontains=query) | Q(tags__name__icontains=query)
+        ).distinct().values_list('id', flat=True)[:limit]
+    )
+
+
+class Command(BaseCommand):
+    """
+    Compares the full-text index against the icontains scan on the same queries.
+    Example: python manage.py benchmark_product_search --queries phone "red shoes" laptop --repeat 20
+    """
+    help = 'Benchmarks product search latency: DB full-text index vs. icontains scan.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', nargs='+', default=['phone', 'shoe', 'wireless headphones', 'organic'])
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--limit', type=int, default=FULLTEXT_MAX_RESULTS)
+        parser.add_argument('--skip-icontains', action='store_true', help='Only time the full-text path.')
+
+    def _time(self, search, queries, repeat, limit):
+        latencies = []
+        matches = {}
+        for _ in range(repeat):
+            for query in queries:
+                started = time.perf_counter()
+                ids = search(query, limit)
+                latencies.append((time.perf_counter() - started) * 1000)
+                matches[query] = len(ids)
+        return latencies, matches
+
+    def _report(self, label, latencies, matches):
+        self.stdout.write(
+            f"{label}: p50 {_percentile(latencies, 50):.2f} ms, p99 {_percentile(latencies, 99):.2f} ms, "
+            f"mean {statistics.mean(latencies):.2f} ms over {len(latencies)} searches"
+        )
+        self.stdout.write(f"  matches (capped at limit): {matches}")
+
+    def handle(self, *args, **options):
+        queries = options['queries']
+        repeat = options['repeat']
+        limit = options['limit']
+
+        if search_product_ids(queries[0], limit) is None:
+            raise CommandError('Full-text index not available. Run: python manage.py build_product_fulltext_index')
+
+        self.stdout.write(f"Catalog size: {Product.objects.count()} products")
+        latencies, matches = self._time(search_product_ids, queries, repeat, limit)
+        self._report('Full-text index', latencies, matches)
+
+        if not options['skip_icontains']:
+            latencies, matches = self._time(_icontains_ids, queries, repeat, limit)
+            self._report('icontains scan ', latencies, matches)
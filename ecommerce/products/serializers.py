@@ -1,9 +1,13 @@
 # File: tec/ecommerce/products/serializers.py (Final Version)
 
 from rest_framework import serializers
+from django.db.models import Prefetch
 from .models import Category, Product, ProductImage
 from django.conf import settings
 
+# --- Constants ---
+MAX_CATEGORY_DEPTH = 10 # Deepest level of sub_categories rendered by CategorySerializer
+
 # -----------------
 # Product Image Serializer
 # -----------------
@@ -29,18 +33,24 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'slug', 'description', 'parent', 'sub_categories'] 
         
     def get_sub_categories(self, obj):
-        # Prevent infinite recursion loop by checking the depth if needed.
-        
-        # Optimize query: prefetch related children for efficiency
-        children = obj.sub_categories.all() 
-        
-        if not children.exists():
+        depth = self.context.get('depth', 0)
+        # Prevent infinite recursion loop (e.g. a category cycle) by bounding the depth
+        if depth >= MAX_CATEGORY_DEPTH:
+            return []
+
+        # Fast path: children are taken from the in-memory map built by
+        # products.services.build_category_tree() (no query per node)
+        children_map = self.context.get('children_map')
+        if children_map is not None:
+            children = children_map.get(obj.id, [])
+        else:
+            children = list(obj.sub_categories.all())
+
+        if not children:
             return []
-            
+
         # IMPORTANT: Use the outer serializer for recursive call
-        # Pass context if needed, but here we keep it simple.
-        # Ensure 'children' are passed to the serializer instance
-        return CategorySerializer(children, many=True).data
+        return CategorySerializer(children, many=True, context={**self.context, 'depth': depth + 1}).data
 
 # -----------------
 # Product Detail and List Serializers
@@ -61,10 +71,26 @@ class ProductListSerializer(serializers.ModelSerializer):
             'rating_avg', 'main_image'
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Loads the category and the main image of every product in a page with a fixed
+        number of queries (one JOIN + one IN query), instead of one image query per product.
+        """
+        return queryset.select_related('category').prefetch_related(
+            Prefetch(
+                'images',
+                queryset=ProductImage.objects.filter(is_main=True),
+                to_attr='main_images'
+            )
+        )
+
     def get_main_image(self, obj):
-        # Find the image marked as main, or the first one available
-        # Optimized to use 'first()' which executes a single query
-        main_img = obj.images.filter(is_main=True).first()
+        # Use the images prefetched by setup_eager_loading(); fall back to a single query otherwise
+        if hasattr(obj, 'main_images'):
+            main_img = obj.main_images[0] if obj.main_images else None
+        else:
+            main_img = obj.images.filter(is_main=True).first()
         if main_img:
             # Assumes you have configured MEDIA_URL correctly in settings
             return self.context['request'].build_absolute_uri(main_img.image.url) if 'request' in self.context else main_img.image.url
@@ -0,0 +1,144 @@
+# File: tec/ecommerce/products/services.py
+
+import hashlib
+import threading
+import time
+from collections import defaultdict
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from .cache import get_catalog_version, get_catalog_versions, bump_catalog_version, LocalLRUCache
+from .models import Category
+from .serializers import CategorySerializer, ProductDetailSerializer
+
+# --- Constants ---
+CATEGORY_TREE_CACHE_TIMEOUT = 60 * 60 * 24 # Entries are invalidated by version, the timeout only frees memory
+PRODUCT_DETAIL_LOCK_TIMEOUT = 5 # Seconds a worker may hold the recompute lock of one product
+PRODUCT_DETAIL_WAIT_SECONDS = 1.0 # How long other workers wait for that recompute before rendering themselves
+PRODUCT_DETAIL_POLL_SECONDS = 0.01
+PRODUCT_DETAIL_LOCK_STRIPES = 64
+
+# Per-worker front tier: hot products are served without any cache or DB round trip
+LOCAL_PRODUCT_DETAIL_CACHE = LocalLRUCache(
+    max_bytes=settings.PRODUCT_DETAIL_LOCAL_CACHE_MAX_BYTES,
+    ttl_seconds=settings.PRODUCT_DETAIL_LOCAL_CACHE_TTL,
+)
+_detail_locks = [threading.Lock() for _ in range(PRODUCT_DETAIL_LOCK_STRIPES)]
+
+# ----------------------------------------------------
+# 1. Category Tree
+# ----------------------------------------------------
+def build_category_tree():
+    """
+    Loads every category in ONE query, groups them into a parent -> children map
+    in memory, and serializes the tree from the root categories down without any
+    further DB hits.
+    """
+    children_map = defaultdict(list)
+    for category in Category.objects.all():
+        children_map[category.parent_id].append(category)
+
+    roots = children_map.get(None, [])
+    serializer = CategorySerializer(roots, many=True, context={'children_map': children_map})
+    return serializer.data
+
+
+def get_category_tree():
+    """
+    Returns the serialized category tree, served from the cache.
+    The cache key embeds the 'category' catalog version, which is bumped on any
+    Category write (see signals.py), so edits are visible immediately.
+    """
+    cache_key = f"catalog:category_tree:v{get_catalog_version('category')}"
+    tree = cache.get(cache_key)
+    if tree is None:
+        tree = build_category_tree()
+        cache.set(cache_key, tree, timeout=CATEGORY_TREE_CACHE_TIMEOUT)
+    return tree
+
+# ----------------------------------------------------
+# 2. Product Detail (Pre-rendered JSON Cache)
+# ----------------------------------------------------
+# Tier 1: LOCAL_PRODUCT_DETAIL_CACHE (per worker, PRODUCT_DETAIL_LOCAL_CACHE_TTL seconds).
+# Tier 2: shared cache entry (version, bytes) under 'catalog:product_detail:{id}:{host}'.
+# Every write to a product (fields, images, stock) bumps its 'product:{id}' catalog version
+# on commit; a shared entry rendered under an older version is ignored.
+
+def _product_scope(product_id: int) -> str:
+    return f"product:{product_id}"
+
+
+def invalidate_product_details(product_ids):
+    """ Invalidates the cached detail payloads of the given products once the transaction commits. """
+    product_ids = list(product_ids)
+
+    def bump():
+        for product_id in product_ids:
+            bump_catalog_version(_product_scope(product_id))
+
+    transaction.on_commit(bump)
+
+
+def get_product_versions(product_ids) -> dict:
+    """ {product_id: current version}; any write to a product (fields, images, stock) changes it. """
+    versions = get_catalog_versions(_product_scope(product_id) for product_id in product_ids)
+    return {product_id: versions[_product_scope(product_id)] for product_id in product_ids}
+
+
+def _render_product_detail(product_id: int, queryset, context: dict) -> bytes:
+    product = queryset.filter(pk=product_id).prefetch_related('images').first()
+    if product is None:
+        return b'' # Cached too: repeated requests for a missing/unavailable product cost no query
+    return JSONRenderer().render(ProductDetailSerializer(product, context=context).data)
+
+
+def _get_shared_product_detail(product_id: int, queryset, context: dict, base_url: str) -> bytes:
+    """
+    Shared-tier lookup with single-flight recompute: the worker that wins cache.add() on the
+    lock key renders and stores the payload; the others poll the shared entry instead of
+    stampeding the DB, and only render themselves if the winner takes too long.
+    """
+    version = get_catalog_version(_product_scope(product_id))
+    data_key = f"catalog:product_detail:{product_id}:{hashlib.sha1(base_url.encode('utf-8')).hexdigest()[:12]}"
+    entry = cache.get(data_key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    lock_key = f"{data_key}:lock"
+    if cache.add(lock_key, 1, timeout=PRODUCT_DETAIL_LOCK_TIMEOUT):
+        try:
+            payload = _render_product_detail(product_id, queryset, context)
+            # Tagged with the version read BEFORE rendering: a write committing meanwhile
+            # bumps the version, so this entry can never mask it.
+            cache.set(data_key, (version, payload), timeout=settings.PRODUCT_DETAIL_CACHE_TIMEOUT)
+            return payload
+        finally:
+            cache.delete(lock_key)
+
+    deadline = time.monotonic() + PRODUCT_DETAIL_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(PRODUCT_DETAIL_POLL_SECONDS)
+        entry = cache.get(data_key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+    return _render_product_detail(product_id, queryset, context)
+
+
+def get_product_detail_json(product_id: int, queryset, request) -> bytes:
+    """
+    Returns the ProductDetailSerializer JSON of a product as pre-rendered bytes, or None
+    if the product is not in queryset. Within a worker, concurrent misses for the same
+    product wait on one lock (single flight) and reuse its result.
+    """
+    base_url = request.build_absolute_uri('/') # Image URLs are absolute: payloads vary per host
+    local_key = (product_id, base_url)
+    payload = LOCAL_PRODUCT_DETAIL_CACHE.get(local_key)
+    if payload is None:
+        with _detail_locks[hash(local_key) % PRODUCT_DETAIL_LOCK_STRIPES]:
+            payload = LOCAL_PRODUCT_DETAIL_CACHE.get(local_key)
+            if payload is None:
+                payload = _get_shared_product_detail(product_id, queryset, {'request': request}, base_url)
+                LOCAL_PRODUCT_DETAIL_CACHE.set(local_key, payload)
+    return payload or None
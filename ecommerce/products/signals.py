@@ -0,0 +1,56 @@
+# File: tec/ecommerce/products/signals.py
+
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from .cache import bump_catalog_version_on_commit
+from .fulltext import index_products, remove_products
+from .services import invalidate_product_details
+from .models import Product
+
+# ----------------------------------------------------
+# 1. Catalog Cache Invalidation
+# ----------------------------------------------------
+@receiver(post_save, sender='products.Category')
+@receiver(post_delete, sender='products.Category')
+def invalidate_category_tree(sender, **kwargs):
+    """ Any Category write invalidates the cached category tree (once the write commits). """
+    bump_catalog_version_on_commit('category')
+
+@receiver(post_save, sender='products.Product')
+@receiver(post_delete, sender='products.Product')
+@receiver(post_save, sender='products.ProductImage')
+@receiver(post_delete, sender='products.ProductImage')
+def invalidate_product_catalog(sender, instance, **kwargs):
+    """ Any Product / ProductImage write changes product ETags and the cached detail payload. """
+    bump_catalog_version_on_commit('product')
+    invalidate_product_details([instance.product_id if sender._meta.model_name == 'productimage' else instance.pk])
+
+# ----------------------------------------------------
+# 2. Full-Text Index Maintenance
+# ----------------------------------------------------
+# Runs inside the saving transaction, so the search document commits (or rolls back)
+# together with the product change. Bulk .update() calls bypass signals; price and
+# stock are not part of the document, so they do not need to re-index.
+
+@receiver(post_save, sender='products.Product')
+def update_product_fulltext(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not set(update_fields) & {'name', 'description'}:
+        return
+    index_products([instance.pk])
+
+
+@receiver(post_delete, sender='products.Product')
+def remove_product_fulltext(sender, instance, **kwargs):
+    remove_products([instance.pk])
+
+
+@receiver(m2m_changed, sender=Product.tags.through)
+def update_product_tags_fulltext(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        index_products([instance.pk])
+    elif pk_set:
+        # Products added to / removed from a tag
+        index_products(list(pk_set))
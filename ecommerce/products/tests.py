@@ -0,0 +1,56 @@
+# File: tec/ecommerce/products/tests.py
+
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from accounts.models import CustomUser
+from .models import Category, Product, ProductImage
+
+
+class ProductListQueryCountTests(APITestCase):
+    """
+    Regression test for the N+1 on the product list: the main image of every product
+    on a page is loaded by ProductListSerializer.setup_eager_loading (Prefetch 'main_images'),
+    so the number of queries must not grow with the page size.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seller = CustomUser.objects.create_user(username='seller', password='test-pass', is_seller=True)
+        category = Category.objects.create(name='Phones', slug='phones')
+        for index in range(12):
+            product = Product.objects.create(
+                seller=seller,
+                category=category,
+                name=f"Product {index}",
+                slug=f"product-{index}",
+                description='Test product',
+                base_price_pi=Decimal('10.5'),
+                inventory_stock=5,
+                is_available=True,
+            )
+            ProductImage.objects.create(product=product, image=f"products/{index}-main.jpg", is_main=True)
+            ProductImage.objects.create(product=product, image=f"products/{index}-extra.jpg", is_main=False)
+
+    def setUp(self):
+        cache.clear()
+
+    def _list(self, page_size: int):
+        response = self.client.get(reverse('product-list'), {'page_size': page_size})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), page_size)
+        return response
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        with CaptureQueriesContext(connection) as small_page:
+            self._list(page_size=2)
+
+        with self.assertNumQueries(len(small_page.captured_queries)):
+            response = self._list(page_size=10)
+
+        # Only the main image is exposed, and it comes from the prefetch
+        self.assertTrue(all(item['main_image'].endswith('-main.jpg') for item in response.data['results']))
@@ -1,17 +1,23 @@
 # File: tec/ecommerce/products/views.py (Completed)
 
 from rest_framework import viewsets, filters, generics # <-- Added generics here
+from rest_framework.response import Response
+from django.http import Http404, HttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.permissions import AllowAny, IsAdminUser 
-from django.db.models import Q # <-- Added Q for complex lookups
+from django.db.models import Q, Case, When # <-- Added Q for complex lookups
 
 from .models import Category, Product
 from .serializers import CategorySerializer, ProductListSerializer, ProductDetailSerializer
+from .services import get_category_tree, get_product_detail_json
+from .conditional import CatalogConditionalGetMixin
+from .fulltext import search_product_ids, FULLTEXT_MAX_RESULTS
+from core.pagination import CreatedAtKeysetPagination
 
 # -----------------
 # Categories ViewSet
 # -----------------
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+class CategoryViewSet(CatalogConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """ 
     API endpoint for listing and retrieving product categories. 
     Only Read operations are allowed for public access.
@@ -20,18 +26,36 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = CategorySerializer
     permission_classes = [AllowAny]
     lookup_field = 'slug' 
+    pagination_class = None # The tree is returned whole
+    etag_scopes = ('category',) # 304 until a Category write bumps the version
+
+    def list(self, request, *args, **kwargs):
+        """ Serves the whole category tree from the cache (one query on a cache miss). """
+        return Response(get_category_tree())
+
+    def retrieve(self, request, *args, **kwargs):
+        """ Serves a single root category (with its sub-tree) from the cached tree. """
+        slug = kwargs[self.lookup_field]
+        for category in get_category_tree():
+            if category['slug'] == slug:
+                return Response(category)
+        raise Http404
 
 
 # -----------------
 # Products ViewSet
 # -----------------
-class ProductViewSet(viewsets.ReadOnlyModelViewSet):
+class ProductViewSet(CatalogConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """ 
     API endpoint for listing and retrieving products.
     Includes filtering, searching, and ordering.
     """
-    queryset = Product.objects.filter(is_available=True, inventory_stock__gt=0).select_related('category')
+    queryset = ProductListSerializer.setup_eager_loading(
+        Product.objects.filter(is_available=True, inventory_stock__gt=0)
+    )
     permission_classes = [AllowAny] 
+    pagination_class = CreatedAtKeysetPagination # Cursor on (created_at, id), or on ?ordering= + id
+    etag_scopes = ('product', 'category') # Products embed the category name
 
     # Filter/Search/Order Backends
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -44,13 +68,30 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
     
     # 3. Ordering (e.g., ?ordering=price_pi or ?ordering=-created_at)
     ordering_fields = ['base_price_pi', 'rating_avg', 'created_at']
-    ordering = ['name'] 
+    ordering = ['-created_at'] # Newest first, matching the default cursor ordering
 
     def get_serializer_class(self):
         """ Selects the appropriate serializer based on the action (list vs detail). """
         if self.action == 'list':
             return ProductListSerializer
         return ProductDetailSerializer 
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Serves the product detail as pre-rendered JSON bytes from the two-tier cache
+        (see services.get_product_detail_json). Non-JSON renderers (e.g. the browsable
+        API) use the regular serializer path.
+        """
+        if request.accepted_renderer.format != 'json':
+            return super().retrieve(request, *args, **kwargs)
+        try:
+            product_id = int(kwargs[self.lookup_url_kwarg or self.lookup_field])
+        except (TypeError, ValueError):
+            raise Http404
+        payload = get_product_detail_json(product_id, self.get_queryset(), request)
+        if payload is None:
+            raise Http404
+        return HttpResponse(payload, content_type='application/json')
         
 # -----------------
 # Custom Search API View (Needed for the updated urls.py)
@@ -62,18 +103,33 @@ class ProductSearchAPIView(generics.ListAPIView):
     """
     serializer_class = ProductListSerializer
     permission_classes = [AllowAny]
+    # Results are ranked by relevance (no stable key to page on) and capped at FULLTEXT_MAX_RESULTS
+    pagination_class = None
 
     def get_queryset(self):
         queryset = Product.objects.filter(is_available=True, inventory_stock__gt=0)
         query = self.request.query_params.get('q', None)
         
         if query:
-            # Perform a case-insensitive search across multiple fields (name, description, tags)
+            # Ranked DB-native full-text search (FTS5 on SQLite, tsvector + trigram on PostgreSQL)
+            product_ids = search_product_ids(query)
+            if product_ids is not None:
+                if not product_ids:
+                    return queryset.none()
+                # Keep the relevance order of the full-text index
+                relevance = Case(*[When(id=product_id, then=position) for position, product_id in enumerate(product_ids)])
+                queryset = queryset.filter(id__in=product_ids).order_by(relevance)
+                return ProductListSerializer.setup_eager_loading(queryset)
+
+            # Index not built (or unsupported DB): case-insensitive scan across name, description, tags
             queryset = queryset.filter(
                 Q(name__icontains=query) | 
                 Q(description__icontains=query) |
                 Q(tags__name__icontains=query) # Assumes you have a ManyToMany field 'tags'
-            ).distinct() 
-            
-        return queryset.select_related('category') # Optimize lookup
+            ).distinct().order_by('-rating_avg', 'id')
+        else:
+            # No query: newest products first
+            queryset = queryset.order_by('-created_at', '-id')
 
+        # Category join + main image prefetch; bounded like the full-text results
+        return ProductListSerializer.setup_eager_loading(queryset)[:FULLTEXT_MAX_RESULTS]
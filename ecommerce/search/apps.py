@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class SearchConfig(AppConfig):
+    name = 'search'
+
+    def ready(self):
+        # Register the change-data-capture signal handlers
+        from . import signals  # noqa: F401
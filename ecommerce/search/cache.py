@@ -0,0 +1,171 @@
+# File: tec/ecommerce/search/cache.py
+
+import hashlib
+import json
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from django.core.cache import cache
+
+# --- Constants ---
+GENERATION_CACHE_KEY = 'search:index_generation'
+GENERATION_CHECK_SECONDS = 1 # How often a worker re-reads the shared index generation
+
+_WHITESPACE = re.compile(r'\s+')
+
+# ----------------------------------------------------
+# 1. Query Normalization & Cache Keys
+# ----------------------------------------------------
+def normalize_query(query: str) -> str:
+    """ Canonical form of a search string: NFKC, case-folded, single-spaced. """
+    query = unicodedata.normalize('NFKC', query or '')
+    return _WHITESPACE.sub(' ', query.casefold()).strip()
+
+
+def build_cache_key(query: str, filters: dict = None, sort_by: str = None, page: int = 1, page_size: int = None,
+                    namespace: str = '') -> str:
+    """
+    Stable key over the normalized query, filters (order-insensitive), sort and page.
+    namespace separates result shapes (e.g. plain hits vs. hits + facets).
+    """
+    normalized_filters = {}
+    for name, value in (filters or {}).items():
+        if isinstance(value, (list, tuple, set)):
+            value = sorted(str(item) for item in value)
+        else:
+            value = str(value)
+        normalized_filters[name] = value
+
+    payload = json.dumps(
+        [namespace, normalize_query(query), normalized_filters, sort_by, page, page_size],
+        sort_keys=True, separators=(',', ':')
+    )
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+# ----------------------------------------------------
+# 2. Index Generation (Bulk Reindex Invalidation)
+# ----------------------------------------------------
+def get_index_generation() -> int:
+    generation = cache.get(GENERATION_CACHE_KEY)
+    if generation is None:
+        cache.add(GENERATION_CACHE_KEY, time.time_ns(), timeout=None)
+        generation = cache.get(GENERATION_CACHE_KEY)
+    return generation
+
+
+def bump_index_generation() -> int:
+    """ Invalidates every cached search result on every worker (called after a bulk reindex). """
+    try:
+        return cache.incr(GENERATION_CACHE_KEY)
+    except ValueError:
+        generation = time.time_ns()
+        cache.set(GENERATION_CACHE_KEY, generation, timeout=None)
+        return generation
+
+
+# ----------------------------------------------------
+# 3. Search Result Cache (TTL + LRU, Memory Bounded)
+# ----------------------------------------------------
+class SearchResultCache:
+    """
+    Process-local cache of search results for head queries.
+    - Entries expire after ttl_seconds.
+    - Total size is bounded by max_bytes (estimated from the JSON size of each result);
+      the least recently used entries are evicted first.
+    - Entries are tagged with the index generation; a bumped generation invalidates
+      them all at once.
+    - Hit/miss counters and latencies show how much Elasticsearch load is shed.
+    """
+
+    def __init__(self, ttl_seconds: float = 60, max_bytes: int = 32 * 1024 * 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict() # key -> (generation, expires_at, size, value)
+        self._size = 0
+        self._lock = threading.Lock()
+        self._generation = None
+        self._generation_checked_at = 0.0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.hit_seconds = 0.0
+        self.miss_seconds = 0.0
+        self.evictions = 0
+
+    def _current_generation(self):
+        now = time.monotonic()
+        if self._generation is None or now - self._generation_checked_at >= GENERATION_CHECK_SECONDS:
+            self._generation = get_index_generation()
+            self._generation_checked_at = now
+        return self._generation
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry[2]
+
+    def get(self, key):
+        generation = self._current_generation()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry_generation, expires_at, _, value = entry
+            if entry_generation != generation or expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        generation = self._current_generation()
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (generation, time.monotonic() + self.ttl_seconds, size, value)
+            self._size += size
+            while self._size > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def get_or_compute(self, key, compute):
+        """ Returns the cached value for key, or computes, caches and returns it. """
+        started = time.perf_counter()
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            self.hit_seconds += time.perf_counter() - started
+            return value
+
+        value = compute()
+        self.misses += 1
+        self.miss_seconds += time.perf_counter() - started
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self._size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            'avg_hit_ms': round(self.hit_seconds / self.hits * 1000, 3) if self.hits else None,
+            'avg_miss_ms': round(self.miss_seconds / self.misses * 1000, 3) if self.misses else None,
+        }
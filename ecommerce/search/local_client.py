@@ -0,0 +1,322 @@
+# File: tec/ecommerce/search/local_client.py
+
+import json
+import threading
+from types import SimpleNamespace
+
+# ----------------------------------------------------
+# Local In-Process Elasticsearch Stand-in
+# ----------------------------------------------------
+# Implements the subset of the elasticsearch-py client used by search.services
+# (index/get/delete/bulk/search and the index + alias management calls), so the
+# bulk indexer, alias swaps and search code can be exercised without a cluster.
+# Enable it with ELASTIC_HOST='local'.
+
+class _JSONSerializer:
+    """ Serializer used by elasticsearch.helpers to build bulk request bodies. """
+    mimetype = 'application/json'
+
+    def dumps(self, data):
+        if isinstance(data, str):
+            return data
+        return json.dumps(data, default=str)
+
+    def loads(self, s):
+        return json.loads(s)
+
+
+class NotFoundError(Exception):
+    status_code = 404
+
+
+class _LocalIndicesClient:
+    """ Index and alias management API (client.indices). """
+
+    def __init__(self, client):
+        self._client = client
+
+    def create(self, index, body=None, **kwargs):
+        with self._client._lock:
+            if index in self._client._indices or index in self._client._aliases:
+                raise ValueError(f"resource_already_exists_exception: {index}")
+            self._client._indices[index] = {'docs': {}, 'body': body or {}}
+        return {'acknowledged': True, 'index': index}
+
+    def delete(self, index, ignore=None, **kwargs):
+        with self._client._lock:
+            for name in self._client._resolve(index, allow_missing=True):
+                self._client._indices.pop(name, None)
+                for targets in self._client._aliases.values():
+                    targets.discard(name)
+        return {'acknowledged': True}
+
+    def exists(self, index, **kwargs):
+        return index in self._client._indices or index in self._client._aliases
+
+    def exists_alias(self, name, **kwargs):
+        return bool(self._client._aliases.get(name))
+
+    def get_alias(self, name, **kwargs):
+        targets = self._client._aliases.get(name)
+        if not targets:
+            raise NotFoundError(f"alias [{name}] missing")
+        return {index: {'aliases': {name: {}}} for index in targets}
+
+    def update_aliases(self, body, **kwargs):
+        """ Applies every add/remove/remove_index action atomically (under one lock). """
+        with self._client._lock:
+            for action in body['actions']:
+                (op, spec), = action.items()
+                if op == 'add':
+                    self._client._aliases.setdefault(spec['alias'], set()).add(spec['index'])
+                elif op == 'remove':
+                    self._client._aliases.get(spec['alias'], set()).discard(spec['index'])
+                elif op == 'remove_index':
+                    self._client._indices.pop(spec['index'], None)
+        return {'acknowledged': True}
+
+    def put_settings(self, body, index=None, **kwargs):
+        return {'acknowledged': True}
+
+    def refresh(self, index=None, **kwargs):
+        return {'_shards': {'failed': 0}}
+
+
+class LocalElasticsearch:
+    """ In-process, thread-safe stand-in for elasticsearch.Elasticsearch. """
+
+    def __init__(self, *args, **kwargs):
+        self._lock = threading.RLock()
+        self._indices = {}
+        self._aliases = {}
+        self.transport = SimpleNamespace(serializer=_JSONSerializer())
+        self.indices = _LocalIndicesClient(self)
+
+    # --- Helpers ---
+    def _resolve(self, name, allow_missing=False):
+        """ Resolves an index name or alias to concrete index names. """
+        if name in self._aliases and self._aliases[name]:
+            return sorted(self._aliases[name])
+        if name in self._indices:
+            return [name]
+        if allow_missing:
+            return []
+        raise NotFoundError(f"no such index [{name}]")
+
+    def _write_index(self, name):
+        if name not in self._indices and name not in self._aliases:
+            # Like Elasticsearch, writing to a missing index auto-creates it
+            self._indices[name] = {'docs': {}, 'body': {}}
+        targets = self._resolve(name)
+        if len(targets) != 1:
+            raise ValueError(f"alias [{name}] has more than one write index")
+        return self._indices[targets[0]]
+
+    # --- Document APIs ---
+    def index(self, index, id=None, document=None, body=None, **kwargs):
+        with self._lock:
+            self._write_index(index)['docs'][str(id)] = dict(document if document is not None else body)
+        return {'_index': index, '_id': str(id), 'result': 'created'}
+
+    def get(self, index, id, **kwargs):
+        with self._lock:
+            for name in self._resolve(index):
+                source = self._indices[name]['docs'].get(str(id))
+                if source is not None:
+                    return {'_index': name, '_id': str(id), 'found': True, '_source': dict(source)}
+        raise NotFoundError(f"document [{id}] missing")
+
+    def delete(self, index, id, ignore=None, **kwargs):
+        with self._lock:
+            found = self._write_index(index)['docs'].pop(str(id), None) is not None
+        return {'_index': index, '_id': str(id), 'result': 'deleted' if found else 'not_found'}
+
+    def count(self, index, **kwargs):
+        with self._lock:
+            return {'count': sum(len(self._indices[name]['docs']) for name in self._resolve(index))}
+
+    def bulk(self, body, index=None, **kwargs):
+        """ Executes an NDJSON bulk body (as produced by elasticsearch.helpers). """
+        lines = [line for line in body.split('\n') if line.strip()] if isinstance(body, str) else list(body)
+        items = []
+        position = 0
+        with self._lock:
+            while position < len(lines):
+                action = self.transport.serializer.loads(lines[position]) if isinstance(lines[position], str) else lines[position]
+                (op_type, meta), = action.items()
+                position += 1
+                target = meta.get('_index', index)
+                doc_id = str(meta.get('_id'))
+                try:
+                    docs = self._write_index(target)['docs']
+                    if op_type in ('index', 'create'):
+                        docs[doc_id] = self.transport.serializer.loads(lines[position])
+                        position += 1
+                        status = 201
+                    elif op_type == 'update':
+                        partial = self.transport.serializer.loads(lines[position]).get('doc', {})
+                        position += 1
+                        docs.setdefault(doc_id, {}).update(partial)
+                        status = 200
+                    else: # delete
+                        status = 200 if docs.pop(doc_id, None) is not None else 404
+                except Exception as e:
+                    status = 400
+                    items.append({op_type: {'_index': target, '_id': doc_id, 'status': status, 'error': str(e)}})
+                    continue
+                items.append({op_type: {'_index': target, '_id': doc_id, 'status': status}})
+        return {'took': 0, 'errors': any(item[op]['status'] >= 300 for item in items for op in item), 'items': items}
+
+    # --- Search API ---
+    def search(self, index, body=None, **kwargs):
+        body = body or {}
+        with self._lock:
+            docs = [
+                (doc_id, dict(source))
+                for name in self._resolve(index)
+                for doc_id, source in self._indices[name]['docs'].items()
+            ]
+
+        matched = []
+        for doc_id, source in docs:
+            score = _score(body.get('query', {'match_all': {}}), source)
+            if score is not None:
+                matched.append((doc_id, source, score))
+
+        # Aggregations see every query match; post_filter then narrows the hits only
+        aggregations = _aggregate(body['aggs'], [hit[1] for hit in matched]) if body.get('aggs') else None
+        if body.get('post_filter'):
+            matched = [hit for hit in matched if _score(body['post_filter'], hit[1]) is not None]
+
+        for sort_spec in reversed(body.get('sort', [])):
+            (field, options), = sort_spec.items()
+            matched.sort(key=lambda hit: (hit[1].get(field) is None, hit[1].get(field)),
+                         reverse=options.get('order') == 'desc')
+
+        start = body.get('from', 0)
+        size = body.get('size', 10)
+        response = {
+            'took': 0,
+            'timed_out': False,
+            'hits': {
+                'total': {'value': len(matched), 'relation': 'eq'},
+                'max_score': max((hit[2] for hit in matched), default=None),
+                'hits': [
+                    {'_index': index, '_id': doc_id, '_score': score, '_source': source}
+                    for doc_id, source, score in matched[start:start + size]
+                ],
+            },
+        }
+        if aggregations is not None:
+            response['aggregations'] = aggregations
+        return response
+
+
+# ----------------------------------------------------
+# Minimal Aggregations (filter, terms, range; nested sub-aggregations)
+# ----------------------------------------------------
+def _aggregate(aggs, sources):
+    results = {}
+    for name, spec in aggs.items():
+        sub_aggs = spec.get('aggs')
+        if 'filter' in spec:
+            matching = [source for source in sources if _score(spec['filter'], source) is not None]
+            result = {'doc_count': len(matching)}
+            if sub_aggs:
+                result.update(_aggregate(sub_aggs, matching))
+        elif 'terms' in spec:
+            field = spec['terms']['field']
+            counts = {}
+            for source in sources:
+                value = source.get(field)
+                if value is not None:
+                    counts[value] = counts.get(value, 0) + 1
+            ordered = sorted(counts.items(), key=lambda item: (-item[1], str(item[0])))
+            buckets = []
+            for value, count in ordered[:spec['terms'].get('size', 10)]:
+                if isinstance(value, bool):
+                    # Like Elasticsearch: boolean keys are 1/0 with a key_as_string
+                    bucket = {'key': int(value), 'key_as_string': str(value).lower(), 'doc_count': count}
+                else:
+                    bucket = {'key': value, 'doc_count': count}
+                buckets.append(bucket)
+            result = {'buckets': buckets}
+        elif 'range' in spec:
+            field = spec['range']['field']
+            buckets = []
+            for bucket_spec in spec['range']['ranges']:
+                lower, upper = bucket_spec.get('from'), bucket_spec.get('to')
+                count = sum(
+                    1 for source in sources
+                    if source.get(field) is not None
+                    and (lower is None or source[field] >= lower)
+                    and (upper is None or source[field] < upper)
+                )
+                bucket = {'key': bucket_spec.get('key', f"{lower if lower is not None else '*'}-{upper if upper is not None else '*'}"),
+                          'doc_count': count}
+                bucket.update({key: value for key, value in (('from', lower), ('to', upper)) if value is not None})
+                buckets.append(bucket)
+            result = {'buckets': buckets}
+        else:
+            raise ValueError(f"Aggregation not supported by LocalElasticsearch: {list(spec)}")
+        results[name] = result
+    return results
+
+
+# ----------------------------------------------------
+# Minimal Query Evaluation (match_all, multi_match, bool, term, terms, range)
+# ----------------------------------------------------
+def _score(query, source):
+    """ Returns a relevance score if the document matches the query, or None. """
+    if not query or 'match_all' in query:
+        return 1.0
+    if 'multi_match' in query:
+        spec = query['multi_match']
+        terms = str(spec['query']).lower().split()
+        score = 0.0
+        for field_spec in spec.get('fields', []):
+            field, _, boost = field_spec.partition('^')
+            value = str(source.get(field) or '').lower()
+            score += sum(value.count(term) for term in terms) * float(boost or 1)
+        return score or None
+    if 'term' in query:
+        (field, value), = query['term'].items()
+        value = value.get('value') if isinstance(value, dict) else value
+        return 1.0 if source.get(field) == value else None
+    if 'terms' in query:
+        (field, values), = query['terms'].items()
+        return 1.0 if source.get(field) in values else None
+    if 'range' in query:
+        (field, bounds), = query['range'].items()
+        value = source.get(field)
+        if value is None:
+            return None
+        checks = {'gt': value.__gt__, 'gte': value.__ge__, 'lt': value.__lt__, 'lte': value.__le__}
+        return 1.0 if all(checks[op](bound) for op, bound in bounds.items() if op in checks) else None
+    if 'bool' in query:
+        clauses = query['bool']
+        total = 0.0
+        for clause in _as_list(clauses.get('must')):
+            score = _score(clause, source)
+            if score is None:
+                return None
+            total += score
+        for clause in _as_list(clauses.get('filter')):
+            if _score(clause, source) is None:
+                return None
+        for clause in _as_list(clauses.get('must_not')):
+            if _score(clause, source) is not None:
+                return None
+        should = [_score(clause, source) for clause in _as_list(clauses.get('should'))]
+        required = clauses.get('minimum_should_match', 0 if clauses.get('must') or clauses.get('filter') else 1)
+        if should and sum(score is not None for score in should) < required:
+            return None
+        total += sum(score for score in should if score)
+        return total or 1.0
+    raise ValueError(f"Query not supported by LocalElasticsearch: {list(query)}")
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
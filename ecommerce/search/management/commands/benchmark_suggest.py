@@ -0,0 +1,92 @@
+# File: tec/ecommerce/search/management/commands/benchmark_suggest.py
+
+import os
+import random
+import string
+import tempfile
+import time
+import tracemalloc
+from django.core.management.base import BaseCommand
+
+from search.suggest import PrefixIndex, build_suggest_index, KIND_PRODUCT, KIND_CATEGORY, KIND_TAG
+
+
+def _percentile(values: list, percent: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _synthetic_entries(count: int, seed: int):
+    """ Multi-word product-like names over a Zipf-ish word list, plus a few categories and tags. """
+    rng = random.Random(seed)
+    words = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(max(count // 20, 100))]
+    entries = [
+        (' '.join(rng.choices(words, k=rng.randint(1, 4))).title(), KIND_PRODUCT, rng.paretovariate(1.5))
+        for _ in range(count)
+    ]
+    entries += [(word.title(), KIND_CATEGORY, rng.randint(1, 5000)) for word in words[:200]]
+    entries += [(word, KIND_TAG, rng.randint(1, 1000)) for word in words[200:2200]]
+    return entries, words
+
+
+class Command(BaseCommand):
+    """
+    Measures the autocomplete index: build time, memory footprint (tracemalloc), snapshot
+    size/load time and lookup latency percentiles over random typed prefixes.
+    Example: python manage.py benchmark_suggest --terms 1000000 --lookups 50000
+    """
+    help = 'Benchmarks memory footprint and lookup latency of the autocomplete prefix index.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--terms', type=int, default=1000000, help='Synthetic vocabulary size.')
+        parser.add_argument('--lookups', type=int, default=50000)
+        parser.add_argument('--from-db', action='store_true', help='Build from the catalog instead of synthetic terms.')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        if options['from_db']:
+            index = build_suggest_index()
+            vocabulary = list(index._state.keys)
+        else:
+            entries, vocabulary = _synthetic_entries(options['terms'], options['seed'])
+            baseline = tracemalloc.get_traced_memory()[0] # The input list is not part of the index
+            index = PrefixIndex(entries)
+            del entries
+        build_seconds = time.perf_counter() - started
+        footprint = tracemalloc.get_traced_memory()[0] - (0 if options['from_db'] else baseline)
+        tracemalloc.stop()
+
+        self.stdout.write(f"Terms: {len(index)}; build {build_seconds:.2f}s; index memory {footprint / 1024 / 1024:.1f} MiB")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'suggest.snapshot')
+            index.save_snapshot(path)
+            started = time.perf_counter()
+            index = PrefixIndex.load_snapshot(path)
+            self.stdout.write(
+                f"Snapshot: {os.path.getsize(path) / 1024 / 1024:.1f} MiB; load {time.perf_counter() - started:.2f}s"
+            )
+
+        # Prefixes as typed: 1..8 leading characters of vocabulary words
+        prefixes = []
+        for _ in range(options['lookups']):
+            word = rng.choice(vocabulary)
+            prefixes.append(word[:rng.randint(1, min(len(word), 8))])
+
+        latencies = []
+        for prefix in prefixes:
+            started = time.perf_counter()
+            index.suggest(prefix)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+        self.stdout.write(
+            f"Lookups: {len(latencies)}; p50 {_percentile(latencies, 50):.3f} ms, "
+            f"p99 {_percentile(latencies, 99):.3f} ms, max {max(latencies):.3f} ms"
+        )
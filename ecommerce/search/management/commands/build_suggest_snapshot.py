@@ -0,0 +1,23 @@
+# File: tec/ecommerce/search/management/commands/build_suggest_snapshot.py
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from search.suggest import build_suggest_index
+
+
+class Command(BaseCommand):
+    """
+    Builds the autocomplete prefix index from the catalog and writes the snapshot that
+    workers load at startup. Run it periodically (e.g. nightly) to pick up popularity changes.
+    Example: python manage.py build_suggest_snapshot --path /var/lib/tec/suggest_index.snapshot
+    """
+    help = 'Builds the autocomplete prefix index and saves it as a compact snapshot.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=settings.SEARCH_SUGGEST_SNAPSHOT_PATH)
+
+    def handle(self, *args, **options):
+        index = build_suggest_index()
+        index.save_snapshot(options['path'])
+        self.stdout.write(f"Saved {len(index)} terms to {options['path']}")
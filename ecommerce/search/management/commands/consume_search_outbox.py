@@ -0,0 +1,31 @@
+# File: tec/ecommerce/search/management/commands/consume_search_outbox.py
+
+from django.core.management.base import BaseCommand
+
+from search.services import run_index_outbox_consumer, get_index_staleness_ms
+
+
+class Command(BaseCommand):
+    """
+    Runs the incremental search indexer: drains the product change outbox into
+    Elasticsearch in coalesced bulk batches every --interval-ms.
+    Example: python manage.py consume_search_outbox --interval-ms 250
+    """
+    help = 'Keeps the product search index in sync with product, price and inventory changes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval-ms', type=int, default=None)
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--cycles', type=int, default=None, help='Stop after this many flush cycles.')
+        parser.add_argument('--staleness', action='store_true', help='Only print the current index staleness.')
+
+    def handle(self, *args, **options):
+        if options['staleness']:
+            self.stdout.write(f"Index staleness: {get_index_staleness_ms():.0f} ms")
+            return
+
+        run_index_outbox_consumer(
+            flush_interval_ms=options['interval_ms'],
+            batch_size=options['batch_size'],
+            max_cycles=options['cycles'],
+        )
@@ -0,0 +1,38 @@
+# File: tec/ecommerce/search/models.py
+
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+# ----------------------------------------------------
+# Search Index Outbox (Change Data Capture)
+# ----------------------------------------------------
+class SearchIndexOutbox(models.Model):
+    """
+    One row per product change that the search index has not seen yet.
+    Rows are written in the SAME transaction as the change itself (so a committed change
+    is never lost and a rolled-back one is never indexed) and drained in coalesced bulk
+    batches by search.services.flush_index_outbox().
+    """
+
+    CHANGE_TYPES = (
+        ('PRODUCT', _('Product Updated')),
+        ('PRICE', _('Price Changed')),
+        ('INVENTORY', _('Inventory Changed')),
+        ('DELETE', _('Product Deleted')),
+    )
+
+    product_id = models.IntegerField(verbose_name=_('Product ID'))
+    change_type = models.CharField(max_length=20, choices=CHANGE_TYPES, verbose_name=_('Change Type'))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Created At'))
+
+    class Meta:
+        verbose_name = _('Search Index Outbox Entry')
+        verbose_name_plural = _('Search Index Outbox')
+
+    def __str__(self):
+        return f"{self.change_type} product #{self.product_id}"
+
+    @classmethod
+    def record(cls, product_ids, change_type: str):
+        """ Records changes for many products with a single INSERT (call inside the writing transaction). """
+        cls.objects.bulk_create([cls(product_id=product_id, change_type=change_type) for product_id in product_ids])
@@ -29,3 +29,26 @@ class SearchResultSerializer(serializers.Serializer):
         # Add handlers for other models if indexed (e.g., 'category')
         
         return None
+
+
+class ProductSourceSerializer(serializers.Serializer):
+    """
+    Serializes a product search hit straight from the '_source' document stored in the
+    index (no ORM access). 'inventory_stock' is the indexed value unless the view
+    hydrated it from the DB (see ProductSearchView, ?hydrate=stock).
+    """
+    id = serializers.IntegerField(source='product_id')
+    name = serializers.CharField()
+    slug = serializers.CharField(allow_null=True, required=False)
+    price = serializers.FloatField()
+    category_name = serializers.CharField(allow_null=True, required=False)
+    rating_avg = serializers.FloatField()
+    inventory_stock = serializers.IntegerField(source='inventory')
+    is_available = serializers.BooleanField()
+    main_image = serializers.SerializerMethodField()
+
+    def get_main_image(self, source):
+        url = source.get('main_image_url')
+        if url and 'request' in self.context:
+            return self.context['request'].build_absolute_uri(url)
+        return url
@@ -1,33 +1,134 @@
+import time
 import elasticsearch
-from elasticsearch import Elasticsearch
+from elasticsearch import Elasticsearch, helpers
 from products.models import Product
+from products.serializers import ProductListSerializer
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
 from typing import List, Dict
 
+from .cache import SearchResultCache, build_cache_key, bump_index_generation
+from .local_client import LocalElasticsearch
+from .models import SearchIndexOutbox
+
 # Assuming Elasticsearch connection details are in Django settings
-ES_CLIENT = Elasticsearch(
-    [settings.ELASTIC_HOST],
-    http_auth=(settings.ELASTIC_USER, settings.ELASTIC_PASSWORD)
-)
+# (ELASTIC_HOST='local' selects the in-process stand-in, for tests and benchmarks)
+if settings.ELASTIC_HOST == 'local':
+    ES_CLIENT = LocalElasticsearch()
+else:
+    ES_CLIENT = Elasticsearch(
+        [settings.ELASTIC_HOST],
+        http_auth=(settings.ELASTIC_USER, settings.ELASTIC_PASSWORD)
+    )
+# Public name of the product index. After the first rebuild_product_index() it is an
+# alias pointing at a concrete, timestamped index.
 INDEX_NAME = 'product_index'
 
+# Set while a full rebuild runs: the outbox consumer pauses so changes made during the
+# rebuild are applied to the NEW index after the alias swap instead of the outgoing one.
+REBUILD_FLAG_KEY = 'search:rebuild_in_progress'
+REBUILD_FLAG_TIMEOUT = 60 * 60 * 6
+
+# Result cache for head queries (per process; invalidated by bump_index_generation())
+RESULT_CACHE = SearchResultCache(
+    ttl_seconds=getattr(settings, 'SEARCH_RESULT_CACHE_TTL', 60),
+    max_bytes=getattr(settings, 'SEARCH_RESULT_CACHE_MAX_BYTES', 32 * 1024 * 1024),
+)
+SEARCH_PAGE_SIZE = 20
+
+# --- Facets ---
+FACET_TERMS_SIZE = 50 # Buckets returned per terms facet
+FACET_FIELDS = {
+    'category': 'category_name',
+    'seller': 'seller_name',
+    'availability': 'is_available',
+}
+# Price buckets as (key, from, to); 'to' is exclusive, like the ES range aggregation
+FACET_PRICE_RANGES = [
+    ('*-10', None, 10),
+    ('10-50', 10, 50),
+    ('50-100', 50, 100),
+    ('100-500', 100, 500),
+    ('500-*', 500, None),
+]
+
+# --- Bulk Indexing Defaults ---
+BULK_CHUNK_SIZE = 500   # Documents per bulk request (and DB rows per iterator fetch)
+BULK_THREAD_COUNT = 4   # Concurrent bulk requests when using parallel_bulk
+
+PRODUCT_INDEX_BODY = {
+    'settings': {
+        'number_of_shards': 1,
+        'number_of_replicas': 1,
+    },
+    'mappings': {
+        'properties': {
+            'product_id': {'type': 'integer'},
+            'name': {'type': 'text', 'fields': {'keyword': {'type': 'keyword'}}},
+            'slug': {'type': 'keyword'},
+            'description': {'type': 'text'},
+            'price': {'type': 'scaled_float', 'scaling_factor': 1000000000},
+            'main_image_url': {'type': 'keyword', 'index': False},
+            'category_id': {'type': 'integer'},
+            'category_name': {'type': 'keyword'},
+            'seller_id': {'type': 'integer'},
+            'seller_name': {'type': 'keyword'},
+            'rating_avg': {'type': 'float'},
+            'inventory': {'type': 'integer'},
+            'is_available': {'type': 'boolean'},
+        }
+    },
+}
+
+
+def _with_document_relations(queryset):
+    """ Loads everything build_product_document() reads, with a fixed number of queries. """
+    return ProductListSerializer.setup_eager_loading(queryset).select_related('seller')
+
+
+def _main_image_url(product: Product):
+    if hasattr(product, 'main_images'):
+        main_img = product.main_images[0] if product.main_images else None
+    else:
+        main_img = product.images.filter(is_main=True).first()
+    return main_img.image.url if main_img else None
+
+
+def build_product_document(product: Product) -> Dict:
+    """
+    Builds the search document of a product.
+    The document carries everything search results display (name, price, category,
+    main image URL, rating) so results can be served from _source without the DB.
+    Expects the relations of _with_document_relations() to be loaded when called in bulk.
+    """
+    return {
+        'product_id': product.id,
+        'name': product.name,
+        'slug': product.slug,
+        'description': product.description,
+        'main_image_url': _main_image_url(product),
+        'price': float(product.sale_price_pi if product.sale_price_pi else product.base_price_pi),
+        'category_id': product.category_id,
+        'category_name': product.category.name if product.category_id else None,
+        'seller_id': product.seller_id,
+        'seller_name': product.seller.username if product.seller_id else None,
+        'rating_avg': float(product.rating_avg),
+        'inventory': product.inventory_stock,
+        'is_available': product.is_available and product.inventory_stock > 0,
+        # Add attributes like color, size, brand here if they exist in the model
+    }
+
+
 def index_product(product: Product):
     """
     Indexes or updates a single product document in Elasticsearch.
     """
     try:
         # 1. Prepare the document data
-        product_doc = {
-            'product_id': product.id,
-            'name': product.name_en,
-            'description': product.description_en,
-            'price': float(product.sale_price if product.sale_price else product.base_price),
-            'category_id': product.category_id,
-            'rating_avg': float(product.rating_avg),
-            'inventory': product.inventory_stock,
-            'is_available': product.inventory_stock > 0,
-            # Add attributes like color, size, brand here if they exist in the model
-        }
+        product_doc = build_product_document(product)
 
         # 2. Index the document
         ES_CLIENT.index(
@@ -42,39 +143,386 @@ def index_product(product: Product):
         return {"success": False, "error": str(e)}
 
 
-def search_products(query: str, filters: Dict = None, sort_by: str = '-rating_avg') -> List[Dict]:
+# ----------------------------------------------------
+# Bulk Indexing (Full Reindex)
+# ----------------------------------------------------
+def _iter_product_actions(index_name: str, queryset, chunk_size: int):
     """
-    Executes a complex search and filter query against Elasticsearch.
+    Streams bulk 'index' actions for a product queryset.
+    Rows are read with iterator(chunk_size) so the catalog is never held in memory.
     """
-    try:
-        # Define the basic search query (matching product name or description)
-        search_body = {
-            "query": {
-                "bool": {
-                    "must": [
-                        {"multi_match": {"query": query, "fields": ["name^3", "description"]}}
-                    ]
-                }
-            },
-            "sort": [
-                {sort_by.lstrip('-'): {"order": "desc" if sort_by.startswith('-') else "asc"}}
-            ]
+    products = _with_document_relations(queryset).order_by('id').iterator(chunk_size=chunk_size)
+    for product in products:
+        yield {
+            '_index': index_name,
+            '_id': product.id,
+            '_source': build_product_document(product),
         }
-        
-        # Add filtering logic (e.g., category, price range)
-        if filters:
-            if 'category_id' in filters:
-                search_body['query']['bool']['filter'] = [
-                    {"term": {"category_id": filters['category_id']}}
+
+
+def bulk_index_products(index_name: str = INDEX_NAME, queryset=None, chunk_size: int = BULK_CHUNK_SIZE,
+                        thread_count: int = BULK_THREAD_COUNT, client=None) -> Dict:
+    """
+    Pushes product documents through the Elasticsearch bulk helpers.
+    thread_count > 1 uses helpers.parallel_bulk (concurrent requests); 1 uses
+    helpers.streaming_bulk (single connection, retries rejected chunks).
+    Returns the indexing throughput.
+    """
+    client = client or ES_CLIENT
+    if queryset is None:
+        queryset = Product.objects.all()
+
+    actions = _iter_product_actions(index_name, queryset, chunk_size)
+    if thread_count > 1:
+        results = helpers.parallel_bulk(
+            client, actions, thread_count=thread_count, chunk_size=chunk_size, raise_on_error=False
+        )
+    else:
+        results = helpers.streaming_bulk(
+            client, actions, chunk_size=chunk_size, raise_on_error=False, max_retries=3
+        )
+
+    started = time.perf_counter()
+    indexed = 0
+    errors = []
+    for ok, item in results:
+        if ok:
+            indexed += 1
+        else:
+            errors.append(item)
+    elapsed = time.perf_counter() - started
+
+    if errors:
+        print(f"Bulk indexing into {index_name}: {len(errors)} documents failed, e.g. {errors[0]}")
+
+    return {
+        'index': index_name,
+        'indexed': indexed,
+        'errors': len(errors),
+        'seconds': round(elapsed, 3),
+        'docs_per_sec': round(indexed / elapsed, 1) if elapsed else None,
+    }
+
+
+def rebuild_product_index(chunk_size: int = BULK_CHUNK_SIZE, thread_count: int = BULK_THREAD_COUNT,
+                          client=None, delete_old: bool = True) -> Dict:
+    """
+    Zero-downtime full reindex:
+    1. Builds a new timestamped index (replicas and refresh disabled while loading).
+    2. Bulk loads the whole catalog into it.
+    3. Atomically repoints the INDEX_NAME alias to it, so searches never see a partial index.
+    """
+    client = client or ES_CLIENT
+    cache.set(REBUILD_FLAG_KEY, True, timeout=REBUILD_FLAG_TIMEOUT)
+    try:
+        return _rebuild_product_index(chunk_size, thread_count, client, delete_old)
+    finally:
+        cache.delete(REBUILD_FLAG_KEY)
+
+
+def _rebuild_product_index(chunk_size: int, thread_count: int, client, delete_old: bool) -> Dict:
+    new_index = f"{INDEX_NAME}_{time.strftime('%Y%m%d%H%M%S')}"
+    replicas = PRODUCT_INDEX_BODY['settings']['number_of_replicas']
+
+    # 1. Create the new index tuned for bulk loading
+    body = {
+        'settings': {**PRODUCT_INDEX_BODY['settings'], 'number_of_replicas': 0, 'refresh_interval': '-1'},
+        'mappings': PRODUCT_INDEX_BODY['mappings'],
+    }
+    client.indices.create(index=new_index, body=body)
+
+    # 2. Load it
+    stats = bulk_index_products(new_index, chunk_size=chunk_size, thread_count=thread_count, client=client)
+    if stats['errors']:
+        client.indices.delete(index=new_index)
+        return {"success": False, "error": f"{stats['errors']} documents failed; alias left unchanged.", **stats}
+
+    client.indices.put_settings(index=new_index, body={'index': {'number_of_replicas': replicas, 'refresh_interval': '1s'}})
+    client.indices.refresh(index=new_index)
+
+    # 3. Swap the alias in ONE atomic aliases request
+    old_indices = []
+    actions = []
+    if client.indices.exists_alias(name=INDEX_NAME):
+        old_indices = list(client.indices.get_alias(name=INDEX_NAME).keys())
+        actions += [{'remove': {'index': old, 'alias': INDEX_NAME}} for old in old_indices]
+    elif client.indices.exists(index=INDEX_NAME):
+        # Legacy concrete index with the public name: drop it in the same atomic step
+        actions.append({'remove_index': {'index': INDEX_NAME}})
+    actions.append({'add': {'index': new_index, 'alias': INDEX_NAME}})
+    client.indices.update_aliases(body={'actions': actions})
+    # Cached search results describe the old index
+    bump_index_generation()
+
+    if delete_old:
+        for old in old_indices:
+            client.indices.delete(index=old, ignore=[404])
+
+    return {"success": True, "previous_indices": old_indices, **stats}
+
+
+# ----------------------------------------------------
+# Incremental Indexing (Outbox Consumer)
+# ----------------------------------------------------
+def get_index_staleness_ms() -> float:
+    """ Age of the oldest change not yet applied to the index (0 when the index is up to date). """
+    oldest = SearchIndexOutbox.objects.aggregate(oldest=Min('created_at'))['oldest']
+    if oldest is None:
+        return 0.0
+    return (timezone.now() - oldest).total_seconds() * 1000
+
+
+def flush_index_outbox(batch_size: int = None, client=None):
+    """
+    Applies one batch of outbox changes to the search index.
+    1. Claims outbox rows with 'FOR UPDATE SKIP LOCKED' (several consumers can run).
+    2. Coalesces them: however many times a product changed, it is indexed once,
+       from its current DB state.
+    3. Sends every index/delete in bulk, then deletes the claimed rows.
+    If the bulk request fails, the transaction rolls back and the rows are retried.
+    Returns batch metrics, or None when the outbox is empty.
+    """
+    batch_size = batch_size or settings.SEARCH_OUTBOX_BATCH_SIZE
+    client = client or ES_CLIENT
+    started = time.perf_counter()
+
+    with transaction.atomic():
+        rows = list(
+            SearchIndexOutbox.objects.select_for_update(skip_locked=True)
+            .order_by('id')
+            .values_list('id', 'product_id', 'created_at')[:batch_size]
+        )
+        if not rows:
+            return None
+
+        product_ids = {product_id for _, product_id, _ in rows}
+        products = _with_document_relations(Product.objects.filter(id__in=product_ids))
+
+        actions = [
+            {'_index': INDEX_NAME, '_id': product.id, '_source': build_product_document(product)}
+            for product in products
+        ]
+        deleted_ids = product_ids - {action['_id'] for action in actions}
+        actions += [
+            {'_op_type': 'delete', '_index': INDEX_NAME, '_id': product_id}
+            for product_id in deleted_ids
+        ]
+
+        failed = [
+            item for ok, item in helpers.streaming_bulk(
+                client, actions, chunk_size=BULK_CHUNK_SIZE, raise_on_error=False, max_retries=3
+            )
+            if not ok and item.get('delete', {}).get('status') != 404
+        ]
+        if failed:
+            raise RuntimeError(f"{len(failed)} index updates failed, e.g. {failed[0]}")
+
+        SearchIndexOutbox.objects.filter(id__in=[row_id for row_id, _, _ in rows]).delete()
+
+    oldest_change = min(created_at for _, _, created_at in rows)
+    return {
+        'changes': len(rows),
+        'documents': len(product_ids),
+        'deleted': len(deleted_ids),
+        'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+        'max_staleness_ms': round((timezone.now() - oldest_change).total_seconds() * 1000, 3),
+    }
+
+
+def run_index_outbox_consumer(flush_interval_ms: int = None, batch_size: int = None,
+                              max_cycles: int = None, client=None):
+    """
+    Background consumer loop: every flush_interval_ms, drains the outbox in coalesced
+    bulk batches. Staleness of the index is bounded by roughly one interval plus one flush.
+    """
+    flush_interval = (flush_interval_ms or settings.SEARCH_OUTBOX_FLUSH_INTERVAL_MS) / 1000.0
+    cycles = 0
+
+    while max_cycles is None or cycles < max_cycles:
+        cycles += 1
+        cycle_started = time.perf_counter()
+
+        if not cache.get(REBUILD_FLAG_KEY):
+            while True:
+                try:
+                    metrics = flush_index_outbox(batch_size=batch_size, client=client)
+                except Exception as e:
+                    print(f"Search outbox flush failed (will retry): {e}")
+                    break
+                if metrics is None:
+                    break
+                print(
+                    f"Search outbox: {metrics['changes']} changes -> {metrics['documents']} docs "
+                    f"in {metrics['duration_ms']} ms (staleness {metrics['max_staleness_ms']} ms)"
+                )
+
+        remaining = flush_interval - (time.perf_counter() - cycle_started)
+        if remaining > 0:
+            time.sleep(remaining)
+
+
+def _build_search_body(query: str, filters: Dict = None, sort_by: str = '-rating_avg',
+                       page: int = 1, page_size: int = SEARCH_PAGE_SIZE) -> Dict:
+    # Define the basic search query (matching product name or description)
+    search_body = {
+        "query": {
+            "bool": {
+                "must": [
+                    {"multi_match": {"query": query, "fields": ["name^3", "description"]}}
                 ]
-            # Add more filters (price range, brand, etc.) here...
+            }
+        },
+        "sort": [
+            {sort_by.lstrip('-'): {"order": "desc" if sort_by.startswith('-') else "asc"}}
+        ],
+        "from": (page - 1) * page_size,
+        "size": page_size,
+    }
+
+    # Add filtering logic (e.g., category, price range)
+    if filters:
+        if 'category_id' in filters:
+            search_body['query']['bool']['filter'] = [
+                {"term": {"category_id": filters['category_id']}}
+            ]
+        # Add more filters (price range, brand, etc.) here...
+    return search_body
+
 
+def search_products(query: str, filters: Dict = None, sort_by: str = '-rating_avg',
+                    page: int = 1, page_size: int = SEARCH_PAGE_SIZE, use_cache: bool = True) -> List[Dict]:
+    """
+    Executes a complex search and filter query against Elasticsearch.
+    Results are served from RESULT_CACHE when the same normalized query, filters,
+    sort and page were searched recently against the current index generation.
+    """
+    def execute():
+        search_body = _build_search_body(query, filters, sort_by, page, page_size)
         res = ES_CLIENT.search(index=INDEX_NAME, body=search_body)
-        
-        # Return only the relevant product IDs and scores
-        results = [hit['_source'] for hit in res['hits']['hits']]
-        return results
+        # Return only the relevant product documents
+        return [hit['_source'] for hit in res['hits']['hits']]
+
+    try:
+        if not use_cache:
+            return execute()
+        cache_key = build_cache_key(query, filters, sort_by, page, page_size)
+        return RESULT_CACHE.get_or_compute(cache_key, execute)
 
     except Exception as e:
         print(f"Error executing search: {e}")
         return []
+
+
+def _price_range_clause(key: str) -> Dict:
+    for range_key, lower, upper in FACET_PRICE_RANGES:
+        if range_key == key:
+            bounds = {}
+            if lower is not None:
+                bounds['gte'] = lower
+            if upper is not None:
+                bounds['lt'] = upper
+            return {"range": {"price": bounds}}
+    return None
+
+
+def _facet_filter_clauses(facet_filters: Dict) -> Dict:
+    """
+    Builds one filter clause per selected facet. Values within a facet are OR-ed
+    (multi-select), facets are AND-ed together.
+    """
+    clauses = {}
+    for facet, values in (facet_filters or {}).items():
+        values = [value for value in values if value not in (None, '')]
+        if not values:
+            continue
+        if facet == 'price':
+            ranges = [clause for clause in map(_price_range_clause, values) if clause]
+            if ranges:
+                clauses[facet] = {"bool": {"should": ranges, "minimum_should_match": 1}}
+        elif facet == 'availability':
+            clauses[facet] = {"terms": {"is_available": [str(value).lower() in ('1', 'true', 'yes') for value in values]}}
+        elif facet in FACET_FIELDS:
+            clauses[facet] = {"terms": {FACET_FIELDS[facet]: list(values)}}
+    return clauses
+
+
+def _build_facet_aggs(clauses: Dict) -> Dict:
+    """
+    One aggregation per facet, each filtered by the selections of the OTHER facets only,
+    so a facet still shows the counts of its unselected values (multi-select).
+    """
+    facet_aggs = {
+        'category': {"terms": {"field": "category_name", "size": FACET_TERMS_SIZE}},
+        'seller': {"terms": {"field": "seller_name", "size": FACET_TERMS_SIZE}},
+        'availability': {"terms": {"field": "is_available"}},
+        'price': {"range": {"field": "price", "ranges": [
+            {key: value for key, value in (('key', key), ('from', lower), ('to', upper)) if value is not None}
+            for key, lower, upper in FACET_PRICE_RANGES
+        ]}},
+    }
+    aggs = {}
+    for facet, agg in facet_aggs.items():
+        others = [clause for name, clause in clauses.items() if name != facet]
+        aggs[facet] = {
+            "filter": {"bool": {"filter": others}} if others else {"match_all": {}},
+            "aggs": {"values": agg},
+        }
+    return aggs
+
+
+def _parse_facets(aggregations: Dict, facet_filters: Dict) -> Dict:
+    facets = {}
+    for facet, result in aggregations.items():
+        selected = {str(value).lower() for value in (facet_filters or {}).get(facet, [])}
+        buckets = []
+        for bucket in result['values']['buckets']:
+            value = bucket.get('key_as_string', bucket['key']) if facet == 'availability' else bucket['key']
+            buckets.append({
+                'value': value,
+                'count': bucket['doc_count'],
+                'selected': str(value).lower() in selected,
+            })
+        facets[facet] = buckets
+    return facets
+
+
+def faceted_search(query: str, filters: Dict = None, facet_filters: Dict = None, sort_by: str = '-rating_avg',
+                   page: int = 1, page_size: int = SEARCH_PAGE_SIZE, use_cache: bool = True) -> Dict:
+    """
+    Returns one page of hits AND the facet counts (category, seller, price buckets,
+    availability) from a single Elasticsearch request.
+    - filters (e.g. category_id) restrict hits and facet counts alike (query context).
+    - facet_filters ({'category': [...], 'seller': [...], 'price': ['10-50'], 'availability': ['true']})
+      are multi-select: they are applied to the hits through post_filter, and each facet
+      aggregation only applies the selections of the other facets.
+    """
+    def execute():
+        search_body = _build_search_body(query, filters, sort_by, page, page_size)
+        clauses = _facet_filter_clauses(facet_filters)
+        if clauses:
+            search_body['post_filter'] = {"bool": {"filter": list(clauses.values())}}
+        search_body['aggs'] = _build_facet_aggs(clauses)
+
+        res = ES_CLIENT.search(index=INDEX_NAME, body=search_body)
+        return {
+            'total': res['hits']['total']['value'],
+            'results': [hit['_source'] for hit in res['hits']['hits']],
+            'facets': _parse_facets(res['aggregations'], facet_filters),
+        }
+
+    try:
+        if not use_cache:
+            return execute()
+        cache_filters = dict(filters or {})
+        cache_filters.update({f"facet:{name}": values for name, values in (facet_filters or {}).items()})
+        cache_key = build_cache_key(query, cache_filters, sort_by, page, page_size, namespace='faceted')
+        return RESULT_CACHE.get_or_compute(cache_key, execute)
+
+    except Exception as e:
+        print(f"Error executing faceted search: {e}")
+        return {'total': 0, 'results': [], 'facets': {}}
+
+
+def get_search_cache_stats() -> Dict:
+    """ Hit rate and latency of the search result cache in this process. """
+    return RESULT_CACHE.stats()
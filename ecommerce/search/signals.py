@@ -0,0 +1,38 @@
+# File: tec/ecommerce/search/signals.py
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import SearchIndexOutbox
+
+PRICE_FIELDS = {'base_price_pi', 'sale_price_pi'}
+INVENTORY_FIELDS = {'inventory_stock'}
+
+# ----------------------------------------------------
+# Product Change Capture
+# ----------------------------------------------------
+# post_save/post_delete run inside the saving transaction, so the outbox row commits
+# (or rolls back) together with the product change.
+# Bulk .update() calls bypass signals: those writers call SearchIndexOutbox.record() themselves.
+
+@receiver(post_save, sender='products.Product')
+def capture_product_save(sender, instance, update_fields=None, **kwargs):
+    change_type = 'PRODUCT'
+    if update_fields:
+        if set(update_fields) <= PRICE_FIELDS:
+            change_type = 'PRICE'
+        elif set(update_fields) <= INVENTORY_FIELDS:
+            change_type = 'INVENTORY'
+    SearchIndexOutbox.record([instance.pk], change_type)
+
+
+@receiver(post_delete, sender='products.Product')
+def capture_product_delete(sender, instance, **kwargs):
+    SearchIndexOutbox.record([instance.pk], 'DELETE')
+
+
+@receiver(post_save, sender='products.ProductImage')
+@receiver(post_delete, sender='products.ProductImage')
+def capture_product_image_change(sender, instance, **kwargs):
+    # The main image URL is part of the indexed document
+    SearchIndexOutbox.record([instance.product_id], 'PRODUCT')
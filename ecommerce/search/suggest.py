@@ -0,0 +1,348 @@
+# File: tec/ecommerce/search/suggest.py
+
+import bisect
+import heapq
+import os
+import pickle
+import threading
+import time
+from array import array
+from collections import OrderedDict, namedtuple
+from itertools import groupby
+from django.conf import settings
+from django.db import connection as db_connection
+from django.db.models import Count, Sum
+
+from .cache import normalize_query
+
+# --- Constants ---
+SUGGEST_LIMIT = 10 # Suggestions returned (and precomputed) per prefix
+TOP_K_PREFIX_LENGTH = 3 # Prefixes up to this length have their top suggestions precomputed
+MEMO_SIZE = 10000 # Longer prefixes: LRU memo of recent lookups
+SNAPSHOT_VERSION = 1
+PRODUCT_CHUNK_SIZE = 5000
+
+KIND_PRODUCT, KIND_CATEGORY, KIND_TAG = 0, 1, 2
+KIND_NAMES = ('product', 'category', 'tag')
+# Categories and tags stand for many products: boost them over single product names
+KIND_BOOST = {KIND_PRODUCT: 1.0, KIND_CATEGORY: 5.0, KIND_TAG: 2.0}
+
+_PREFIX_END = '\U0010ffff' # Sorts after every character: [prefix, prefix + _PREFIX_END) is the prefix range
+
+# Immutable index state; refreshes build a new one and swap the reference
+_State = namedtuple('_State', ['keys', 'texts', 'kinds', 'weights', 'top_k'])
+
+# ----------------------------------------------------
+# 1. Prefix Index (Sorted Arrays + Bisect)
+# ----------------------------------------------------
+class PrefixIndex:
+    """
+    In-memory autocomplete index over product names, categories and tags.
+    - keys: normalized terms in sorted order, so every prefix maps to a contiguous range
+      found with two bisections; texts/kinds/weights are parallel arrays.
+    - Short prefixes (the ones with huge ranges) are answered from a precomputed top-k
+      table; longer prefixes rank their (small) range with heapq and are memoized (LRU).
+    - Lookups never lock: refreshes build a new state and swap it in one assignment.
+    """
+
+    def __init__(self, entries=(), limit: int = SUGGEST_LIMIT):
+        self.limit = limit
+        self.last_product_id = 0
+        self.built_at = time.time()
+        self._memo = OrderedDict()
+        self._memo_lock = threading.Lock()
+        self._swap(self._build_state(self._merge({}, entries)))
+
+    # --- Building ---
+    @staticmethod
+    def _merge(merged: dict, entries) -> dict:
+        """ Folds (text, kind, weight) entries into {key: [text, kind, weight]}; duplicate terms add up. """
+        for text, kind, weight in entries:
+            key = normalize_query(text)
+            if not key:
+                continue
+            weight = float(weight) * KIND_BOOST[kind]
+            entry = merged.get(key)
+            if entry is None:
+                merged[key] = [text, kind, weight]
+            else:
+                entry[2] += weight
+        return merged
+
+    def _build_state(self, merged: dict) -> _State:
+        keys = sorted(merged)
+        texts = []
+        kinds = array('b')
+        weights = array('f')
+        for key in keys:
+            text, kind, weight = merged[key]
+            texts.append(key if text == key else text) # Share the string object when identical
+            kinds.append(kind)
+            weights.append(weight)
+        return _State(keys, texts, kinds, weights, self._build_top_k(keys, texts, kinds, weights))
+
+    def _build_top_k(self, keys, texts, kinds, weights) -> dict:
+        """ For every prefix of length <= TOP_K_PREFIX_LENGTH, its best suggestions (one pass per length). """
+        top_k = {}
+        for length in range(1, TOP_K_PREFIX_LENGTH + 1):
+            positions = (i for i in range(len(keys)) if len(keys[i]) >= length)
+            for prefix, group in groupby(positions, key=lambda i: keys[i][:length]):
+                best = heapq.nlargest(self.limit, group, key=weights.__getitem__)
+                top_k[prefix] = tuple((texts[i], KIND_NAMES[kinds[i]], weights[i]) for i in best)
+        return top_k
+
+    def _swap(self, state: _State):
+        self._state = state
+        with self._memo_lock:
+            self._memo.clear()
+
+    def add_entries(self, entries) -> int:
+        """
+        Incremental refresh: inserts new terms (or adds weight to existing ones) into a copy
+        of the sorted arrays, patches the affected top-k prefixes and swaps the state in.
+        Returns the number of terms touched.
+        """
+        merged = self._merge({}, entries)
+        if not merged:
+            return 0
+        state = self._state
+        keys, texts = list(state.keys), list(state.texts)
+        kinds, weights = array('b', state.kinds), array('f', state.weights)
+        top_k = dict(state.top_k)
+
+        for key in sorted(merged):
+            text, kind, weight = merged[key]
+            position = bisect.bisect_left(keys, key)
+            if position < len(keys) and keys[position] == key:
+                weights[position] += weight
+            else:
+                keys.insert(position, key)
+                texts.insert(position, key if text == key else text)
+                kinds.insert(position, kind)
+                weights.insert(position, weight)
+
+            suggestion = (texts[position], KIND_NAMES[kinds[position]], weights[position])
+            for length in range(1, min(len(key), TOP_K_PREFIX_LENGTH) + 1):
+                prefix = key[:length]
+                current = [item for item in top_k.get(prefix, ()) if item[0] != suggestion[0]]
+                current.append(suggestion)
+                current.sort(key=lambda item: item[2], reverse=True)
+                top_k[prefix] = tuple(current[:self.limit])
+
+        self._swap(_State(keys, texts, kinds, weights, top_k))
+        return len(merged)
+
+    # --- Lookup ---
+    def suggest(self, query: str, limit: int = None) -> list:
+        """ Returns up to limit (text, kind, weight) suggestions for a typed prefix, best first. """
+        limit = min(limit or self.limit, self.limit)
+        prefix = normalize_query(query)
+        if not prefix:
+            return []
+        state = self._state
+
+        if len(prefix) <= TOP_K_PREFIX_LENGTH:
+            return list(state.top_k.get(prefix, ())[:limit])
+
+        with self._memo_lock:
+            cached = self._memo.get(prefix)
+            if cached is not None:
+                self._memo.move_to_end(prefix)
+                return list(cached[:limit])
+
+        start = bisect.bisect_left(state.keys, prefix)
+        end = bisect.bisect_left(state.keys, prefix + _PREFIX_END, start)
+        best = heapq.nlargest(self.limit, range(start, end), key=state.weights.__getitem__)
+        result = tuple((state.texts[i], KIND_NAMES[state.kinds[i]], state.weights[i]) for i in best)
+
+        with self._memo_lock:
+            if self._state is state: # Do not memoize results of a state that was just swapped out
+                self._memo[prefix] = result
+                if len(self._memo) > MEMO_SIZE:
+                    self._memo.popitem(last=False)
+        return list(result[:limit])
+
+    def __len__(self):
+        return len(self._state.keys)
+
+    # --- Snapshot ---
+    def save_snapshot(self, path: str):
+        """
+        Writes a compact snapshot: sorted keys, display texts only where they differ
+        from the key, kinds and weights as raw bytes. The top-k table is rebuilt on load.
+        """
+        state = self._state
+        payload = {
+            'version': SNAPSHOT_VERSION,
+            'limit': self.limit,
+            'last_product_id': self.last_product_id,
+            'built_at': self.built_at,
+            'keys': state.keys,
+            'texts': {i: text for i, text in enumerate(state.texts) if text is not state.keys[i]},
+            'kinds': state.kinds.tobytes(),
+            'weights': state.weights.tobytes(),
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path) # Atomic: workers never read a half-written snapshot
+
+    @classmethod
+    def load_snapshot(cls, path: str):
+        with open(path, 'rb') as f:
+            payload = pickle.load(f)
+        if payload.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported suggest snapshot version: {payload.get('version')}")
+
+        index = cls(limit=payload['limit'])
+        keys = payload['keys']
+        texts = list(keys)
+        for position, text in payload['texts'].items():
+            texts[position] = text
+        kinds = array('b')
+        kinds.frombytes(payload['kinds'])
+        weights = array('f')
+        weights.frombytes(payload['weights'])
+
+        index.last_product_id = payload['last_product_id']
+        index.built_at = payload['built_at']
+        index._swap(_State(keys, texts, kinds, weights, index._build_top_k(keys, texts, kinds, weights)))
+        return index
+
+# ----------------------------------------------------
+# 2. Catalog Vocabulary (Weighted by Popularity)
+# ----------------------------------------------------
+def _product_entries(since_product_id: int = 0):
+    """
+    Yields (text, kind, weight) for available products with id > since_product_id and for
+    their tags. A product weighs 1 + units sold + its rating; a tag weighs the number of
+    products carrying it. Returns (entries, last_product_id).
+    """
+    from products.models import Product
+    from orders.models import OrderDetail
+
+    sold = dict(
+        OrderDetail.objects.filter(product_id__gt=since_product_id)
+        .values('product_id').annotate(units=Sum('quantity')).values_list('product_id', 'units')
+    )
+    products = Product.objects.filter(is_available=True, id__gt=since_product_id)
+
+    entries = []
+    last_product_id = since_product_id
+    for product_id, name, rating_avg in products.order_by('id').values_list(
+        'id', 'name', 'rating_avg'
+    ).iterator(chunk_size=PRODUCT_CHUNK_SIZE):
+        entries.append((name, KIND_PRODUCT, 1 + (sold.get(product_id) or 0) + float(rating_avg or 0)))
+        last_product_id = product_id
+
+    for tag_name, product_count in products.exclude(tags__name__isnull=True).values('tags__name').annotate(
+        product_count=Count('id')
+    ).values_list('tags__name', 'product_count'):
+        entries.append((tag_name, KIND_TAG, product_count))
+    return entries, last_product_id
+
+
+def _category_entries():
+    """ (name, kind, weight) per category, weighted by its number of available products. """
+    from products.models import Product
+
+    return [
+        (name, KIND_CATEGORY, 1 + product_count)
+        for name, product_count in Product.objects.filter(is_available=True, category__isnull=False)
+        .values('category__name').annotate(product_count=Count('id'))
+        .values_list('category__name', 'product_count')
+    ]
+
+
+def build_suggest_index() -> PrefixIndex:
+    """ Full build from the catalog (a few aggregate queries plus one streamed product scan). """
+    entries, last_product_id = _product_entries()
+    index = PrefixIndex(entries + _category_entries())
+    index.last_product_id = last_product_id
+    return index
+
+
+def refresh_suggest_index(index: PrefixIndex) -> int:
+    """
+    Adds products created since the last build/refresh (and their tags) to the index.
+    New products are found by id, which grows with created_at. Categories and popularity
+    changes of existing products are picked up by the next full snapshot build.
+    """
+    entries, last_product_id = _product_entries(index.last_product_id)
+    touched = index.add_entries(entries)
+    index.last_product_id = last_product_id
+    return touched
+
+# ----------------------------------------------------
+# 3. Per-Worker Index (Background Load and Refresh)
+# ----------------------------------------------------
+# Request threads never load, build or refresh the index: a daemon thread started with
+# the worker (core.wsgi / core.asgi call start_suggest_refresher) loads the snapshot, then
+# refreshes it every SEARCH_SUGGEST_REFRESH_SECONDS and swaps the new state in. Until the
+# first load finishes, lookups answer from an empty index instead of waiting for it.
+# Threads do not survive fork(): a worker forked after the start (gunicorn --preload and
+# other pre-fork servers) starts its own refresher on its first lookup.
+# Processes that never start the refresher (shell, management commands) load it lazily.
+
+_index = None
+_index_lock = threading.Lock()
+_refresher = None
+_refresher_pid = None # Process that owns _refresher
+_EMPTY_INDEX = PrefixIndex()
+
+
+def load_or_build_index() -> PrefixIndex:
+    """ Loads the snapshot written by 'manage.py build_suggest_snapshot', or builds from the DB. """
+    path = settings.SEARCH_SUGGEST_SNAPSHOT_PATH
+    if path and os.path.exists(path):
+        try:
+            index = PrefixIndex.load_snapshot(path)
+            refresh_suggest_index(index) # Catch up with products created since the snapshot
+            return index
+        except Exception as e:
+            print(f"Error loading suggest snapshot {path}: {e}")
+    return build_suggest_index()
+
+
+def _run_refresher():
+    global _index
+    while True:
+        try:
+            if _index is None:
+                _index = load_or_build_index()
+            else:
+                refresh_suggest_index(_index)
+        except Exception as e:
+            print(f"Error loading/refreshing suggest index: {e}")
+        finally:
+            db_connection.close() # This thread's connection; do not hold it between refreshes
+        time.sleep(settings.SEARCH_SUGGEST_REFRESH_SECONDS)
+
+
+def start_suggest_refresher():
+    """ Starts this worker's background load/refresh thread (once per process). """
+    global _refresher, _refresher_pid
+    with _index_lock:
+        if _refresher_pid != os.getpid():
+            _refresher = threading.Thread(target=_run_refresher, name='suggest-index', daemon=True)
+            _refresher.start()
+            _refresher_pid = os.getpid()
+
+
+def get_suggest_index() -> PrefixIndex:
+    """ Returns this worker's index (never blocks on the DB while the refresher is running). """
+    global _index
+    if _refresher_pid is not None and _refresher_pid != os.getpid():
+        start_suggest_refresher() # Forked after the start: the thread stayed in the parent
+    if _index is not None:
+        return _index
+    if _refresher_pid is not None:
+        return _EMPTY_INDEX # Still warming up
+    with _index_lock:
+        if _index is None:
+            _index = load_or_build_index()
+    return _index
+
+
+def suggest(query: str, limit: int = SUGGEST_LIMIT) -> list:
+    return get_suggest_index().suggest(query, limit)
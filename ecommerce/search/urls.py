@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import ProductSearchView
+from .views import ProductSearchView, SuggestAPIView
 
 # Define the namespace for this app's URLs
 app_name = 'search'
@@ -11,5 +11,11 @@ urlpatterns = [
         ProductSearchView.as_view(), 
         name='product-search'
     ),
+    # Autocomplete: GET /api/search/suggest/?q=prefix
+    path(
+        'suggest/',
+        SuggestAPIView.as_view(),
+        name='suggest'
+    ),
     # You could add other search paths here if needed (e.g., searching sellers)
 ]
@@ -3,8 +3,11 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from haystack.query import SearchQuerySet
-from .serializers import SearchResultSerializer
+from .serializers import SearchResultSerializer, ProductSourceSerializer
+from .services import faceted_search, FACET_FIELDS
+from .suggest import suggest, SUGGEST_LIMIT
 from rest_framework import status
+from rest_framework.permissions import AllowAny
 # Import the Product model to ensure results are filtered correctly
 from tec.ecommerce.products.models import Product 
 
@@ -26,6 +29,10 @@ class ProductSearchView(APIView):
             # Return a bad request status or simply an empty list if no query is provided
             return Response({"results": []}, status=status.HTTP_400_BAD_REQUEST)
 
+        # Fast path (?mode=source): serialize from the indexed documents, no per-hit DB round trip
+        if request.query_params.get('mode') == 'source':
+            return self.get_from_source(request, query)
+
         # 1. Execute the search using Haystack
         # .filter(content=query) searches the main 'text' field
         # .models(Product) ensures we only get product results
@@ -45,3 +52,80 @@ class ProductSearchView(APIView):
         
         # 3. Return the response
         return Response({"results": serializer.data}, status=status.HTTP_200_OK)
+
+    # Fields that may be refreshed from the DB on the fast path (?hydrate=stock)
+    HYDRATABLE_FIELDS = {'stock'}
+    # Multi-select facet parameters, e.g. ?category=Phones&category=Audio&price=10-50,50-100
+    FACET_PARAMS = set(FACET_FIELDS) | {'price'}
+
+    def get_facet_filters(self, request):
+        facet_filters = {}
+        for facet in self.FACET_PARAMS:
+            values = [
+                value.strip()
+                for param in request.query_params.getlist(facet)
+                for value in param.split(',') if value.strip()
+            ]
+            if values:
+                facet_filters[facet] = values
+        return facet_filters
+
+    def get_from_source(self, request, query):
+        """
+        Serves results from the '_source' of each hit with zero ORM queries.
+        Fields that must be fresh can opt in to ONE batched DB read: ?hydrate=stock.
+        Facet counts (category, seller, price, availability) come back in the same
+        Elasticsearch request as the hits.
+        """
+        filters = {}
+        category_id = request.query_params.get('category_id')
+        if category_id:
+            filters['category_id'] = category_id
+        try:
+            page = max(int(request.query_params.get('page', 1)), 1)
+        except ValueError:
+            page = 1
+
+        search = faceted_search(query, filters=filters, facet_filters=self.get_facet_filters(request), page=page)
+        hits = search['results']
+
+        hydrate = set(request.query_params.get('hydrate', '').split(',')) & self.HYDRATABLE_FIELDS
+        if 'stock' in hydrate and hits:
+            # Copy before overriding: hits may be shared with the search result cache
+            stock = dict(
+                Product.objects.filter(id__in=[hit['product_id'] for hit in hits])
+                .values_list('id', 'inventory_stock')
+            )
+            hits = [{**hit, 'inventory': stock.get(hit['product_id'], 0)} for hit in hits]
+
+        serializer = ProductSourceSerializer(hits, many=True, context={'request': request})
+        return Response({
+            "count": search['total'],
+            "results": serializer.data,
+            "facets": search['facets'],
+        }, status=status.HTTP_200_OK)
+
+
+# ----------------------------------------------------
+# Autocomplete API View
+# ----------------------------------------------------
+class SuggestAPIView(APIView):
+    """
+    Search-as-you-type suggestions (product names, categories, tags) from the in-memory
+    prefix index of this worker. No DB or Elasticsearch access per keystroke.
+    Endpoint: /api/search/suggest/?q=pho&limit=8
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, format=None):
+        query = request.query_params.get('q', '')
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', SUGGEST_LIMIT)), SUGGEST_LIMIT))
+        except ValueError:
+            limit = SUGGEST_LIMIT
+
+        suggestions = [
+            {"text": text, "type": kind, "weight": round(weight, 3)}
+            for text, kind, weight in suggest(query, limit)
+        ]
+        return Response({"query": query, "suggestions": suggestions}, status=status.HTTP_200_OK)